@@ -0,0 +1,215 @@
+# 오프라인 로그 일괄 분석 (장애 후 사후 분석용)
+# 목표 : log_watcher 를 실시간으로 띄워두지 않았어도, 이미 쌓인 수 GB 로그에서 실행 흐름과 통계를 뽑아냄
+# 방법 : 1) 로그 파일을 mmap 으로 열고 개행 경계에 맞춰 CHUNK_BYTES 단위 구간으로 나눔
+#        2) process pool 의 worker 가 구간마다 mmap 에서 구간만 꺼내 키워드(controller/service/dao/sql_id:)를 찾고
+#           키워드가 있는 라인만 디코딩해서 분류 (나머지 라인은 파이썬 문자열로 만들지 않음)
+#        3) 분류된 이벤트를 구간 순서대로 FlowBuilder 에 넣어 흐름 조립 (구간 경계를 넘는 흐름도 순차 처리와 동일)
+#        .gz 파일은 mmap 할 수 없어 파일 하나를 worker 하나가 스트리밍으로 처리
+# 결과 : 흐름 저장소 + 요약 통계(Controller 순위, 엣지별 호출 수 / 비용, SQL ID 빈도, SQL 비용 순위 / N+1 의심, MB/s)를
+#        batch_summary.json 에 기록
+#        python batch_analyze.py /backup/application.log.2025-03-10 [--store 폴더] [--workers N] [--compact]
+
+import argparse
+import gzip
+import json
+import mmap
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from flow_builder import FlowBuilder
+from flow_graph import FlowGraph
+from flow_store import FlowStoreWriter, compact_segments
+from log_classifier import PREFILTER_KEYWORDS, classify_line, parse_line_context
+from sql_analysis import SqlAnalyzer
+
+# 분석 결과 저장소 / 요약 파일 (실시간 저장소와 섞이지 않도록 기본값은 별도 폴더)
+BATCH_STORE_DIR = "batch_flow_store"
+BATCH_SUMMARY_PATH = "batch_summary.json"
+
+# worker 하나가 맡는 구간 크기 (worker 수보다 구간이 많아야 코어가 고르게 쓰임)
+CHUNK_BYTES = 32 * 1024 * 1024
+
+# worker 하나당 동시에 제출해 두는 구간 수 (결과를 순서대로 소비하면서 다음 구간을 제출 -> 끝난 구간 결과가 메모리에 쌓이지 않음)
+IN_FLIGHT_PER_WORKER = 2
+
+# 저장소에 한 번에 append 할 흐름 수
+APPEND_BATCH_SIZE = 5000
+
+# 요약에 남길 상위 항목 수
+TOP_N = 20
+
+# 구간 전체에서 한 번에 찾는 1차 필터 (log_classifier 의 문자열 필터와 같은 키워드, 소문자 기준)
+_KEYWORD_PATTERN = re.compile(b"|".join(re.escape(keyword.encode("ascii")) for keyword in PREFILTER_KEYWORDS))
+
+
+def _classify(line, events):
+    log_event = classify_line(line)
+    if log_event is not None:
+        # 흐름을 스레드/요청별로 나누는 데 필요한 시각/스레드/요청 ID 도 worker 에서 미리 파싱해서 넘김
+        events.append((log_event, parse_line_context(line)))
+
+
+def scan_chunk(path, start, end):
+    """(worker 프로세스) 파일의 [start, end) 구간에서 분류된 이벤트 목록을 반환"""
+    events = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = mm[start:end]
+    # 대소문자 무시 정규식보다 소문자로 바꾼 사본에서 찾는 쪽이 훨씬 빠름 (위치는 원본과 같음)
+    lowered = data.lower()
+    pos = 0
+    while True:
+        match = _KEYWORD_PATTERN.search(lowered, pos)
+        if match is None:
+            break
+        # 키워드가 있는 라인 전체만 꺼냄 (구간은 항상 라인 시작에서 시작)
+        line_start = lowered.rfind(b"\n", pos, match.start()) + 1 or pos
+        line_end = lowered.find(b"\n", match.end())
+        if line_end == -1:
+            line_end = len(lowered)
+        _classify(data[line_start:line_end].decode("utf-8", "replace"), events)
+        pos = line_end + 1
+    return events
+
+
+def scan_gzip(path, start, end):
+    """(worker 프로세스) .gz 파일 전체를 스트리밍으로 분류 (start / end 는 사용하지 않음)"""
+    events = []
+    with gzip.open(path, "rt", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            _classify(line, events)
+    return events
+
+
+def split_chunks(path, chunk_bytes=CHUNK_BYTES):
+    """파일을 개행 경계에 맞춘 (start, end) 구간 목록으로 나눔"""
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    chunks = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        while start < size:
+            end = mm.find(b"\n", min(start + chunk_bytes, size) - 1)
+            end = size if end == -1 else end + 1
+            chunks.append((start, end))
+            start = end
+    return chunks
+
+
+def build_summary(graph, sql_counts, sql_analyzer, total_bytes, elapsed, files):
+    controllers = sorted((node for node in graph.nodes.values() if node["layer"] == "controller"),
+                         key=lambda node: node["count"], reverse=True)
+    edges = sorted(graph.edges.items(), key=lambda item: item[1]["count"], reverse=True)
+    sql_ids = sorted(sql_counts.items(), key=lambda item: item[1], reverse=True)
+    return {
+        "files": files,
+        "bytes": total_bytes,
+        "elapsed": round(elapsed, 3),
+        "mb_per_sec": round(total_bytes / 1024 / 1024 / max(elapsed, 1e-6), 1),
+        "flow_count": graph.flow_count,
+        "top_controllers": [{"controller": f'{node["class"]}.{node["method"]}', "count": node["count"]}
+                            for node in controllers[:TOP_N]],
+        "edges": [{"source": src, "target": dst, "label": edge["label"], "count": edge["count"],
+                   "total_ms": round(edge["total_ms"], 3), "n_plus_one": edge["n_plus_one"]}
+                  for (src, dst), edge in edges],
+        "sql_ids": [{"sql_id": sql_id, "count": count} for sql_id, count in sql_ids[:TOP_N]],
+        "sql": sql_analyzer.report(limit=TOP_N),
+    }
+
+
+def print_summary(summary):
+    print("\n### 일괄 분석 결과 ###")
+    print(f"파일 {len(summary['files'])}개, {summary['bytes'] / 1024 / 1024:.1f} MB, "
+          f"{summary['elapsed']}초 ({summary['mb_per_sec']} MB/s), 흐름 {summary['flow_count']}건")
+    print("\n[Controller 호출 순위]")
+    for item in summary["top_controllers"]:
+        print(f"  {item['count']:>8}  {item['controller']}")
+    print("\n[엣지별 호출 수]")
+    for item in summary["edges"][:TOP_N]:
+        print(f"  {item['count']:>8}  {item['source']} -> {item['target']}")
+    print("\n[SQL ID 빈도]")
+    for item in summary["sql_ids"]:
+        print(f"  {item['count']:>8}  {item['sql_id']}")
+    print("\n[SQL 비용 합계 순위]")
+    for item in summary["sql"]["sql"]:
+        print(f"  {item['total_ms']:>14,.3f} ms  {item['count']:>8}회  N+1 {item['n_plus_one_flows']:>5}  {item['sql_id']}")
+    print("\n[N+1 의심 (최근)]")
+    for item in summary["sql"]["n_plus_one"]:
+        print(f"  {item['repeats']:>4}회  {item['controller']} -> {item['parent']} -> {item['sql_id']}")
+
+
+def analyze(paths, store_dir=BATCH_STORE_DIR, summary_path=BATCH_SUMMARY_PATH, workers=None, compact=False):
+    started = time.monotonic()
+    writer = FlowStoreWriter(store_dir, legacy_path=None)
+    graph = FlowGraph()
+    sql_counts = {}
+    sql_analyzer = SqlAnalyzer(path=None)
+    total_bytes = sum(os.path.getsize(path) for path in paths)
+
+    def save(flows):
+        writer.append(flows)
+        graph.update(flows)
+        sql_analyzer.add(flows)
+        for flow in flows:
+            for sql in flow["sql"]:
+                sql_id = f'{sql["class"]}.{sql["method"]}'
+                sql_counts[sql_id] = sql_counts.get(sql_id, 0) + 1
+
+    max_in_flight = IN_FLIGHT_PER_WORKER * (workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for path in paths:
+            print(f"### 분석 중: {path}")
+            if path.endswith(".gz"):
+                jobs = iter([(scan_gzip, path, 0, 0)])
+            else:
+                jobs = ((scan_chunk, path, start, end) for start, end in split_chunks(path))
+
+            # 구간 순서대로 흐름 조립 (흐름은 파일 경계는 넘지 않음), 제출해 둔 구간은 max_in_flight 개까지만
+            builder = FlowBuilder()
+            flows = []
+            futures = deque()
+            for job in jobs:
+                futures.append(executor.submit(*job))
+                if len(futures) >= max_in_flight:
+                    break
+            while futures:
+                events = futures.popleft().result()
+                job = next(jobs, None)
+                if job is not None:
+                    futures.append(executor.submit(*job))
+                for log_event, line_context in events:
+                    flows.extend(builder.feed(log_event, line_context=line_context))
+                if len(flows) >= APPEND_BATCH_SIZE:
+                    save(flows)
+                    flows = []
+            flows.extend(builder.finish())
+            if flows:
+                save(flows)
+
+    writer.close()
+    if compact:
+        # 일괄 분석 결과는 다시 쓰지 않으므로 모든 세그먼트를 바로 압축 형식으로 변환
+        compacted, before, after = compact_segments(store_dir, older_than=0)
+        print(f"### 세그먼트 {compacted}개 압축 ({before:,} -> {after:,} bytes)")
+    summary = build_summary(graph, sql_counts, sql_analyzer, total_bytes, time.monotonic() - started, paths)
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="이미 쌓인 로그 파일 일괄 분석")
+    parser.add_argument("paths", nargs="+", help="분석할 로그 파일 (.gz 포함, 입력 순서대로 처리)")
+    parser.add_argument("--store", default=BATCH_STORE_DIR, help=f"흐름 저장소 폴더 (기본: {BATCH_STORE_DIR})")
+    parser.add_argument("--summary", default=BATCH_SUMMARY_PATH, help=f"요약 통계 파일 (기본: {BATCH_SUMMARY_PATH})")
+    parser.add_argument("--workers", type=int, default=None, help="worker 프로세스 수 (기본: CPU 수)")
+    parser.add_argument("--compact", action="store_true", help="저장소 세그먼트를 압축 형식(.flc)으로 변환")
+    args = parser.parse_args()
+
+    summary = analyze(args.paths, store_dir=args.store, summary_path=args.summary, workers=args.workers,
+                      compact=args.compact)
+    print_summary(summary)
+    print(f"\n### 흐름 저장소: {args.store}, 요약: {args.summary}")
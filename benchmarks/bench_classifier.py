@@ -0,0 +1,38 @@
+# 로그 라인 분류기 마이크로 벤치마크
+# 목표 : 기존 정규식 4개 체인과 1차 필터 + 합쳐진 정규식 방식의 처리 속도를 비교
+# 실행 : python benchmarks/bench_classifier.py [라인 수]   (기본 1,000,000 라인)
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from log_classifier import classify_line, classify_line_legacy
+from synthetic_log import generate_lines
+
+
+def run(classifier, lines):
+    start = time.perf_counter()
+    matched = 0
+    for line in lines:
+        if classifier(line) is not None:
+            matched += 1
+    return time.perf_counter() - start, matched
+
+
+if __name__ == "__main__":
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"### 가짜 로그 {line_count:,} 라인 생성 중...")
+    lines = generate_lines(line_count)
+
+    # 두 방식의 분류 결과가 같은지 먼저 확인
+    sample = lines[:50_000]
+    mismatches = sum(1 for line in sample if classify_line(line) != classify_line_legacy(line))
+    print(f"### 결과 비교 (앞 {len(sample):,} 라인): 불일치 {mismatches}건")
+
+    legacy_elapsed, legacy_matched = run(classify_line_legacy, lines)
+    combined_elapsed, combined_matched = run(classify_line, lines)
+
+    print(f"기존 정규식 4개 체인 : {legacy_elapsed:.3f}s ({line_count / legacy_elapsed:,.0f} lines/s, 매칭 {legacy_matched:,})")
+    print(f"필터 + 합쳐진 정규식 : {combined_elapsed:.3f}s ({line_count / combined_elapsed:,.0f} lines/s, 매칭 {combined_matched:,})")
+    print(f"속도 향상 : x{legacy_elapsed / combined_elapsed:.2f}")
@@ -0,0 +1,628 @@
+# 분석기 전체(end-to-end) 벤치마크 + 부하 생성
+# 목표 : 운영 규모 트래픽에 쓰기 전에 단계별 처리량 / 지연을 같은 조건으로 반복 측정하고, 이전 결과와 비교해 성능 저하를 찾음
+# 방법 : 임시 작업 폴더에서(저장소 / 색인 / 캐시 파일이 실제 파일과 섞이지 않도록) 단계별로 측정
+#        parse     : 동시 요청이 섞인 가짜 Spring 로그 -> FlowBuilder (lines/s, flows/s, MB/s)
+#        store     : 흐름 묶음 append 지연 / 처리량, 전체 다시 읽기(read_flows) 처리량, 압축 형식(.flc) 변환 후 크기 / 읽기 처리량
+#        tail      : 부하 생성 스레드가 rate lines/s 로 로그를 쓰는 동안 LogTailer + FlowBuilder 로 따라 읽는 지연(쓰기 -> 읽기)
+#        index     : FlowIndex 색인 처리량 / Controller 조회 지연
+#        rollup    : FlowRollup 집계 처리량 / hot path 조회 지연
+#        sql       : SQL 실행 시간(sqltiming)과 N+1 반복이 섞인 로그로 SqlAnalyzer 분석 처리량 / 조회 지연, N+1 검출 수
+#        graph     : FlowGraph 집계, DOT 생성, dot 렌더링(처음 / 캐시 적중) 시간 (graphviz / dot 이 없으면 건너뜀)
+#        dashboard : Flask test client 로 /data, /data?since=, /flows, /hot-paths 응답 시간 (Flask 가 없으면 건너뜀)
+#        http      : 로컬 stub 백엔드에 concurrency 개 연결로 요청 -> 직접 호출과 mitmdump + http_sniffer 경유 호출의 지연 비교
+#                    (mitmdump 가 없으면 직접 호출만 측정)
+# 결과 : 단계별 수치를 JSON 파일로 저장, --compare 로 이전 결과와의 변화율 출력
+# 실행 : python benchmarks/bench_pipeline.py [--lines 200000] [--concurrency 20] [--rate 20000] [--duration 10]
+#        [--stages parse,store,tail,index,rollup,sql,graph,dashboard,http] [--output bench_results.json] [--compare 이전.json]
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_DIR)
+from flow_builder import FlowBuilder
+from flow_store import FlowStoreWriter, read_flows, compact_segments, FLOW_STORE_DIR
+from latency_stats import LatencyHistogram
+from log_tailer import LogTailer
+from synthetic_log import generate_interleaved_lines, iter_interleaved_lines
+
+STAGES = ("parse", "store", "tail", "index", "rollup", "sql", "graph", "dashboard", "http")
+
+# 저장소에 한 번에 append 하는 흐름 수 (log_watcher 의 FLOW_BATCH_SIZE 와 같은 값)
+APPEND_BATCH_SIZE = 100
+
+# tail 단계의 새 로그 확인 간격 (pipeline 의 TAIL_POLL_INTERVAL 과 같은 값) / 부하 생성 쓰기 간격 (초)
+TAIL_POLL_INTERVAL = 0.05
+WRITE_INTERVAL = 0.01
+
+# 조회 지연 측정 반복 횟수
+QUERY_REPEAT = 50
+
+# sql 단계 : N+1 반복이 있는 요청 비율
+N_PLUS_ONE_RATIO = 0.05
+
+# http 단계 : stub 백엔드 포트(http_sniffer 의 TARGET_PORT) / 프록시 포트 / 요청 수 / 응답 크기
+BACKEND_PORT = 8082
+PROXY_PORT = 18080
+HTTP_REQUESTS = 2000
+RESPONSE_BYTES = 2048
+
+# 결과 비교 시 성능 저하로 표시하는 변화율 (%)
+REGRESSION_THRESHOLD = 10.0
+
+
+def rate(count, seconds):
+    return round(count / max(seconds, 1e-9), 1)
+
+
+def timed(histogram, func, *args, **kwargs):
+    """func 실행 시간(ms)을 histogram 에 기록하고 결과 반환"""
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    histogram.record((time.perf_counter() - started) * 1000)
+    return result
+
+
+class Context:
+    """단계 사이에 넘기는 입력 (로그 라인, 흐름)"""
+
+    def __init__(self, args):
+        self.args = args
+        self.lines = None
+        self.flows = None
+
+    def get_lines(self):
+        if self.lines is None:
+            self.lines = generate_interleaved_lines(self.args.lines, concurrency=self.args.concurrency,
+                                                    noise_ratio=self.args.noise_ratio)
+        return self.lines
+
+    def get_flows(self):
+        if self.flows is None:
+            builder = FlowBuilder()
+            self.flows = []
+            for line in self.get_lines():
+                self.flows.extend(builder.feed_line(line))
+            self.flows.extend(builder.finish())
+        return self.flows
+
+    def ensure_store(self):
+        # index / rollup / dashboard 단계만 따로 실행해도 저장소가 있도록
+        if not os.path.isdir(FLOW_STORE_DIR):
+            writer = FlowStoreWriter(FLOW_STORE_DIR, legacy_path=None)
+            flows = self.get_flows()
+            for start in range(0, len(flows), APPEND_BATCH_SIZE):
+                writer.append(flows[start:start + APPEND_BATCH_SIZE])
+            writer.close()
+
+
+# ---- 단계별 측정 ----
+def bench_parse(ctx):
+    lines = ctx.get_lines()
+    total_bytes = sum(len(line) for line in lines)
+    builder = FlowBuilder()
+    flows = []
+    started = time.perf_counter()
+    for line in lines:
+        flows.extend(builder.feed_line(line))
+    flows.extend(builder.finish())
+    elapsed = time.perf_counter() - started
+    ctx.flows = flows
+    return {
+        "lines": len(lines),
+        "flows": len(flows),
+        "seconds": round(elapsed, 3),
+        "lines_per_sec": rate(len(lines), elapsed),
+        "flows_per_sec": rate(len(flows), elapsed),
+        "mb_per_sec": round(total_bytes / 1024 / 1024 / max(elapsed, 1e-9), 2),
+        "orphan_events": builder.orphan_events,
+    }
+
+
+def bench_store(ctx):
+    flows = ctx.get_flows()
+    shutil.rmtree(FLOW_STORE_DIR, ignore_errors=True)
+    writer = FlowStoreWriter(FLOW_STORE_DIR, legacy_path=None)
+    append_ms = LatencyHistogram()
+    started = time.perf_counter()
+    for start in range(0, len(flows), APPEND_BATCH_SIZE):
+        timed(append_ms, writer.append, flows[start:start + APPEND_BATCH_SIZE])
+    writer.close()
+    write_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    read_back, _ = read_flows(FLOW_STORE_DIR)
+    read_elapsed = time.perf_counter() - started
+    store_bytes = sum(os.path.getsize(os.path.join(FLOW_STORE_DIR, name)) for name in os.listdir(FLOW_STORE_DIR))
+
+    # 복사본을 압축 형식으로 바꿔서 크기 / 읽기 처리량 비교 (다음 단계는 원래 NDJSON 저장소를 사용)
+    compact_dir = "bench_compact_store"
+    shutil.rmtree(compact_dir, ignore_errors=True)
+    shutil.copytree(FLOW_STORE_DIR, compact_dir)
+    started = time.perf_counter()
+    _, _, compacted_bytes = compact_segments(compact_dir, older_than=0)
+    compact_elapsed = time.perf_counter() - started
+    started = time.perf_counter()
+    compacted_back, _ = read_flows(compact_dir)
+    compacted_read_elapsed = time.perf_counter() - started
+    shutil.rmtree(compact_dir, ignore_errors=True)
+    return {
+        "flows": len(flows),
+        "write_flows_per_sec": rate(len(flows), write_elapsed),
+        "append_ms": append_ms.summary(),
+        "read_flows_per_sec": rate(len(read_back), read_elapsed),
+        "store_bytes": store_bytes,
+        "bytes_per_flow": round(store_bytes / max(len(flows), 1), 1),
+        "compact_flows_per_sec": rate(len(flows), compact_elapsed),
+        "compacted_bytes": compacted_bytes,
+        "compaction_ratio": round(store_bytes / max(compacted_bytes, 1), 1),
+        "compacted_read_flows_per_sec": rate(len(compacted_back), compacted_read_elapsed),
+        "compacted_matches": compacted_back == read_back,
+    }
+
+
+def bench_tail(ctx):
+    args = ctx.args
+    log_path = "bench_app.log"
+    open(log_path, "w").close()
+    marks = deque()  # (쓰기가 끝난 파일 위치, 쓴 시각)
+    marks_lock = threading.Lock()
+    stopping = threading.Event()
+    written = {"lines": 0}
+
+    def write_load():
+        # rate lines/s 를 WRITE_INTERVAL 마다 나눠서 씀 (라인 시각은 실제 시각)
+        lines = iter_interleaved_lines(args.concurrency, args.noise_ratio, clock=time.time)
+        per_write = max(int(args.rate * WRITE_INTERVAL), 1)
+        next_write = time.perf_counter()
+        with open(log_path, "a", encoding="utf-8") as f:
+            while not stopping.is_set():
+                f.write("".join(next(lines) for _ in range(per_write)))
+                f.flush()
+                with marks_lock:
+                    marks.append((f.tell(), time.perf_counter()))
+                written["lines"] += per_write
+                next_write += WRITE_INTERVAL
+                delay = next_write - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+    tailer = LogTailer(log_path)
+    builder = FlowBuilder()
+    lag_ms = LatencyHistogram()
+    lines_read = flows = 0
+    max_backlog = 0
+
+    writer_thread = threading.Thread(target=write_load, name="bench_load", daemon=True)
+    started = time.perf_counter()
+    writer_thread.start()
+    deadline = started + args.duration
+    while True:
+        for line in tailer.read_lines():
+            lines_read += 1
+            flows += len(builder.feed_line(line))
+        flows += len(builder.expire(time.time()))
+        offset = tailer.position()[1]
+        now = time.perf_counter()
+        with marks_lock:
+            while marks and marks[0][0] <= offset:
+                lag_ms.record((now - marks.popleft()[1]) * 1000)
+            if marks:
+                max_backlog = max(max_backlog, marks[-1][0] - offset)
+        if now >= deadline:
+            if not stopping.is_set():
+                stopping.set()
+                writer_thread.join()
+                continue  # 마지막으로 쓴 라인까지 읽음
+            break
+        time.sleep(TAIL_POLL_INTERVAL)
+    elapsed = time.perf_counter() - started
+    flows += len(builder.finish())
+    tailer.close()
+    return {
+        "target_lines_per_sec": args.rate,
+        "written_lines_per_sec": rate(written["lines"], elapsed),
+        "read_lines_per_sec": rate(lines_read, elapsed),
+        "flows": flows,
+        "lag_ms": lag_ms.summary(),
+        "max_backlog_bytes": max_backlog,
+    }
+
+
+def bench_index(ctx):
+    from flow_index import FlowIndex, INDEX_PATH
+    ctx.ensure_store()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(INDEX_PATH + suffix):
+            os.remove(INDEX_PATH + suffix)
+    index = FlowIndex(INDEX_PATH, FLOW_STORE_DIR)
+    started = time.perf_counter()
+    added = index.sync()
+    elapsed = time.perf_counter() - started
+
+    query_ms = LatencyHistogram()
+    group_ms = LatencyHistogram()
+    for _ in range(QUERY_REPEAT):
+        timed(query_ms, index.query, controller="LoginController", limit=100)
+        timed(group_ms, index.count_by_controller, sql_id="LoginMapper")
+    index.close()
+    return {
+        "flows": added,
+        "index_flows_per_sec": rate(added, elapsed),
+        "controller_query_ms": query_ms.summary(),
+        "sql_group_query_ms": group_ms.summary(),
+        "index_bytes": os.path.getsize(INDEX_PATH),
+    }
+
+
+def bench_rollup(ctx):
+    from flow_rollup import FlowRollup, ROLLUP_PATH
+    ctx.ensure_store()
+    if os.path.exists(ROLLUP_PATH):
+        os.remove(ROLLUP_PATH)
+    rollup = FlowRollup(ROLLUP_PATH, FLOW_STORE_DIR)
+    started = time.perf_counter()
+    added = rollup.sync()
+    elapsed = time.perf_counter() - started
+    save_ms = LatencyHistogram()
+    timed(save_ms, rollup.save)
+
+    query_ms = LatencyHistogram()
+    for _ in range(QUERY_REPEAT):
+        timed(query_ms, rollup.hot_paths, "minute")
+    return {
+        "flows": added,
+        "rollup_flows_per_sec": rate(added, elapsed),
+        "save_ms": save_ms.summary()["max"],
+        "rollup_bytes": os.path.getsize(ROLLUP_PATH),
+        "hot_paths_query_ms": query_ms.summary(),
+        "stats": rollup.stats(),
+    }
+
+
+def bench_sql(ctx):
+    from sql_analysis import SqlAnalyzer
+    lines = generate_interleaved_lines(ctx.args.lines, concurrency=ctx.args.concurrency,
+                                       noise_ratio=ctx.args.noise_ratio, timing=True,
+                                       n_plus_one_ratio=N_PLUS_ONE_RATIO)
+    builder = FlowBuilder()
+    flows = []
+    for line in lines:
+        flows.extend(builder.feed_line(line))
+    flows.extend(builder.finish())
+
+    analyzer = SqlAnalyzer(path=None)
+    started = time.perf_counter()
+    analyzer.add(flows)
+    elapsed = time.perf_counter() - started
+    query_ms = LatencyHistogram()
+    for _ in range(QUERY_REPEAT):
+        timed(query_ms, analyzer.report, limit=20)
+    filtered_ms = LatencyHistogram()
+    for _ in range(QUERY_REPEAT):
+        timed(filtered_ms, analyzer.report, "LoginController", limit=20)
+    return {
+        "flows": len(flows),
+        "sql_flows_per_sec": rate(len(flows), elapsed),
+        "report_query_ms": query_ms.summary(),
+        "controller_query_ms": filtered_ms.summary(),
+        "n_plus_one_flows": sum(stats.n_plus_one_flows for stats in analyzer.sql.values()),
+        "stats": analyzer.stats(),
+    }
+
+
+def bench_graph(ctx):
+    from flow_graph import FlowGraph
+    flows = ctx.get_flows()
+    graph = FlowGraph()
+    started = time.perf_counter()
+    graph.update(flows)
+    result = {"graph_flows_per_sec": rate(len(flows), time.perf_counter() - started),
+              "nodes": len(graph.nodes), "edges": len(graph.edges)}
+
+    try:
+        from render_farm import RenderFarm, build_digraph
+    except ImportError as e:
+        result["render"] = {"skipped": f"graphviz 패키지 없음 ({e})"}
+        return result
+    started = time.perf_counter()
+    source = build_digraph(graph).source
+    result["dot_source_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    if shutil.which("dot") is None:
+        result["render"] = {"skipped": "dot 실행 파일 없음"}
+        return result
+
+    farm = RenderFarm()
+    try:
+        for fmt in ("svg", "png"):
+            started = time.perf_counter()
+            farm.submit(source, fmt)[1].result()
+            cold = time.perf_counter() - started
+            started = time.perf_counter()
+            farm.submit(source, fmt)[1].result()
+            result[f"render_{fmt}_ms"] = round(cold * 1000, 1)
+            result[f"render_{fmt}_cached_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    finally:
+        farm.close()
+    return result
+
+
+def bench_dashboard(ctx):
+    try:
+        from web_dashboard import web_dashboard as dashboard
+    except ImportError as e:
+        return {"skipped": f"대시보드 의존성 없음 ({e})"}
+    ctx.ensure_store()
+    client = dashboard.app.test_client()
+
+    result = {}
+    started = time.perf_counter()
+    response = client.get("/data")
+    result["data_cold_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    result["data_bytes"] = len(response.data)
+
+    requests = {
+        "data_warm_ms": ("/data", {}),
+        "data_gzip_ms": ("/data", {"Accept-Encoding": "gzip"}),
+        "data_page_ms": ("/data?since=1:0&limit=500", {}),
+        "flows_query_ms": ("/flows?controller=LoginController&limit=100", {}),
+        "hot_paths_ms": ("/hot-paths", {}),
+    }
+    for name, (url, headers) in requests.items():
+        latency = LatencyHistogram()
+        for _ in range(QUERY_REPEAT):
+            timed(latency, client.get, url, headers=headers)
+        result[name] = latency.summary()
+    return result
+
+
+class StubBackendHandler(BaseHTTPRequestHandler):
+    """분석 대상 Spring 서버 대신 고정 크기 JSON 을 돌려주는 백엔드"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # 헤더 / 본문을 따로 보낼 때 delayed ACK 로 40ms 씩 늦어지지 않도록
+    body = json.dumps({"result": "ok", "data": "x" * RESPONSE_BYTES}).encode("utf-8")
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        request_id = self.headers.get("X-Request-ID")
+        if request_id:
+            self.send_header("X-Request-ID", request_id)
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass  # 요청마다 stderr 에 찍지 않음
+
+
+def drive_load(port, total, concurrency):
+    """concurrency 개의 keep-alive 연결로 total 개 요청 -> (지연 히스토그램, 초당 요청 수, 에러 수)"""
+    latency = LatencyHistogram()
+    lock = threading.Lock()
+    errors = [0]
+
+    def worker(count, worker_no):
+        connection = http.client.HTTPConnection("localhost", port, timeout=30)
+        for i in range(count):
+            started = time.perf_counter()
+            try:
+                connection.request("GET", f"/api/login/selectLogin?seq={i}",
+                                   headers={"X-Request-ID": f"bench-{worker_no}-{i}"})
+                connection.getresponse().read()
+            except (OSError, http.client.HTTPException):
+                with lock:
+                    errors[0] += 1
+                connection.close()
+                connection = http.client.HTTPConnection("localhost", port, timeout=30)
+                continue
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                latency.record(elapsed)
+        connection.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        per_worker = total // concurrency
+        list(executor.map(worker, [per_worker] * concurrency, range(concurrency)))
+    return latency, rate(latency.count, time.perf_counter() - started), errors[0]
+
+
+def wait_for_port(port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("localhost", port), timeout=0.5).close()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def bench_http(ctx):
+    args = ctx.args
+    server = ThreadingHTTPServer(("localhost", args.backend_port), StubBackendHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="bench_backend", daemon=True).start()
+    result = {}
+    try:
+        latency, rps, errors = drive_load(args.backend_port, args.http_requests, args.concurrency)
+        result["direct"] = {"latency_ms": latency.summary(), "rps": rps, "errors": errors}
+
+        mitmdump = shutil.which("mitmdump")
+        if mitmdump is None:
+            result["proxied"] = {"skipped": "mitmdump 실행 파일 없음"}
+            return result
+        proxy = subprocess.Popen([mitmdump, "--mode", f"reverse:http://localhost:{args.backend_port}",
+                                  "-p", str(args.proxy_port), "-q", "-s", os.path.join(REPO_DIR, "http_sniffer.py")],
+                                 cwd=os.getcwd(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            if not wait_for_port(args.proxy_port, 15):
+                result["proxied"] = {"skipped": "mitmdump 가 시작되지 않음"}
+                return result
+            latency, rps, errors = drive_load(args.proxy_port, args.http_requests, args.concurrency)
+            result["proxied"] = {"latency_ms": latency.summary(), "rps": rps, "errors": errors}
+        finally:
+            proxy.terminate()
+            try:
+                proxy.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proxy.kill()
+
+        direct, proxied = result["direct"]["latency_ms"], result["proxied"]["latency_ms"]
+        result["overhead_p50_ms"] = round(proxied["p50"] - direct["p50"], 3)
+        result["overhead_p99_ms"] = round(proxied["p99"] - direct["p99"], 3)
+        # http_sniffer 가 종료 시 기록한 훅 처리 시간 (요청당 평균)
+        try:
+            with open("http_stats.json", "r", encoding="utf-8") as f:
+                result["sniffer_hook_ms"] = json.load(f).get("proxy_overhead_ms")
+        except (OSError, json.JSONDecodeError):
+            pass
+    finally:
+        server.shutdown()
+        server.server_close()
+    return result
+
+
+BENCHMARKS = {
+    "parse": bench_parse,
+    "store": bench_store,
+    "tail": bench_tail,
+    "index": bench_index,
+    "rollup": bench_rollup,
+    "sql": bench_sql,
+    "graph": bench_graph,
+    "dashboard": bench_dashboard,
+    "http": bench_http,
+}
+
+
+# ---- 결과 저장 / 비교 ----
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "commit": commit}
+
+
+def flatten(data, prefix=""):
+    """중첩 dict -> {"stage.metric.p50": 값} (숫자만)"""
+    items = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            items.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            items[name] = value
+    return items
+
+
+def higher_is_better(name):
+    return "per_sec" in name or name.endswith(".rps") or name.endswith("_ratio")
+
+
+def compare(previous, current, threshold=REGRESSION_THRESHOLD):
+    """같은 지표끼리 변화율 출력, 성능 저하 지표 수 반환 (처리량은 줄면, 시간/지연은 늘면 저하)"""
+    before = flatten(previous.get("stages", {}))
+    after = flatten(current.get("stages", {}))
+    regressions = 0
+    print(f"\n### 이전 결과와 비교 (기준 {threshold:g}%, 이전 commit: {previous.get('environment', {}).get('commit')})")
+    for name in sorted(set(before) & set(after)):
+        if not ("per_sec" in name or name.endswith(("_ms", ".p50", ".p95", ".p99", ".mean", ".rps"))):
+            continue
+        old, new = before[name], after[name]
+        if not old:
+            continue
+        change = (new - old) / abs(old) * 100
+        worse = -change if higher_is_better(name) else change
+        mark = ""
+        if worse > threshold:
+            mark = "  <-- 저하"
+            regressions += 1
+        elif worse < -threshold:
+            mark = "  (개선)"
+        print(f"  {name:<50} {old:>14,.3f} -> {new:>14,.3f} ({change:+.1f}%){mark}")
+    return regressions
+
+
+def print_results(results):
+    for stage, metrics in results["stages"].items():
+        print(f"\n[{stage}]")
+        for name, value in flatten(metrics).items():
+            print(f"  {name:<45} {value:,.3f}" if isinstance(value, float) else f"  {name:<45} {value:,}")
+        for name, value in metrics.items():
+            if isinstance(value, dict) and "skipped" in value:
+                print(f"  {name:<45} 건너뜀: {value['skipped']}")
+        if "skipped" in metrics:
+            print(f"  건너뜀: {metrics['skipped']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="분석기 단계별 처리량 / 지연 벤치마크")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"실행할 단계 (기본: {','.join(STAGES)})")
+    parser.add_argument("--lines", type=int, default=200_000, help="parse/store/index/rollup/graph 에 쓸 로그 라인 수")
+    parser.add_argument("--concurrency", type=int, default=20, help="동시 요청(스레드) 수 - 로그 생성 / HTTP 부하 공통")
+    parser.add_argument("--noise-ratio", type=float, default=0.9, help="패턴에 걸리지 않는 일반 로그 비율")
+    parser.add_argument("--rate", type=int, default=20_000, help="tail 단계 로그 쓰기 속도 (lines/s)")
+    parser.add_argument("--duration", type=float, default=10.0, help="tail 단계 측정 시간 (초)")
+    parser.add_argument("--http-requests", type=int, default=HTTP_REQUESTS)
+    parser.add_argument("--backend-port", type=int, default=BACKEND_PORT)
+    parser.add_argument("--proxy-port", type=int, default=PROXY_PORT)
+    parser.add_argument("--output", default="bench_results.json", help="결과 JSON 파일")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON 파일")
+    parser.add_argument("--keep", action="store_true", help="임시 작업 폴더를 지우지 않음")
+    args = parser.parse_args()
+
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = [stage for stage in stages if stage not in BENCHMARKS]
+    if unknown:
+        parser.error(f"알 수 없는 단계: {', '.join(unknown)}")
+
+    output_path = os.path.abspath(args.output)
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+    work_dir = tempfile.mkdtemp(prefix="spring_analyze_bench_")
+    original_dir = os.getcwd()
+    os.chdir(work_dir)  # 모듈 기본 경로(저장소, 색인, 캐시)가 모두 임시 폴더를 가리키도록
+    print(f"### 작업 폴더: {work_dir}")
+
+    ctx = Context(args)
+    results = {"created": time.time(), "environment": environment(),
+               "args": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+               "stages": {}}
+    try:
+        for stage in stages:
+            print(f"### [{stage}] 측정 중...")
+            started = time.perf_counter()
+            results["stages"][stage] = BENCHMARKS[stage](ctx)
+            results["stages"][stage]["stage_seconds"] = round(time.perf_counter() - started, 3)
+    finally:
+        os.chdir(original_dir)
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print_results(results)
+    print(f"\n### 결과 저장: {output_path}")
+
+    if compare_path:
+        with open(compare_path, "r", encoding="utf-8") as f:
+            regressions = compare(json.load(f), results)
+        print(f"### 성능 저하 지표 {regressions}개")
+        sys.exit(1 if regressions else 0)
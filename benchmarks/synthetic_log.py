@@ -0,0 +1,153 @@
+# 벤치마크용 가짜 Spring 로그 생성기
+# 목표 : log_classifier 패턴이 기대하는 controller / service / dao / SQL_ID: 형식의 로그를 원하는 양만큼 생성
+# 방법 : 요청 하나마다 Controller -> Service -> DAO -> SQL 라인을 만들고, 사이사이에 매칭되지 않는 일반 로그를 섞음
+#        (실제 로그처럼 대부분의 라인은 아무 패턴에도 걸리지 않도록 noise_ratio 로 비율 조정)
+#        generate_interleaved_lines / iter_interleaved_lines : 동시 요청이 섞이고 시각이 흐르는 로그 (bench_pipeline 용)
+#        timing=True 면 SQL 마다 log4jdbc 처럼 sqlonly + sqltiming({executed in N msec}) 두 줄을 찍고,
+#        n_plus_one_ratio 비율의 요청은 목록 조회 뒤 항목마다 같은 상세 조회를 반복(N+1)
+
+import random
+from datetime import datetime
+
+CONTROLLERS = ["LoginController", "MenuController", "BoardController", "UserController", "OrderController"]
+DOMAINS = ["login", "menu", "board", "user", "order"]
+QUERY_TYPES = ["SELECT", "UPDATE", "INSERT", "DELETE"]
+THREADS = [f"http-nio-8082-exec-{i}" for i in range(1, 11)]
+
+NOISE_LINES = [
+    "DEBUG [org.springframework.web.servlet.DispatcherServlet] Completed 200 OK",
+    "DEBUG [org.mybatis.spring.SqlSessionUtils] Creating a new SqlSession",
+    "INFO  [org.apache.catalina.core.ContainerBase] Initializing Spring FrameworkServlet",
+    "DEBUG [jdbc.resultsettable] |-----------|-----------|-----------|",
+    "DEBUG [jdbc.resultsettable] |USER_ID    |USER_NM    |USE_YN     |",
+    "DEBUG [org.springframework.jdbc.datasource.DataSourceUtils] Fetching JDBC Connection from DataSource",
+    "TRACE [org.springframework.beans.factory.support.DefaultListableBeanFactory] Returning cached instance",
+]
+
+
+# N+1 요청에서 상세 조회를 반복하는 횟수 범위
+N_PLUS_ONE_REPEATS = (5, 30)
+
+
+def _timestamp(seq):
+    seconds = seq // 1000
+    return f"2025-03-10 {10 + seconds // 3600 % 10:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d},{seq % 1000:03d}"
+
+
+def request_lines(rng, seq):
+    """요청 하나에 해당하는 Controller -> Service -> DAO -> SQL 라인 목록"""
+    index = rng.randrange(len(CONTROLLERS))
+    domain = DOMAINS[index]
+    thread = rng.choice(THREADS)
+    prefix = f"{_timestamp(seq)} DEBUG [{thread}]"
+    method = rng.choice(["select", "update", "list", "detail"]) + domain.capitalize()
+
+    lines = [
+        f"{prefix} [efc.i.sc.co.controller.{CONTROLLERS[index]}] request start",
+        f"{prefix} [efc.i.sc.co.{domain}.{domain.capitalize()}Service.{method}] ===START===",
+        f"{prefix} [efc.i.sc.co.{domain}.{domain.capitalize()}Dao.{method}] ===START===",
+    ]
+    for _ in range(rng.randint(1, 3)):
+        query_type = rng.choice(QUERY_TYPES)
+        lines.append(f"{prefix} [jdbc.sqlonly] {query_type} /* SQL_ID: efc.i.sc.co.{domain}.{domain.capitalize()}Mapper.{method} */ ...")
+    return lines
+
+
+def generate_lines(count, noise_ratio=0.9, seed=42):
+    """count 개의 로그 라인을 생성 (끝에 개행 포함)"""
+    rng = random.Random(seed)
+    lines = []
+    seq = 0
+    while len(lines) < count:
+        if rng.random() < noise_ratio:
+            lines.append(f"{_timestamp(seq)} {rng.choice(NOISE_LINES)}\n")
+        else:
+            lines.extend(line + "\n" for line in request_lines(rng, seq))
+        seq += 1
+    return lines[:count]
+
+
+# ---- 동시 요청이 섞인 로그 (end-to-end 벤치마크용) ----
+# 실제 Tomcat 로그처럼 여러 스레드의 요청 라인이 섞이고, 라인마다 시각이 흐르며, MDC 요청 ID 가 찍힘
+# Controller 라인은 log_classifier 가 클래스 / 메서드를 모두 뽑을 수 있도록 [패키지.XxxController.메서드] 형식
+
+_second_cache = {}
+
+
+def _format_epoch(epoch):
+    second = int(epoch)
+    prefix = _second_cache.get(second)
+    if prefix is None:
+        if len(_second_cache) > 4096:
+            _second_cache.clear()
+        prefix = _second_cache[second] = datetime.fromtimestamp(second).strftime("%Y-%m-%d %H:%M:%S")
+    return f"{prefix},{int((epoch - second) * 1000):03d}"
+
+
+def _sql_bodies(rng, query_type, sql_id, timing):
+    body = f"[jdbc.sqlonly] {query_type} /* SQL_ID: {sql_id} */ ..."
+    if not timing:
+        return [body]
+    elapsed = int(rng.lognormvariate(1.0, 1.2))  # 대부분 수 ms, 가끔 수십~수백 ms
+    return [body, f"[jdbc.sqltiming] {query_type} /* SQL_ID: {sql_id} */ ... {{executed in {elapsed} msec}}"]
+
+
+def request_bodies(rng, max_queries=3, timing=False, n_plus_one_ratio=0.0):
+    """요청 하나의 로그 본문 목록 (Controller -> Service -> DAO -> SQL 여러 개 -> DAO / Service 종료)"""
+    index = rng.randrange(len(CONTROLLERS))
+    domain = DOMAINS[index]
+    package = f"efc.i.sc.co.{domain}"
+    method = rng.choice(["select", "update", "list", "detail"]) + domain.capitalize()
+    bodies = [
+        f"[{package}.{CONTROLLERS[index]}.{method}] request start",
+        f"[{package}.{domain.capitalize()}Service.{method}] ===START===",
+        f"[{package}.{domain.capitalize()}Dao.{method}] ===START===",
+    ]
+    for _ in range(rng.randint(1, max_queries)):
+        query_type = rng.choice(QUERY_TYPES)
+        bodies.extend(_sql_bodies(rng, query_type, f"{package}.{domain.capitalize()}Mapper.{method}", timing))
+    if n_plus_one_ratio and rng.random() < n_plus_one_ratio:
+        # 목록의 항목마다 상세 조회 (N+1)
+        detail_id = f"{package}.{domain.capitalize()}Mapper.detail{domain.capitalize()}Item"
+        for _ in range(rng.randint(*N_PLUS_ONE_REPEATS)):
+            bodies.extend(_sql_bodies(rng, "SELECT", detail_id, timing))
+    bodies.append(f"[{package}.{domain.capitalize()}Dao.{method}] ===END===")
+    bodies.append(f"[{package}.{domain.capitalize()}Service.{method}] ===END===")
+    return bodies
+
+
+def iter_interleaved_lines(concurrency=10, noise_ratio=0.9, step_ms=1.0, seed=42, start=None, clock=None,
+                           timing=False, n_plus_one_ratio=0.0):
+    """concurrency 개 스레드의 요청 라인이 섞인 로그 라인을 끝없이 생성 (끝에 개행 포함)
+
+    clock 이 있으면 라인 시각은 clock() (실시간 부하 생성), 없으면 start(기본 2025-03-10 10:00:00)부터
+    라인마다 평균 step_ms 씩 흐르는 가상 시각
+    """
+    rng = random.Random(seed)
+    threads = [f"http-nio-8082-exec-{i}" for i in range(1, concurrency + 1)]
+    pending = [[] for _ in threads]  # 스레드별 아직 찍지 않은 본문
+    request_ids = [None] * concurrency
+    epoch = start if start is not None else datetime(2025, 3, 10, 10, 0, 0).timestamp()
+    request_no = 0
+
+    while True:
+        epoch += rng.random() * 2 * step_ms / 1000
+        timestamp = _format_epoch(clock() if clock else epoch)
+        if rng.random() < noise_ratio:
+            yield f"{timestamp} {rng.choice(NOISE_LINES)}\n"
+            continue
+
+        slot = rng.randrange(concurrency)
+        if not pending[slot]:
+            request_no += 1
+            request_ids[slot] = f"r{seed}-{request_no}"
+            pending[slot] = request_bodies(rng, timing=timing, n_plus_one_ratio=n_plus_one_ratio)[::-1]
+        yield f"{timestamp} DEBUG [{threads[slot]}] [reqId={request_ids[slot]}] {pending[slot].pop()}\n"
+
+
+def generate_interleaved_lines(count, concurrency=10, noise_ratio=0.9, step_ms=1.0, seed=42, timing=False,
+                               n_plus_one_ratio=0.0):
+    """iter_interleaved_lines 의 앞 count 라인"""
+    lines = iter_interleaved_lines(concurrency, noise_ratio, step_ms, seed, timing=timing,
+                                   n_plus_one_ratio=n_plus_one_ratio)
+    return [next(lines) for _ in range(count)]
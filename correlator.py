@@ -0,0 +1,267 @@
+# HTTP 요청 <-> 백엔드 실행 흐름 연결 (UI -> Controller -> Service -> DAO -> SQL)
+# 목표 : http_sniffer 가 본 요청(URL, 메서드, 응답 시간)과 log_watcher 가 만든 실행 흐름을 하나의 기록으로 묶음
+# 방법 : 1) 요청 ID(X-Request-ID 헤더 <-> 로그의 MDC reqId 등)가 같으면 바로 연결
+#        2) 없으면 요청 시작~응답 시각(앞뒤 여유 포함) 안에서 시작한, 아직 연결되지 않은 가장 이른 흐름과 연결
+#        대기 중인 요청/흐름은 BUCKET_SECONDS 단위 시간 구간별로 보관 -> 새 요청/흐름마다 자기 구간만 확인 (전체를 다시 훑지 않음)
+#        개수와 대기 시간을 제한 (오래된 것부터 버림)
+# 결과 : {url, method, status, latency_ms, chain, flow} 형태의 연결 기록을 on_record 콜백으로 전달
+
+import bisect
+import heapq
+import threading
+import time
+from collections import OrderedDict
+
+# 요청 시각과 로그 시각의 허용 오차 (초)
+MATCH_SKEW = 0.5
+
+# 연결되지 않은 요청/흐름을 기다리는 최대 시간 (초) - 로그 처리 지연을 고려
+PENDING_TTL = 30.0
+
+# 대기 중인 요청/흐름 최대 개수
+MAX_PENDING_HTTP = 10000
+MAX_PENDING_FLOWS = 20000
+
+# 대기 목록에서 오래된 것을 정리하는 최소 간격 (초)
+SWEEP_INTERVAL = 0.5
+
+# 대기 중인 요청/흐름을 나눠 담는 시간 구간 크기 (초) - 새 요청/흐름은 자기 시각이 걸친 구간만 확인
+BUCKET_SECONDS = 1.0
+
+
+CHAIN_LABELS = {"controller": "Controller", "service": "Service", "dao": "DAO", "sql": "SQL"}
+
+
+def _describe_tree(node, chain):
+    if node["layer"] == "sql":
+        text = f'SQL: {node.get("query_type")} {node.get("class")}.{node.get("method")}'
+    else:
+        text = f'{CHAIN_LABELS[node["layer"]]}: {node.get("class")}.{node.get("method")}'
+    if node["layer"] != "sql" and node.get("duration_ms"):
+        text += f' ({node["duration_ms"]} ms)'
+    chain.append(text)
+    for child in node.get("children", ()):
+        _describe_tree(child, chain)
+
+
+def describe_chain(flow):
+    """흐름을 Controller -> Service -> DAO -> SQL 문자열 목록으로 변환 (호출 트리가 있으면 모든 호출을 호출 순서대로)"""
+    chain = []
+    if flow.get("tree"):
+        _describe_tree(flow["tree"], chain)
+        return chain
+    if flow.get("controller"):
+        chain.append(f'Controller: {flow["controller"].get("class")}.{flow["controller"].get("function")}')
+    if flow.get("service"):
+        chain.append(f'Service: {flow["service"].get("class")}.{flow["service"].get("method")}')
+    if flow.get("dao"):
+        chain.append(f'DAO: {flow["dao"].get("class")}.{flow["dao"].get("method")}')
+    for sql in flow.get("sql", []):
+        chain.append(f'SQL: {sql.get("query_type")} {sql.get("class")}.{sql.get("method")}')
+    return chain
+
+
+class RequestCorrelator:
+    def __init__(self, on_record, skew=MATCH_SKEW, ttl=PENDING_TTL,
+                 max_pending_http=MAX_PENDING_HTTP, max_pending_flows=MAX_PENDING_FLOWS):
+        self.on_record = on_record
+        self.skew = skew
+        self.ttl = ttl
+        self.max_pending_http = max_pending_http
+        self.max_pending_flows = max_pending_flows
+
+        self._lock = threading.Lock()
+        self._http = OrderedDict()  # http id -> 요청 기록 (도착 순서)
+        self._http_buckets = {}  # 시간 구간 번호 -> 매칭 구간이 그 구간에 걸친 대기 요청 목록 (도착 순서)
+        self._http_by_request_id = {}
+        self._flow_buckets = {}  # 시간 구간 번호 -> [(시작 시각, 순번, 흐름), ...] (시각 순 정렬)
+        self._flow_keys = []  # 흐름이 있는 구간 번호 heap (오래된 구간부터 정리)
+        self._flows_by_request_id = {}  # 요청 ID -> 흐름 항목
+        self._flow_count = 0
+        self._flow_seq = 0
+        self._last_sweep = 0.0
+
+        self.matched_by_id = 0
+        self.matched_by_time = 0
+        self.unmatched_http = 0
+        self.dropped_flows = 0
+
+    # ---- 입력 ----
+    def add_http(self, record):
+        """http_sniffer 가 보낸 요청 기록 (started/ended 는 epoch 초)"""
+        with self._lock:
+            if not self._match_http(record):
+                self._add_pending_http(record)
+                while len(self._http) > self.max_pending_http:
+                    self._expire_http(self._remove_http(next(iter(self._http.values()))))
+            self._sweep()
+
+    def add_flows(self, flows):
+        with self._lock:
+            for flow in flows:
+                if flow.get("controller") is None:
+                    continue
+                # 대기 중인 요청에는 구간 안의 흐름이 없다는 것이 유지되므로 새 흐름이 구간에 들어오는 요청만 확인하면 됨
+                if not self._match_flow(flow):
+                    self._add_flow(flow)
+            while self._flow_count > self.max_pending_flows:
+                self._remove_flow(self._oldest_flow())
+                self.dropped_flows += 1
+            self._sweep()
+
+    # ---- 대기 목록 ----
+    def _window(self, record):
+        return record["started"] - self.skew, record["ended"] + self.skew
+
+    def _bucket_range(self, low, high):
+        return range(int(low // BUCKET_SECONDS), int(high // BUCKET_SECONDS) + 1)
+
+    def _add_pending_http(self, record):
+        self._http[record["id"]] = record
+        for key in self._bucket_range(*self._window(record)):
+            self._http_buckets.setdefault(key, []).append(record)
+        if record.get("request_id"):
+            self._http_by_request_id.setdefault(record["request_id"], record)  # 같은 ID 면 먼저 온 요청부터
+
+    def _remove_http(self, record):
+        del self._http[record["id"]]
+        for key in self._bucket_range(*self._window(record)):
+            bucket = self._http_buckets[key]
+            bucket.remove(record)
+            if not bucket:
+                del self._http_buckets[key]
+        if record.get("request_id") and self._http_by_request_id.get(record["request_id"]) is record:
+            del self._http_by_request_id[record["request_id"]]
+        return record
+
+    def _add_flow(self, flow):
+        timestamp = flow.get("timestamp") or time.time()
+        key = int(timestamp // BUCKET_SECONDS)
+        bucket = self._flow_buckets.get(key)
+        if bucket is None:
+            bucket = self._flow_buckets[key] = []
+            heapq.heappush(self._flow_keys, key)
+        self._flow_seq += 1
+        entry = (timestamp, self._flow_seq, flow)
+        bisect.insort(bucket, entry)  # 구간 하나의 흐름만 정렬하므로 작음 (대부분 끝에 추가)
+        self._flow_count += 1
+        if flow.get("request_id"):
+            self._flows_by_request_id[flow["request_id"]] = entry
+
+    def _remove_flow(self, entry):
+        timestamp, _, flow = entry
+        key = int(timestamp // BUCKET_SECONDS)
+        bucket = self._flow_buckets[key]
+        bucket.remove(entry)
+        if not bucket:
+            del self._flow_buckets[key]  # heap 의 번호는 꺼낼 때 정리
+        self._flow_count -= 1
+        if flow.get("request_id") and self._flows_by_request_id.get(flow["request_id"]) is entry:
+            del self._flows_by_request_id[flow["request_id"]]
+        return flow
+
+    def _oldest_key(self):
+        # 비어서 지워진 구간 번호는 건너뜀
+        while self._flow_keys and self._flow_keys[0] not in self._flow_buckets:
+            heapq.heappop(self._flow_keys)
+        return self._flow_keys[0] if self._flow_keys else None
+
+    def _oldest_flow(self):
+        return self._flow_buckets[self._oldest_key()][0]
+
+    # ---- 매칭 ----
+    def _match_http(self, record):
+        # 1) 요청 ID 로 연결
+        request_id = record.get("request_id")
+        if request_id and request_id in self._flows_by_request_id:
+            self._emit(record, self._remove_flow(self._flows_by_request_id[request_id]), "request_id")
+            self.matched_by_id += 1
+            return True
+
+        # 2) 시간 구간으로 연결 : [시작 - skew, 응답 + skew] 안에서 시작한 가장 이른 흐름
+        low, high = self._window(record)
+        keys = self._bucket_range(low, high)
+        if len(keys) > len(self._flow_buckets):
+            keys = sorted(key for key in self._flow_buckets if keys.start <= key < keys.stop)
+        for key in keys:
+            for entry in self._flow_buckets.get(key, ()):
+                timestamp, _, flow = entry
+                if timestamp < low or timestamp > high:
+                    continue
+                if flow.get("request_id") and request_id and flow["request_id"] != request_id:
+                    continue  # 다른 요청 ID 가 찍힌 흐름은 건너뜀
+                self._emit(record, self._remove_flow(entry), "time")
+                self.matched_by_time += 1
+                return True
+        return False
+
+    def _match_flow(self, flow):
+        # 새 흐름과 연결될 대기 요청 찾기 (요청 ID 가 같은 요청 -> 구간 안에 시작 시각이 들어가는 가장 먼저 온 요청)
+        request_id = flow.get("request_id")
+        if request_id and request_id in self._http_by_request_id:
+            self._emit(self._remove_http(self._http_by_request_id[request_id]), flow, "request_id")
+            self.matched_by_id += 1
+            return True
+
+        timestamp = flow.get("timestamp") or time.time()
+        for record in self._http_buckets.get(int(timestamp // BUCKET_SECONDS), ()):
+            low, high = self._window(record)
+            if timestamp < low or timestamp > high:
+                continue
+            if request_id and record.get("request_id") and record["request_id"] != request_id:
+                continue
+            self._emit(self._remove_http(record), flow, "time")
+            self.matched_by_time += 1
+            return True
+        return False
+
+    def _sweep(self):
+        # 오래된 요청/흐름 정리 (요청은 도착 순서, 흐름은 시간 구간 순서라 앞에서부터 지난 것만 봄)
+        now = time.time()
+        if now - self._last_sweep < SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+
+        while self._http:
+            record = next(iter(self._http.values()))
+            if now - record["ended"] <= self.ttl:
+                break
+            self._expire_http(self._remove_http(record))
+
+        deadline = now - self.ttl
+        while True:
+            key = self._oldest_key()
+            if key is None or (key + 1) * BUCKET_SECONDS > deadline:
+                break
+            for entry in list(self._flow_buckets[key]):
+                self._remove_flow(entry)
+
+    def _expire_http(self, record):
+        # 끝내 흐름을 찾지 못한 요청도 기록은 남김 (정적 리소스 등)
+        self.unmatched_http += 1
+        self._emit(record, None, None)
+
+    def _emit(self, record, flow, matched_by):
+        self.on_record({
+            "url": record.get("url"),
+            "method": record.get("method"),
+            "status": record.get("status"),
+            "latency_ms": record.get("latency_ms"),
+            "started": record.get("started"),
+            "request_id": record.get("request_id") or (flow or {}).get("request_id"),
+            "thread": (flow or {}).get("thread"),
+            "matched_by": matched_by,
+            "chain": describe_chain(flow) if flow else [],
+            "flow": flow,
+        })
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending_http": len(self._http),
+                "pending_flows": self._flow_count,
+                "matched_by_id": self.matched_by_id,
+                "matched_by_time": self.matched_by_time,
+                "unmatched_http": self.unmatched_http,
+                "dropped_flows": self.dropped_flows,
+            }
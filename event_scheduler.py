@@ -0,0 +1,91 @@
+# watchdog 이벤트 묶음 처리 스케줄러
+# 목표 : log4j flush 마다 수백 번씩 들어오는 modified 이벤트마다 같은 작업(재읽기, 그래프 렌더링)을 반복하지 않도록 함
+# 방법 : 이벤트가 오면 표시만 해두고(notify), 전용 worker 스레드가 window 동안 이벤트를 모은 뒤 한 번만 작업 실행
+#        작업 사이 간격은 min_interval 이상으로 제한 -> 처리 횟수 상한
+# 결과 : observer 스레드는 절대 막히지 않고, 받은 이벤트 수 / 실제 처리 횟수를 stats() 로 확인 가능
+
+import threading
+import time
+
+from metrics import registry
+
+
+class CoalescingScheduler:
+    def __init__(self, work, window=0.2, min_interval=1.0, name="scheduler"):
+        self.work = work  # 실제 처리 함수 (인자 없음)
+        self.window = window  # 첫 이벤트 이후 추가 이벤트를 모으는 시간(초)
+        self.min_interval = min_interval  # 작업 시작 간 최소 간격(초)
+        self.name = name
+
+        self.events_received = 0
+        self.batches_processed = 0
+        self.errors = 0
+        self.last_duration = 0.0
+
+        self._pending = threading.Event()
+        self._stopping = threading.Event()
+        self._last_run = 0.0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+        # 자체 계측 : 받은 이벤트 / 처리 횟수 / 처리 대기 여부 / 처리 시간
+        registry.counter("scheduler_events_received_total", "받은 변경 이벤트 수",
+                         func=lambda: self.events_received, scheduler=name)
+        registry.counter("scheduler_batches_total", "실제로 작업을 실행한 횟수",
+                         func=lambda: self.batches_processed, scheduler=name)
+        registry.gauge("scheduler_pending", "처리를 기다리는 이벤트가 있으면 1",
+                       func=lambda: int(self._pending.is_set()), scheduler=name)
+        self._work_ms = registry.histogram("scheduler_work_ms", "작업 한 번 실행 시간 (ms)", scheduler=name)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def notify(self):
+        """이벤트 발생 알림 (observer 스레드에서 호출, 바로 반환)"""
+        self.events_received += 1
+        self._pending.set()
+
+    def _run_once(self):
+        self._pending.clear()  # 작업 중 들어온 이벤트는 다음 배치로 처리
+        self._last_run = time.monotonic()
+        try:
+            self.work()
+        except Exception as e:
+            self.errors += 1
+            print(f"### [{self.name}] 처리 중 오류 발생: {e}")
+        self.last_duration = time.monotonic() - self._last_run
+        self._work_ms.record(self.last_duration * 1000)
+        self.batches_processed += 1
+
+    def _run(self):
+        while not self._stopping.is_set():
+            # 종료 요청을 놓치지 않도록 짧게 나눠서 대기
+            if not self._pending.wait(0.5):
+                continue
+
+            # window 동안 들어오는 이벤트는 한 번에 처리
+            self._stopping.wait(self.window)
+
+            # 처리 횟수 상한 : 직전 작업 시작 후 min_interval 이 지나야 다시 실행
+            remaining = self._last_run + self.min_interval - time.monotonic()
+            if remaining > 0:
+                self._stopping.wait(remaining)
+            if self._stopping.is_set():
+                break
+
+            self._run_once()
+
+    def stop(self, flush=True, timeout=None):
+        """worker 스레드 종료, flush=True 면 아직 처리하지 않은 이벤트를 마지막으로 한 번 처리"""
+        self._stopping.set()
+        self._thread.join(timeout)
+        if flush and self._pending.is_set() and not self._thread.is_alive():
+            self._run_once()
+
+    def stats(self):
+        return {
+            "events_received": self.events_received,
+            "batches_processed": self.batches_processed,
+            "errors": self.errors,
+            "last_duration": round(self.last_duration, 4),
+        }
@@ -0,0 +1,275 @@
+# 로그 이벤트 -> 실행 흐름(호출 트리) 조립 (log_watcher / pipeline / log_ingest / batch_analyze 공용)
+# 목표 : 동시에 처리되는 여러 Tomcat 스레드의 로그가 섞여 있어도 라인을 올바른 요청에 붙이고
+#        Service -> 여러 DAO -> 여러 SQL 처럼 한 요청 안의 모든 호출을 빠짐없이 남김
+# 방법 : 1) 요청 ID(MDC) 또는 스레드 이름을 키로 요청별 진행 중 흐름을 따로 관리 (둘 다 없으면 하나의 흐름으로 처리)
+#        2) 흐름마다 __slots__ 노드로 된 호출 트리와 열린 노드 스택을 유지
+#           새 노드는 스택에서 자기보다 상위 레이어(controller > service > dao > sql) 노드의 자식이 되고
+#           같은/하위 레이어 노드는 형제로 보고 닫음 (===END=== 태그가 있으면 그 노드를 바로 닫음)
+#        3) 노드 시간 = 시작 라인 시각 ~ 다음 형제가 시작되거나 마지막 하위 라인이 찍힌 시각
+#        4) 같은 키로 새 Controller 가 오거나, idle_timeout 동안 라인이 없으면 흐름 완료
+#        5) SQL 라인에 실행 시간이 찍혀 있으면 노드에 elapsed_ms 로 남김
+#           log4jdbc 처럼 같은 쿼리가 sqlonly(실행 전) + sqltiming(실행 후, 시간 포함) 두 줄로 찍히면 한 노드로 합침
+# 결과 : 기존 형식({"controller", "service", "dao", "sql", "timestamp", "thread", "request_id"})에
+#        "tree"(호출 트리, SQL 노드는 실행 시간이 있으면 "elapsed_ms" 포함), "duration_ms" 를 더한 흐름 dict
+#        ("service" / "dao" 는 첫 번째 호출, "sql" 은 모든 SQL 을 호출 순서대로 담음)
+
+# Trouble : 예전 temp_flow 는 레이어마다 칸이 하나라서 뒤의 Service/DAO 가 앞의 것을 덮어썼고
+#           다른 스레드의 라인도 다음 Controller 라인이 나올 때까지 모두 한 흐름에 섞였음
+
+import time
+from log_classifier import classify_line, parse_line_context
+
+# 이 시간(초) 동안 라인이 없는 흐름은 완료로 처리
+FLOW_IDLE_TIMEOUT = 5.0
+
+# 동시에 진행 중인 흐름 최대 개수 (넘으면 가장 오래 조용했던 흐름부터 완료 처리)
+MAX_OPEN_FLOWS = 10000
+
+# 레이어 깊이 (작을수록 상위)
+LAYER_RANK = {"controller": 0, "service": 1, "dao": 2, "sql": 3}
+
+# 노드를 닫는 태그 (===END=== 등)
+END_TAGS = {"END", "FINISH", "EXIT", "RETURN"}
+
+# 완료된 흐름이 없을 때 돌려주는 값 (라인마다 빈 리스트를 만들지 않도록)
+NO_FLOWS = ()
+
+
+class CallNode:
+    """호출 트리 노드 하나 (수많은 노드를 메모리에 들고 있으므로 __slots__ 사용)"""
+    __slots__ = ("layer", "class_name", "method", "detail", "start", "end", "children", "elapsed")
+
+    def __init__(self, layer, class_name, method, detail, start, elapsed=None):
+        self.layer = layer
+        self.class_name = class_name
+        self.method = method
+        self.detail = detail  # sql 은 쿼리 종류(SELECT 등)
+        self.start = start
+        self.end = start
+        self.children = []
+        self.elapsed = elapsed  # sql 라인에 찍힌 실행 시간 (ms, 없으면 None)
+
+    def to_dict(self, found=None):
+        """노드를 dict 로 변환 (found 가 있으면 레이어별로 만나는 노드를 호출 순서대로 모음)"""
+        if found is not None:
+            found[self.layer].append(self)
+        node = {
+            "layer": self.layer,
+            "class": self.class_name,
+            "method": self.method,
+            "start": self.start,
+            "duration_ms": round((self.end - self.start) * 1000, 3),
+            "children": [child.to_dict(found) for child in self.children] if self.children else [],
+        }
+        if self.layer == "sql":
+            node["query_type"] = self.detail
+            if self.elapsed is not None:
+                node["elapsed_ms"] = self.elapsed
+        return node
+
+
+class OpenFlow:
+    """진행 중인 흐름 (요청 하나)"""
+    __slots__ = ("root", "stack", "thread", "request_id", "last_seen", "position")
+
+    def __init__(self, root, thread, request_id, position=None):
+        self.root = root
+        self.stack = [root]  # 열린 노드 (root -> 현재 노드)
+        self.thread = thread
+        self.request_id = request_id
+        self.last_seen = root.start
+        self.position = position  # Controller 라인의 로그 위치 (LogTailer.line_position, checkpoint 용)
+
+    def touch(self, timestamp):
+        # 열린 상위 노드들의 끝 시각을 늘림
+        for node in self.stack:
+            if timestamp > node.end:
+                node.end = timestamp
+        if timestamp > self.last_seen:
+            self.last_seen = timestamp
+
+    def add(self, log_event, timestamp):
+        rank = LAYER_RANK[log_event.kind]
+        if log_event.detail and log_event.detail.upper() in END_TAGS and log_event.kind != "sql":
+            self.close_node(log_event, timestamp)
+            return
+        if log_event.elapsed_ms is not None and self._merge_timing(log_event, timestamp):
+            return
+
+        # 같은/하위 레이어 노드는 형제 -> 새 노드가 시작된 시각에 닫음
+        while len(self.stack) > 1 and LAYER_RANK[self.stack[-1].layer] >= rank:
+            self.stack.pop().end = timestamp
+        self.touch(timestamp)
+
+        node = CallNode(log_event.kind, log_event.class_name, log_event.method, log_event.detail, timestamp,
+                        log_event.elapsed_ms)
+        self.stack[-1].children.append(node)
+        self.stack.append(node)
+
+    def _merge_timing(self, log_event, timestamp):
+        # sqlonly 라인 뒤에 바로 온 같은 SQL_ID 의 sqltiming 라인 -> 새 노드 대신 실행 시간만 채움
+        node = self.stack[-1]
+        if node.layer != "sql" or node.elapsed is not None or node.class_name != log_event.class_name \
+                or node.method != log_event.method:
+            return False
+        node.elapsed = log_event.elapsed_ms
+        self.touch(timestamp)
+        return True
+
+    def close_node(self, log_event, timestamp):
+        # ===END=== : 같은 클래스/메서드의 열린 노드까지 닫음 (없으면 무시)
+        for index in range(len(self.stack) - 1, 0, -1):
+            node = self.stack[index]
+            if node.layer == log_event.kind and node.class_name == log_event.class_name \
+                    and node.method == log_event.method:
+                self.touch(timestamp)
+                del self.stack[index:]
+                return
+
+    def to_flow(self):
+        root = self.root
+        found = {"controller": [], "service": [], "dao": [], "sql": []}
+        tree = root.to_dict(found)
+        services = found["service"]
+        daos = found["dao"]
+
+        return {
+            "controller": {"class": root.class_name, "function": root.method},
+            "service": {"class": services[0].class_name, "method": services[0].method} if services else None,
+            "dao": {"class": daos[0].class_name, "method": daos[0].method} if daos else None,
+            "sql": [{"query_type": node.detail, "class": node.class_name, "method": node.method}
+                    for node in found["sql"]],
+            "timestamp": root.start,
+            "thread": self.thread,
+            "request_id": self.request_id,
+            "duration_ms": tree["duration_ms"],
+            "tree": tree,
+        }
+
+
+class FlowBuilder:
+    def __init__(self, idle_timeout=FLOW_IDLE_TIMEOUT, max_open_flows=MAX_OPEN_FLOWS, skip=None):
+        self.idle_timeout = idle_timeout
+        self.max_open_flows = max_open_flows
+        # 흐름 시작 위치 -> True 면 완료돼도 반환하지 않음 (재시작 후 이미 저장한 흐름을 다시 읽는 구간, LogTailer.replayed)
+        self.skip = skip
+        self._by_thread = {}  # 스레드 이름 -> OpenFlow
+        self._by_request = {}  # 요청 ID -> OpenFlow
+        self._open = {}  # id(OpenFlow) -> OpenFlow (진행 중인 전체 흐름)
+        self.latest_timestamp = 0.0  # 지금까지 본 가장 늦은 로그 시각
+        self._fed_at = time.monotonic()  # 마지막으로 이벤트를 받은 실제 시각 (expire_idle 용)
+        self._last_expire = 0.0  # 마지막으로 idle 흐름을 정리한 로그 시각
+        self.orphan_events = 0  # 진행 중인 흐름을 찾지 못해 버린 이벤트 수
+
+    @property
+    def open_flows(self):
+        return len(self._open)
+
+    def open_positions(self):
+        """진행 중인 흐름들의 시작 위치 (위치 없이 넣은 흐름은 제외)"""
+        return [open_flow.position for open_flow in self._open.values() if open_flow.position is not None]
+
+    def feed_line(self, line, position=None):
+        """라인 하나를 분류해서 반영하고 완료된 흐름 목록을 반환 (대부분의 라인은 빈 튜플)"""
+        log_event = classify_line(line)
+        if log_event is None:
+            return NO_FLOWS
+        return self.feed(log_event, line, position=position)
+
+    def feed(self, log_event, line=None, line_context=None, position=None):
+        """분류된 이벤트 하나를 반영하고 완료된 흐름 목록을 반환
+
+        - 같은 스레드/요청에 새 Controller 가 오면 이전 흐름 완료
+        - 로그 시각이 idle_timeout 만큼 지날 때마다 조용한 흐름도 완료 (실시간이 아닌 일괄 처리에서도 메모리 유지)
+        line 또는 미리 파싱한 line_context(다른 프로세스에서 분류한 경우)가 필요함
+        position 은 라인의 로그 위치 (Controller 라인이면 흐름 시작 위치로 남김)
+        """
+        if line_context is None:
+            line_context = parse_line_context(line)
+        timestamp = line_context.timestamp or time.time()
+        self._fed_at = time.monotonic()
+        if timestamp > self.latest_timestamp:
+            self.latest_timestamp = timestamp
+
+        completed = NO_FLOWS
+        if log_event.kind == "controller":
+            previous = self._find(line_context)
+            if previous is not None:
+                self._remove(previous)
+                completed = self._to_flows([previous])
+            root = CallNode("controller", log_event.class_name, log_event.method or "Unknown", None, timestamp)
+            self._register(OpenFlow(root, line_context.thread, line_context.request_id, position))
+        else:
+            open_flow = self._find(line_context)
+            if open_flow is None:
+                self.orphan_events += 1
+            else:
+                if open_flow.request_id is None and line_context.request_id:
+                    open_flow.request_id = line_context.request_id
+                    self._by_request[line_context.request_id] = open_flow
+                open_flow.add(log_event, timestamp)
+
+        if self.latest_timestamp - self._last_expire >= self.idle_timeout:
+            self._last_expire = self.latest_timestamp
+            expired = self.expire()
+            if expired:
+                completed = list(completed) + expired
+        return completed
+
+    def _find(self, line_context):
+        # 요청 ID 가 우선 (비동기 처리로 스레드가 바뀌어도 같은 요청), 없으면 스레드
+        if line_context.request_id and line_context.request_id in self._by_request:
+            return self._by_request[line_context.request_id]
+        return self._by_thread.get(line_context.thread)
+
+    def _register(self, open_flow):
+        self._open[id(open_flow)] = open_flow
+        self._by_thread[open_flow.thread] = open_flow
+        if open_flow.request_id:
+            self._by_request[open_flow.request_id] = open_flow
+
+    def _remove(self, open_flow):
+        del self._open[id(open_flow)]
+        if self._by_thread.get(open_flow.thread) is open_flow:
+            del self._by_thread[open_flow.thread]
+        if open_flow.request_id and self._by_request.get(open_flow.request_id) is open_flow:
+            del self._by_request[open_flow.request_id]
+
+    def expire(self, now=None):
+        """now(기본값은 가장 늦은 로그 시각) 기준으로 idle_timeout 동안 조용한 흐름을 완료 처리해서 반환"""
+        if now is None:
+            now = self.latest_timestamp
+        deadline = now - self.idle_timeout
+        idle = [open_flow for open_flow in self._open.values() if open_flow.last_seen <= deadline]
+
+        # 너무 많이 쌓였으면 오래 조용했던 흐름부터 추가로 완료
+        overflow = len(self._open) - len(idle) - self.max_open_flows
+        if overflow > 0:
+            active = sorted((open_flow for open_flow in self._open.values() if open_flow.last_seen > deadline),
+                            key=lambda open_flow: open_flow.last_seen)
+            idle.extend(active[:overflow])
+        return self._complete(idle)
+
+    def expire_idle(self):
+        """실시간 tail 용 idle 정리 - 마지막 로그 시각에 마지막 라인 이후 실제로 흐른 시간을 더한 시각 기준
+
+        밀린 로그 / 재시작 후 다시 읽는 중에는 라인이 계속 들어오므로 로그 시각 그대로 비교하고(진행 중인 흐름을 닫지 않음)
+        로그가 조용해지면 실제로 idle_timeout 이 지난 뒤 완료 처리 (time.time() 과 직접 비교하지 않으므로 시계 차이와 무관)
+        """
+        return self.expire(self.latest_timestamp + time.monotonic() - self._fed_at)
+
+    def finish(self):
+        """진행 중인 모든 흐름을 완료 처리해서 반환 (파일 끝 / 종료 시)"""
+        return self._complete(list(self._open.values()))
+
+    def _complete(self, open_flows):
+        open_flows.sort(key=lambda open_flow: open_flow.root.start)
+        for open_flow in open_flows:
+            self._remove(open_flow)
+        return self._to_flows(open_flows)
+
+    def _to_flows(self, open_flows):
+        if self.skip is None:
+            return [open_flow.to_flow() for open_flow in open_flows]
+        return [open_flow.to_flow() for open_flow in open_flows
+                if open_flow.position is None or not self.skip(open_flow.position)]
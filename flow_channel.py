@@ -0,0 +1,194 @@
+# 실행 흐름 실시간 전달 채널 (log_watcher -> web_dashboard)
+# 목표 : 대시보드가 polling 없이 새 실행 흐름을 바로 받을 수 있도록 함
+# 방법 : log_watcher(흐름) / http_sniffer(HTTP 요청) 는 FlowPublisher 로 로컬 소켓(multiprocessing.connection)에 보내고
+#        web_dashboard 는 serve_channel() 로 받아서 FlowBroadcaster 가 접속한 SSE 클라이언트들에게 나눠줌
+#        메시지는 {"type": "flows" | "http" | ..., ...} 형태의 dict
+#        - 최근 이벤트는 replay 버퍼에 남겨서 재접속한 클라이언트(Last-Event-ID)에게 다시 보내줌
+#        - 구독자별 큐가 가득 차면(느린 클라이언트) 연결을 끊어서 재접속 + replay 로 따라오게 함
+# 결과 : 로그 한 줄이 기록된 뒤 1초 안에 대시보드에 표시됨
+
+# Trouble : Windows 에서도 동작해야 하므로 Unix socket 대신 127.0.0.1 TCP + authkey 사용
+#           대시보드가 꺼져 있어도 log_watcher 가 막히지 않도록 보내는 쪽은 별도 스레드 + 버리는 큐로 처리
+# Trouble : 채널은 받은 메시지를 pickle 로 복원하는데 인증키가 소스코드에 고정되어 있어서
+#           같은 PC 의 아무 사용자나 인증 후 pickle 을 보내 대시보드 프로세스에서 코드를 실행할 수 있었음
+# 해결방법 : 인증키를 실행마다 secrets 로 새로 만들어 환경 변수(CHANNEL_AUTHKEY_ENV)로 자식 프로세스에 전달
+#           (main.py / supervisor 가 자식을 실행하기 전에 만듦, 모듈을 따로 실행할 때는 같은 값을 직접 설정해야 함)
+
+import os
+import queue
+import secrets
+import threading
+import time
+from collections import deque
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+# 채널 주소 (로컬 전용) / 인증키를 전달하는 환경 변수
+CHANNEL_ADDRESS = ("127.0.0.1", 6001)
+CHANNEL_AUTHKEY_ENV = "SPRING_ANALYZE_CHANNEL_KEY"
+
+# 보내는 쪽 대기 큐 크기 (넘치면 버림 -> 대시보드는 /data 로 따라잡음)
+PUBLISH_QUEUE_SIZE = 1000
+
+# 재접속 클라이언트를 위해 남겨두는 최근 이벤트 수
+REPLAY_BUFFER_SIZE = 500
+
+# 구독자(SSE 연결)별 대기 큐 크기
+SUBSCRIBER_QUEUE_SIZE = 200
+
+RECONNECT_INTERVAL = 2.0  # 초
+
+
+def channel_authkey():
+    """이번 실행의 채널 인증키 - 환경 변수에 없으면 새로 만들어 넣음 (이후 실행하는 자식 프로세스가 물려받음)"""
+    key = os.environ.get(CHANNEL_AUTHKEY_ENV)
+    if not key:
+        key = os.environ[CHANNEL_AUTHKEY_ENV] = secrets.token_hex(32)
+    return key.encode("ascii")
+
+
+class FlowPublisher:
+    """흐름 생산자 쪽 : publish() 는 바로 반환하고 별도 스레드가 채널로 전송"""
+
+    def __init__(self, address=CHANNEL_ADDRESS, authkey=None):
+        self.address = address
+        self.authkey = authkey or channel_authkey()
+        self.sent = 0
+        self.dropped = 0
+
+        self._queue = queue.Queue(maxsize=PUBLISH_QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._run, name="flow_publisher", daemon=True)
+        self._thread.start()
+
+    def publish(self, message):
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        conn = None
+        while True:
+            message = self._queue.get()
+            if message is None:
+                break
+            if conn is None:
+                try:
+                    conn = Client(self.address, authkey=self.authkey)
+                except OSError:
+                    # 대시보드가 아직 없음 -> 이번 메시지는 버리고 잠시 후 재시도
+                    self.dropped += 1
+                    time.sleep(RECONNECT_INTERVAL)
+                    continue
+            try:
+                conn.send(message)
+                self.sent += 1
+            except (OSError, EOFError):
+                self.dropped += 1
+                conn.close()
+                conn = None
+        if conn is not None:
+            conn.close()
+
+    def close(self, timeout=1.0):
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+
+class Subscription:
+    """SSE 연결 하나에 해당하는 구독 (bounded 큐)"""
+
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.closed = False
+
+    def get(self, timeout):
+        """(seq, 메시지) 를 반환, timeout 동안 없으면 None"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class FlowBroadcaster:
+    """받은 메시지에 순번을 붙여 replay 버퍼에 남기고 모든 구독자에게 전달"""
+
+    def __init__(self, replay_size=REPLAY_BUFFER_SIZE):
+        self._lock = threading.Lock()
+        self._replay = deque(maxlen=replay_size)
+        self._subscribers = set()
+        self.seq = 0
+        self.disconnected_slow = 0
+
+    def publish(self, message):
+        with self._lock:
+            self.seq += 1
+            item = (self.seq, message)
+            self._replay.append(item)
+            for subscription in list(self._subscribers):
+                try:
+                    subscription.queue.put_nowait(item)
+                except queue.Full:
+                    # 느린 구독자 : 끊어서 재접속 후 replay 로 따라오게 함
+                    subscription.closed = True
+                    self._subscribers.discard(subscription)
+                    self.disconnected_slow += 1
+
+    def subscribe(self, last_event_id=None):
+        """구독을 등록하고 (구독, 누락 여부) 를 반환
+        last_event_id 이후 이벤트가 replay 버퍼에 모두 남아 있으면 큐에 먼저 넣어줌"""
+        subscription = Subscription()
+        missed = False
+        with self._lock:
+            if last_event_id is not None:
+                oldest = self._replay[0][0] if self._replay else self.seq + 1
+                pending = [item for item in self._replay if item[0] > last_event_id]
+                if (last_event_id > self.seq or last_event_id + 1 < oldest
+                        or len(pending) > SUBSCRIBER_QUEUE_SIZE):
+                    missed = True  # 대시보드 재시작 또는 버퍼에서 밀려남 -> 클라이언트가 /data 로 따라잡아야 함
+                else:
+                    for item in pending:
+                        subscription.queue.put_nowait(item)
+            self._subscribers.add(subscription)
+        return subscription, missed
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def stats(self):
+        with self._lock:
+            return {"seq": self.seq, "subscribers": len(self._subscribers),
+                    "disconnected_slow": self.disconnected_slow}
+
+
+def _receive(conn, on_message):
+    with conn:
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                on_message(message)
+            except Exception as e:
+                print(f"### 채널 메시지 처리 중 오류 발생: {e}")
+
+
+def serve_channel(on_message, address=CHANNEL_ADDRESS, authkey=None):
+    """채널 수신 스레드 시작 (연결마다 수신 스레드 하나, 받은 메시지는 on_message 로 전달)"""
+    listener = Listener(address, authkey=authkey or channel_authkey())
+
+    def accept_loop():
+        while True:
+            try:
+                conn = listener.accept()
+            except (OSError, AuthenticationError):
+                continue  # 인증 실패 등
+            threading.Thread(target=_receive, args=(conn, on_message), daemon=True).start()
+
+    threading.Thread(target=accept_loop, name="flow_channel", daemon=True).start()
+    return listener
@@ -0,0 +1,365 @@
+# 실행 흐름 압축 형식 (열 단위 + 문자열 intern)
+# 목표 : 흐름마다 "efc.i.sc.co.controller" / "LoginController" 같은 같은 문자열과 JSON 키를 반복해서 저장하지 않고
+#        오래된 흐름 이력을 훨씬 작게 보관 / 전송
+# 방법 : 1) 클래스 / 메서드 / 쿼리 종류 / 스레드 / 요청 ID 문자열은 심볼 테이블에 한 번만 저장하고 번호로 참조
+#        2) 흐름의 호출 트리는 preorder 로 펼쳐서 열(array) 단위로 저장 (레이어, 클래스, 메서드, 시작 시각, 소요 시간, 자식 수,
+#           SQL 실행 시간)
+#           "controller" / "service" / "dao" / "sql" / "timestamp" / "duration_ms" 는 트리에서 다시 만들 수 있으므로 저장하지 않음
+#        3) 여러 바이트짜리 열은 바이트 자리별로 모아서(shuffle) 저장 -> 비슷한 시각 / 작은 번호가 잘 압축됨
+#        4) 전체를 zstd(zstandard 가 설치된 경우) 또는 gzip 으로 압축
+#        트리로 표현할 수 없는 흐름(트리가 없는 이전 형식, 알 수 없는 키 등)은 원본 dict 그대로 저장
+# 결과 : encode_flows(흐름 목록) -> bytes, decode_flows(bytes) -> 기존과 같은 모양의 흐름 목록
+#        flow_store 의 오래된 세그먼트 압축(.flc), web_dashboard 의 /data?format=flc 에서 사용
+#        python flow_codec.py execution_flow.json [-o 결과.flc] / python flow_codec.py 파일.flc --json 결과.json
+
+# 파일 형식 : "FLC1" + 압축 방식(1 byte) + 압축된 본문
+#            본문 = 헤더 길이(uint32) + 헤더 JSON(심볼, 원본 흐름, 열 목록) + 열 데이터(little-endian, shuffle)
+
+import argparse
+import gzip
+import json
+import os
+import struct
+import sys
+import time
+from array import array
+
+try:
+    import zstandard  # 선택 : 있으면 zstd 압축 사용 (없으면 gzip)
+except ImportError:
+    zstandard = None
+
+MAGIC = b"FLC1"
+FORMAT_VERSION = 1
+
+# 압축 방식 -> 헤더 번호
+COMPRESSIONS = {"none": 0, "gzip": 1, "zstd": 2}
+DEFAULT_COMPRESSION = "zstd" if zstandard is not None else "gzip"
+
+# 압축 수준
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+
+LAYERS = ("controller", "service", "dao", "sql")
+_LAYER_CODE = {layer: code for code, layer in enumerate(LAYERS)}
+
+# 트리에서 다시 만드는 흐름 키 (이 밖의 키는 extra 로 따로 저장)
+FLOW_KEYS = ("controller", "service", "dao", "sql", "timestamp", "thread", "request_id", "duration_ms", "tree")
+NODE_KEYS = {"layer", "class", "method", "start", "duration_ms", "children"}
+SQL_NODE_KEYS = NODE_KEYS | {"query_type"}
+SQL_TIMED_NODE_KEYS = SQL_NODE_KEYS | {"elapsed_ms"}  # 로그에 SQL 실행 시간이 찍힌 경우
+
+# 열 이름 -> array 타입 코드
+FLOW_COLUMNS = (("flow_raw", "B"), ("flow_thread", "I"), ("flow_request", "I"), ("flow_extra", "I"))
+NODE_COLUMNS = (("node_layer", "B"), ("node_class", "I"), ("node_method", "I"), ("node_query", "I"),
+                ("node_start", "d"), ("node_duration", "q"), ("node_children", "I"), ("node_elapsed", "q"))
+OFFSET_COLUMN = ("flow_offset", "Q")
+
+
+def _shuffle(data, width):
+    # 같은 자리의 바이트끼리 모음 (상위 바이트가 비슷한 값이 연속 -> 압축률 향상)
+    if width == 1:
+        return data
+    return b"".join(data[i::width] for i in range(width))
+
+
+def _unshuffle(data, width):
+    if width == 1:
+        return data
+    out = bytearray(len(data))
+    size = len(data) // width
+    for i in range(width):
+        out[i::width] = data[i * size:(i + 1) * size]
+    return bytes(out)
+
+
+def _compress(payload, compression):
+    if compression == "gzip":
+        return gzip.compress(payload, compresslevel=GZIP_LEVEL, mtime=0)
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd 압축을 사용하려면 zstandard 패키지가 필요합니다.")
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(payload)
+    return payload
+
+
+def _decompress(body, code):
+    if code == COMPRESSIONS["gzip"]:
+        return gzip.decompress(body)
+    if code == COMPRESSIONS["zstd"]:
+        if zstandard is None:
+            raise ValueError("zstd 로 압축된 파일을 읽으려면 zstandard 패키지가 필요합니다.")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+    return body
+
+
+def is_encoded(data):
+    return data[:len(MAGIC)] == MAGIC
+
+
+def _exact_ms(value):
+    # 정수(µs)로 저장 -> 소수 셋째 자리로 반올림된 값만 그대로 복원됨
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and round(value * 1000) / 1000 == value
+
+
+def _legacy_fields(tree):
+    # flow_builder.OpenFlow.to_flow 와 같은 방식으로 트리에서 레이어별 첫 호출 / 모든 SQL 을 뽑음
+    found = {"controller": [], "service": [], "dao": [], "sql": []}
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        found[node["layer"]].append(node)
+        stack.extend(reversed(node["children"]))
+    services, daos = found["service"], found["dao"]
+    return {
+        "controller": {"class": tree["class"], "function": tree["method"]},
+        "service": {"class": services[0]["class"], "method": services[0]["method"]} if services else None,
+        "dao": {"class": daos[0]["class"], "method": daos[0]["method"]} if daos else None,
+        "sql": [{"query_type": node.get("query_type"), "class": node["class"], "method": node["method"]}
+                for node in found["sql"]],
+    }
+
+
+class FlowEncoder:
+    """흐름을 하나씩 받아 열에 추가하고 to_bytes() 로 직렬화"""
+
+    def __init__(self, with_offsets=False):
+        self.symbols = [None]  # 0번 = None
+        self._symbol_ids = {}
+        self.raw = []  # 트리로 표현할 수 없는 흐름 (원본 그대로)
+        self.columns = {name: array(typecode) for name, typecode in FLOW_COLUMNS + NODE_COLUMNS}
+        self.with_offsets = with_offsets
+        if with_offsets:
+            self.columns[OFFSET_COLUMN[0]] = array(OFFSET_COLUMN[1])
+        self.flows = 0
+
+    def intern(self, value):
+        if value is None:
+            return 0
+        symbol_id = self._symbol_ids.get(value)
+        if symbol_id is None:
+            symbol_id = self._symbol_ids[value] = len(self.symbols)
+            self.symbols.append(value)
+        return symbol_id
+
+    def _flatten(self, flow):
+        """트리로 저장할 수 있으면 preorder 노드 목록, 아니면 None"""
+        tree = flow.get("tree")
+        if not isinstance(tree, dict) or any(key not in flow for key in FLOW_KEYS):
+            return None
+        nodes = []
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            layer = node.get("layer")
+            if layer not in _LAYER_CODE:
+                return None
+            if layer == "sql":
+                if node.keys() != SQL_NODE_KEYS and (node.keys() != SQL_TIMED_NODE_KEYS
+                                                     or not _exact_ms(node["elapsed_ms"]) or node["elapsed_ms"] < 0):
+                    return None
+            elif node.keys() != NODE_KEYS:
+                return None
+            if not _exact_ms(node["duration_ms"]) or not isinstance(node["start"], (int, float)) \
+                    or not isinstance(node["children"], list):
+                return None
+            for key in ("class", "method", "query_type"):
+                if not isinstance(node.get(key), (str, type(None))):
+                    return None
+            nodes.append(node)
+            stack.extend(reversed(node["children"]))
+        if flow["timestamp"] != tree["start"] or flow["duration_ms"] != tree["duration_ms"] \
+                or not isinstance(flow["thread"], (str, type(None))) \
+                or not isinstance(flow["request_id"], (str, type(None))):
+            return None
+        legacy = _legacy_fields(tree)
+        if any(flow[key] != value for key, value in legacy.items()):
+            return None
+        return nodes
+
+    def add(self, flow, offset=None):
+        columns = self.columns
+        nodes = self._flatten(flow)
+        if nodes is None:
+            columns["flow_raw"].append(1)
+            columns["flow_thread"].append(0)
+            columns["flow_request"].append(0)
+            columns["flow_extra"].append(len(self.raw))  # 원본 목록의 위치
+            self.raw.append(flow)
+        else:
+            columns["flow_raw"].append(0)
+            columns["flow_thread"].append(self.intern(flow["thread"]))
+            columns["flow_request"].append(self.intern(flow["request_id"]))
+            extra = {key: value for key, value in flow.items() if key not in FLOW_KEYS}
+            columns["flow_extra"].append(self.intern(json.dumps(extra, ensure_ascii=False)) if extra else 0)
+            for node in nodes:
+                columns["node_layer"].append(_LAYER_CODE[node["layer"]])
+                columns["node_class"].append(self.intern(node["class"]))
+                columns["node_method"].append(self.intern(node["method"]))
+                columns["node_query"].append(self.intern(node.get("query_type")))
+                columns["node_start"].append(node["start"])
+                columns["node_duration"].append(round(node["duration_ms"] * 1000))
+                columns["node_children"].append(len(node["children"]))
+                elapsed = node.get("elapsed_ms")
+                columns["node_elapsed"].append(-1 if elapsed is None else round(elapsed * 1000))  # -1 = 없음
+        if self.with_offsets:
+            columns[OFFSET_COLUMN[0]].append(offset)
+        self.flows += 1
+
+    def to_bytes(self, compression=DEFAULT_COMPRESSION):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"지원하지 않는 압축 방식: {compression}")
+        blobs = []
+        column_specs = []
+        for name, column in self.columns.items():
+            if sys.byteorder != "little":
+                column = array(column.typecode, column)
+                column.byteswap()
+            data = _shuffle(column.tobytes(), column.itemsize)
+            column_specs.append([name, column.typecode, len(data)])
+            blobs.append(data)
+        header = json.dumps({"version": FORMAT_VERSION, "flows": self.flows, "symbols": self.symbols,
+                             "raw": self.raw, "columns": column_specs},
+                            ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        payload = b"".join([struct.pack("<I", len(header)), header] + blobs)
+        return MAGIC + bytes([COMPRESSIONS[compression]]) + _compress(payload, compression)
+
+
+def encode_flows(flows, offsets=None, compression=DEFAULT_COMPRESSION):
+    """흐름 목록 -> 압축 형식 bytes (offsets 가 있으면 흐름별 저장소 위치도 함께 저장)"""
+    encoder = FlowEncoder(with_offsets=offsets is not None)
+    if offsets is None:
+        for flow in flows:
+            encoder.add(flow)
+    else:
+        for flow, offset in zip(flows, offsets):
+            encoder.add(flow, offset)
+    return encoder.to_bytes(compression)
+
+
+def decode(data):
+    """압축 형식 bytes -> (흐름 목록, 흐름별 저장소 위치 목록 또는 None), 형식이 다르면 ValueError"""
+    if not is_encoded(data):
+        raise ValueError("실행 흐름 압축 형식(FLC1)이 아닙니다.")
+    payload = _decompress(data[len(MAGIC) + 1:], data[len(MAGIC)])
+    header_size = struct.unpack_from("<I", payload)[0]
+    header = json.loads(payload[4:4 + header_size])
+    if header["version"] != FORMAT_VERSION:
+        raise ValueError(f"지원하지 않는 형식 버전: {header['version']}")
+
+    columns = {}
+    position = 4 + header_size
+    for name, typecode, size in header["columns"]:
+        column = array(typecode)
+        column.frombytes(_unshuffle(payload[position:position + size], column.itemsize))
+        if sys.byteorder != "little":
+            column.byteswap()
+        columns[name] = column.tolist()
+        position += size
+
+    symbols = header["symbols"]
+    raw = header["raw"]
+    layers = [LAYERS[code] for code in columns["node_layer"]]
+    classes = [symbols[i] for i in columns["node_class"]]
+    methods = [symbols[i] for i in columns["node_method"]]
+    queries = [symbols[i] for i in columns["node_query"]]
+    starts = columns["node_start"]
+    durations = [value / 1000 for value in columns["node_duration"]]
+    child_counts = columns["node_children"]
+    elapsed = columns.get("node_elapsed")  # SQL 실행 시간 열이 없던 때 만든 파일이면 None
+    extras = {}
+    next_node = 0
+
+    def build(i, found):
+        # preorder 위치 i 의 노드와 자식들을 만들고 다음 위치를 반환
+        layer = layers[i]
+        node = {"layer": layer, "class": classes[i], "method": methods[i], "start": starts[i],
+                "duration_ms": durations[i], "children": []}
+        if layer == "sql":
+            node["query_type"] = queries[i]
+            if elapsed is not None and elapsed[i] >= 0:
+                node["elapsed_ms"] = elapsed[i] / 1000
+        found[layer].append(node)
+        j = i + 1
+        for _ in range(child_counts[i]):
+            child, j = build(j, found)
+            node["children"].append(child)
+        return node, j
+
+    flows = []
+    for index in range(header["flows"]):
+        if columns["flow_raw"][index]:
+            flows.append(raw[columns["flow_extra"][index]])
+            continue
+        found = {"controller": [], "service": [], "dao": [], "sql": []}
+        tree, next_node = build(next_node, found)
+        services, daos = found["service"], found["dao"]
+        flow = {
+            "controller": {"class": tree["class"], "function": tree["method"]},
+            "service": {"class": services[0]["class"], "method": services[0]["method"]} if services else None,
+            "dao": {"class": daos[0]["class"], "method": daos[0]["method"]} if daos else None,
+            "sql": [{"query_type": node["query_type"], "class": node["class"], "method": node["method"]}
+                    for node in found["sql"]],
+            "timestamp": tree["start"],
+            "thread": symbols[columns["flow_thread"][index]],
+            "request_id": symbols[columns["flow_request"][index]],
+            "duration_ms": tree["duration_ms"],
+            "tree": tree,
+        }
+        extra_id = columns["flow_extra"][index]
+        if extra_id:
+            if extra_id not in extras:
+                extras[extra_id] = json.loads(symbols[extra_id])
+            flow.update(extras[extra_id])
+        flows.append(flow)
+    return flows, columns.get(OFFSET_COLUMN[0])
+
+
+def decode_flows(data):
+    """압축 형식 bytes -> 흐름 목록 (기존 JSON 과 같은 모양)"""
+    return decode(data)[0]
+
+
+def write_flow_file(path, flows, compression=DEFAULT_COMPRESSION):
+    data = encode_flows(flows, compression=compression)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return len(data)
+
+
+def read_flow_file(path):
+    """.flc 또는 JSON(목록 / NDJSON) 파일 -> 흐름 목록"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if is_encoded(data):
+        return decode_flows(data)
+    text = data.decode("utf-8")
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="실행 흐름 JSON <-> 압축 형식(.flc) 변환")
+    parser.add_argument("path", help="입력 파일 (JSON 목록 / NDJSON / .flc)")
+    parser.add_argument("-o", "--output", help="압축 형식으로 저장할 경로 (기본: 입력 파일 이름 + .flc)")
+    parser.add_argument("--json", dest="json_output", help="JSON 목록으로 저장할 경로 (.flc -> JSON)")
+    parser.add_argument("--compression", choices=sorted(COMPRESSIONS), default=DEFAULT_COMPRESSION)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    flows = read_flow_file(args.path)
+    loaded = time.perf_counter() - started
+    print(f"### 흐름 {len(flows)}건 읽음 ({loaded:.2f}초)")
+
+    if args.json_output:
+        with open(args.json_output, "w", encoding="utf-8") as f:
+            json.dump(flows, f, ensure_ascii=False)
+        print(f"### JSON 저장 완료: {args.json_output}")
+    else:
+        output = args.output or os.path.splitext(args.path)[0] + ".flc"
+        size = write_flow_file(output, flows, args.compression)
+        original = os.path.getsize(args.path)
+        print(f"### 저장 완료: {output} ({original:,} -> {size:,} bytes, {original / max(size, 1):.1f}배 감소)")
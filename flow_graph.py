@@ -0,0 +1,179 @@
+# 실행 흐름 집계 그래프 (중복 제거 + 증분 갱신)
+# 목표 : 흐름마다 노드/엣지를 새로 그리던 방식 대신, 고유한 코드 경로만 남긴 작은 그래프를 유지
+# 방법 : 노드는 (레이어, 클래스, 메서드) 로 한 번만 저장하고, 엣지는 호출 횟수와 처음/마지막 관측 시각을 누적
+#        새로 추가된 흐름만 update() 로 반영
+#        호출 트리가 있는 흐름은 엣지마다 호출된 쪽의 비용(SQL 은 로그에 찍힌 실행 시간, 없으면 노드 시간) 합계와
+#        같은 부모 아래에서 같은 호출이 N_PLUS_ONE_MIN_REPEATS 번 이상 반복된 횟수(N+1 의심)도 누적
+# 결과 : 그래프 크기와 렌더링 시간이 요청 수가 아니라 서로 다른 코드 경로 수에 비례함
+
+import time
+
+LAYERS = ("controller", "service", "dao", "sql")
+
+# 한 흐름에서 같은 부모 아래 같은 호출(같은 SQL_ID 등)이 이 횟수 이상이면 N+1 의심 (sql_analysis 와 공용)
+N_PLUS_ONE_MIN_REPEATS = 5
+
+
+def node_id(layer, class_name, method):
+    return f"{layer}:{class_name}.{method}"
+
+
+def name_matches(name, pattern):
+    """전체 이름이 같거나, "."으로 구분된 앞/뒷부분/중간 부분이 같으면 True
+
+    예) pattern="LoginController" -> efc.i.sc.co.controller.LoginController.login
+    """
+    suffix = "." + pattern
+    return name == pattern or name.endswith(suffix) or suffix + "." in name or name.startswith(pattern + ".")
+
+
+def node_cost(node):
+    """호출 트리 노드 비용 (ms) : SQL 은 로그에 찍힌 실행 시간, 없으면 로그 시각 차이로 잰 노드 시간"""
+    elapsed = node.get("elapsed_ms")
+    if elapsed is not None:
+        return elapsed
+    return node.get("duration_ms") or 0.0
+
+
+class FlowGraph:
+    def __init__(self):
+        self.nodes = {}  # node_id -> {"layer", "class", "method", "label", "count"}
+        # (src_id, dst_id) -> {"label", "count", "first_seen", "last_seen", "total_ms", "n_plus_one", "max_repeats"}
+        self.edges = {}
+        self.flow_count = 0
+        self.version = 0  # 흐름이 반영될 때마다 증가 (렌더링 필요 여부 판단용)
+
+    def _add_node(self, layer, class_name, method, label):
+        key = node_id(layer, class_name, method)
+        node = self.nodes.get(key)
+        if node is None:
+            node = self.nodes[key] = {"layer": layer, "class": class_name, "method": method,
+                                      "label": label, "count": 0}
+        node["count"] += 1
+        return key
+
+    def _add_edge(self, src, dst, label, seen, cost=0.0):
+        edge = self.edges.get((src, dst))
+        if edge is None:
+            edge = self.edges[(src, dst)] = {"label": label, "count": 0, "first_seen": seen, "last_seen": seen,
+                                             "total_ms": 0.0, "n_plus_one": 0, "max_repeats": 0}
+        edge["count"] += 1
+        edge["total_ms"] += cost
+        if seen < edge["first_seen"]:
+            edge["first_seen"] = seen
+        if seen > edge["last_seen"]:
+            edge["last_seen"] = seen
+
+    def _add_tree(self, node, parent_id, seen):
+        # 호출 트리 : 부모 -> 자식 엣지를 모두 반영 (Service 여러 개, DAO 여러 개도 각각 연결)
+        layer = node["layer"]
+        class_name = node.get("class")
+        method = node.get("method")
+        if layer == "sql":
+            label = f'{node.get("query_type") or "SQL"}\n{class_name}.{method}'
+        else:
+            label = f"{class_name}\n{method}"
+        key = self._add_node(layer, class_name, method, label)
+        if parent_id is not None:
+            self._add_edge(parent_id, key, "executes" if layer == "sql" else "calls", seen, node_cost(node))
+        repeats = {}
+        for child in node.get("children", ()):
+            child_id = self._add_tree(child, key, seen)
+            repeats[child_id] = repeats.get(child_id, 0) + 1
+        # 같은 호출이 반복된 엣지 (루프 안에서 같은 SQL / DAO 를 부르는 N+1 의심)
+        for child_id, count in repeats.items():
+            if count >= N_PLUS_ONE_MIN_REPEATS:
+                edge = self.edges[(key, child_id)]
+                edge["n_plus_one"] += 1
+                if count > edge["max_repeats"]:
+                    edge["max_repeats"] = count
+        return key
+
+    def add_flow(self, flow, seen=None):
+        """흐름 하나를 그래프에 반영 (호출 트리가 없는 예전 흐름은 기존 visualize_execution_flow 와 같은 규칙)"""
+        if seen is None:
+            seen = flow.get("timestamp") or time.time()
+
+        if flow.get("tree"):
+            self._add_tree(flow["tree"], None, seen)
+            self.flow_count += 1
+            return
+
+        controller = flow.get("controller") or {}
+        controller_class = controller.get("class", "UnknownController")
+        controller_function = controller.get("function", "UnknownFunction")
+        controller_id = self._add_node("controller", controller_class, controller_function,
+                                       f"{controller_class}\n{controller_function}")
+
+        # 서비스(Service)
+        service = flow.get("service")
+        service_id = None
+        if service:
+            service_class = service.get("class", "UnknownService")
+            service_method = service.get("method", "UnknownMethod")
+            service_id = self._add_node("service", service_class, service_method, f"{service_class}\n{service_method}")
+            self._add_edge(controller_id, service_id, "calls", seen)  # Controller -> Service
+
+        # DAO
+        dao = flow.get("dao")
+        dao_id = None
+        if dao:
+            dao_class = dao.get("class", "UnknownDAO")
+            dao_method = dao.get("method", "UnknownMethod")
+            dao_id = self._add_node("dao", dao_class, dao_method, f"{dao_class}\n{dao_method}")
+            self._add_edge(service_id or controller_id, dao_id, "calls", seen)  # Service(없으면 Controller) -> DAO
+
+        # SQL
+        for sql in flow.get("sql", []):
+            query_type = sql.get("query_type", "SQL")
+            sql_class = sql.get("class", "UnknownClass")
+            sql_method = sql.get("method", "UnknownMethod")
+            sql_id = self._add_node("sql", sql_class, sql_method, f"{query_type}\n{sql_class}.{sql_method}")
+            self._add_edge(dao_id or service_id or controller_id, sql_id, "executes", seen)
+
+        self.flow_count += 1
+
+    def clear(self):
+        """집계를 비움 (같은 객체를 계속 쓰도록 version 은 이어서 증가)"""
+        self.nodes = {}
+        self.edges = {}
+        self.flow_count = 0
+        self.version += 1
+
+    def update(self, flows):
+        """새로 추가된 흐름만 반영하고 반영한 개수를 반환"""
+        for flow in flows:
+            self.add_flow(flow)
+        if flows:
+            self.version += 1
+        return len(flows)
+
+    def subgraph(self, controller):
+        """이름이 controller 와 맞는 Controller 노드에서 호출로 도달하는 노드/엣지만 남긴 그래프 (호출 수는 전체 기준)"""
+        callees = {}
+        for src, dst in self.edges:
+            callees.setdefault(src, []).append(dst)
+        roots = [key for key, node in self.nodes.items()
+                 if node["layer"] == "controller" and name_matches(f'{node["class"]}.{node["method"]}', controller)]
+
+        reached = set(roots)
+        stack = list(roots)
+        while stack:
+            for dst in callees.get(stack.pop(), ()):
+                if dst not in reached:
+                    reached.add(dst)
+                    stack.append(dst)
+
+        sub = FlowGraph()
+        sub.nodes = {key: self.nodes[key] for key in self.nodes if key in reached}
+        sub.edges = {(src, dst): edge for (src, dst), edge in self.edges.items() if src in reached and dst in reached}
+        sub.flow_count = sum(self.nodes[key]["count"] for key in roots)
+        sub.version = self.version
+        return sub
+
+    def to_dict(self):
+        return {
+            "flow_count": self.flow_count,
+            "nodes": [dict(node, id=key) for key, node in self.nodes.items()],
+            "edges": [dict(edge, source=src, target=dst) for (src, dst), edge in self.edges.items()],
+        }
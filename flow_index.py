@@ -0,0 +1,304 @@
+# 실행 흐름 색인 (SQLite)
+# 목표 : "SQL_ID X 를 호출한 Controller 는?", "최근 10분 동안의 LoginController 흐름" 같은 질문에
+#        전체 흐름 목록을 훑지 않고 수 ms 안에 답함
+# 방법 : 저장소(append-only 세그먼트)를 커서 이후부터만 읽어 SQLite 에 색인을 추가
+#        - flows    : 흐름 하나당 한 행 (세그먼트 위치, 시각, Controller, 소요 시간, 스레드, 요청 ID, 인스턴스)
+#        - flow_sql : (SQL ID, 시각, 흐름) 역색인
+#        - names    : Controller / SQL ID 이름 -> 번호 (흐름 행에는 번호만 저장)
+#        흐름 본문은 색인에 복사하지 않고 세그먼트 위치로 저장소에서 바로 읽음
+# 결과 : FlowIndex.query(controller=, sql_id=, since=, until=) / controllers_for_sql(sql_id)
+#        web_dashboard 의 /flows 에서 사용, python flow_index.py --rebuild 로 처음부터 다시 색인
+
+import argparse
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from flow_graph import name_matches
+from flow_store import FLOW_STORE_DIR, iter_flows, parse_cursor, read_segment_ranges
+
+# 색인 파일 경로
+INDEX_PATH = "flow_index.sqlite3"
+
+# 한 트랜잭션에 넣는 흐름 수
+INDEX_BATCH_SIZE = 5000
+
+# 조회 결과 최대 개수
+MAX_QUERY_LIMIT = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS names (id INTEGER PRIMARY KEY, kind TEXT NOT NULL, name TEXT NOT NULL, UNIQUE (kind, name));
+CREATE TABLE IF NOT EXISTS flows (
+    id INTEGER PRIMARY KEY,
+    segment INTEGER NOT NULL,
+    start_offset INTEGER NOT NULL,
+    end_offset INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    controller_id INTEGER,
+    duration_ms REAL,
+    thread TEXT,
+    request_id TEXT,
+    instance TEXT
+);
+CREATE INDEX IF NOT EXISTS flows_timestamp ON flows (timestamp);
+CREATE INDEX IF NOT EXISTS flows_controller ON flows (controller_id, timestamp);
+CREATE INDEX IF NOT EXISTS flows_segment ON flows (segment);
+CREATE TABLE IF NOT EXISTS flow_sql (
+    sql_id INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    flow_id INTEGER NOT NULL,
+    PRIMARY KEY (sql_id, timestamp, flow_id)
+) WITHOUT ROWID;
+"""
+
+# 상대 시각 (-10m, -2h, -1d ...)
+_RELATIVE_TIME = re.compile(r"^-(\d+(?:\.\d+)?)([smhd])$")
+_UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_time(value):
+    """epoch 초 / ISO 시각(2025-03-10T10:00:00) / 상대 시각(-10m) -> epoch 초, 잘못된 값이면 ValueError"""
+    if value is None or value == "":
+        return None
+    value = str(value).strip()
+    if match := _RELATIVE_TIME.match(value):
+        return time.time() - float(match.group(1)) * _UNIT_SECONDS[match.group(2)]
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def controller_name(flow):
+    controller = flow.get("controller") or {}
+    return f'{controller.get("class")}.{controller.get("function")}'
+
+
+def sql_names(flow):
+    return {f'{sql.get("class")}.{sql.get("method")}' for sql in flow.get("sql", [])}
+
+
+class FlowIndex:
+    def __init__(self, path=INDEX_PATH, store_dir=FLOW_STORE_DIR):
+        self.path = path
+        self.store_dir = store_dir
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._names = {}
+        self._reload_names()
+
+    # ---- 색인 추가 ----
+    def _meta(self, key):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _reload_names(self, full=False):
+        # 다른 프로세스가 추가한 이름을 캐시에 반영 (이름은 지우지 않으므로 보통은 마지막 번호 이후만 읽음)
+        if full:
+            self._names = {}
+        last = max(self._names.values(), default=0)
+        for name_id, kind, name in self._conn.execute("SELECT id, kind, name FROM names WHERE id > ?", (last,)):
+            self._names[(kind, name)] = name_id
+
+    def _name_id(self, kind, name):
+        # 번호는 SQLite 가 정함 - 다른 프로세스가 같은 이름을 먼저 넣었어도 그 번호를 그대로 사용
+        name_id = self._names.get((kind, name))
+        if name_id is None:
+            self._conn.execute("INSERT OR IGNORE INTO names (kind, name) VALUES (?, ?)", (kind, name))
+            name_id = self._conn.execute("SELECT id FROM names WHERE kind = ? AND name = ?", (kind, name)).fetchone()[0]
+            self._names[(kind, name)] = name_id
+        return name_id
+
+    def _insert(self, batch, since, cursor):
+        """batch 를 한 트랜잭션으로 색인, 다른 프로세스가 그 사이 커서를 옮겼으면(동시 sync / --rebuild) 넣지 않고 False"""
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._meta("cursor") != since:
+                conn.rollback()
+                return False
+            for controller, sql, row in batch:
+                controller_id = self._name_id("controller", controller) if controller else None
+                # 흐름 번호도 SQLite 가 정함 (id = NULL -> 새 rowid)
+                flow_id = conn.execute("INSERT INTO flows VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                       row[:4] + (controller_id,) + row[4:]).lastrowid
+                conn.executemany("INSERT OR IGNORE INTO flow_sql VALUES (?, ?, ?)",
+                                 [(self._name_id("sql", name), row[3], flow_id) for name in sql])
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('cursor', ?)", (cursor,))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            # 되돌린 트랜잭션에서 캐시에 넣은 이름 번호는 무효 -> 처음부터 다시 읽음
+            self._reload_names(full=True)
+            raise
+        return True
+
+    def sync(self):
+        """저장소에 새로 추가된 흐름만 색인에 반영하고 추가한 개수를 반환"""
+        with self._lock:
+            since = self._meta("cursor")
+            number, offset = parse_cursor(since) if since else (None, 0)
+            batch = []
+            added = 0
+            cursor = since
+            for cursor, flow in iter_flows(self.store_dir, since):
+                end_number, end = parse_cursor(cursor)
+                start = offset if end_number == number else 0
+                number, offset = end_number, end
+
+                batch.append((controller_name(flow) if flow.get("controller") else None, sql_names(flow),
+                              (end_number, start, end, flow.get("timestamp") or 0.0, flow.get("duration_ms"),
+                               flow.get("thread"), flow.get("request_id"), flow.get("instance"))))
+
+                if len(batch) >= INDEX_BATCH_SIZE:
+                    if not self._insert(batch, since, cursor):
+                        return added
+                    added += len(batch)
+                    since, batch = cursor, []
+            if batch and self._insert(batch, since, cursor):
+                added += len(batch)
+            return added
+
+    def rebuild(self):
+        """색인을 비우고 저장소 처음부터 다시 색인"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM flows")
+            self._conn.execute("DELETE FROM flow_sql")
+            self._conn.execute("DELETE FROM meta")
+        return self.sync()
+
+    def prune(self, before_segment):
+        """before_segment 보다 앞선 세그먼트(보존 기간이 지나 지워진 것)의 색인 삭제"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM flow_sql WHERE flow_id IN (SELECT id FROM flows WHERE segment < ?)",
+                               (before_segment,))
+            return self._conn.execute("DELETE FROM flows WHERE segment < ?", (before_segment,)).rowcount
+
+    # ---- 조회 ----
+    def resolve(self, kind, pattern):
+        """이름 조건 -> 이름 번호 목록 (전체 이름이 같거나, "."으로 구분된 뒷부분/중간 부분이 같은 경우)
+
+        예) controller="LoginController" -> efc.i.sc.co.controller.LoginController.login 등
+        """
+        return [name_id for (name_kind, name), name_id in self._names.items()
+                if name_kind == kind and name_matches(name, pattern)]
+
+    def _where(self, controller, sql_id, since, until, instance):
+        # 조건 -> (FROM 절, WHERE 절, 파라미터), 조건에 맞는 이름이 하나도 없으면 None
+        self._reload_names()
+        clauses, params = [], []
+        table = "flows f"
+        time_column = "f.timestamp"
+        if sql_id:
+            sql_ids = self.resolve("sql", sql_id)
+            if not sql_ids:
+                return None
+            table = "flow_sql s JOIN flows f ON f.id = s.flow_id"
+            time_column = "s.timestamp"
+            clauses.append(f"s.sql_id IN ({','.join('?' * len(sql_ids))})")
+            params.extend(sql_ids)
+        if controller:
+            controller_ids = self.resolve("controller", controller)
+            if not controller_ids:
+                return None
+            clauses.append(f"f.controller_id IN ({','.join('?' * len(controller_ids))})")
+            params.extend(controller_ids)
+        if since is not None:
+            clauses.append(f"{time_column} >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append(f"{time_column} <= ?")
+            params.append(until)
+        if instance:
+            clauses.append("f.instance = ?")
+            params.append(instance)
+        return table, " AND ".join(clauses) or "1", params, time_column
+
+    def query(self, controller=None, sql_id=None, since=None, until=None, instance=None, limit=100):
+        """조건에 맞는 흐름을 최신순으로 최대 limit 개 반환"""
+        limit = max(0, min(limit, MAX_QUERY_LIMIT))
+        with self._lock:
+            where = self._where(controller, sql_id, since, until, instance)
+            if where is None:
+                return []
+            table, condition, params, time_column = where
+            rows = self._conn.execute(
+                f"SELECT DISTINCT f.id, f.segment, f.start_offset, f.end_offset, f.timestamp FROM {table} "
+                f"WHERE {condition} ORDER BY {time_column} DESC LIMIT ?", params + [limit]).fetchall()
+        return self._load(rows)
+
+    def count_by_controller(self, controller=None, sql_id=None, since=None, until=None, instance=None):
+        """조건에 맞는 흐름 수를 Controller 별로 반환 (예: SQL_ID X 를 호출한 Controller 목록)"""
+        with self._lock:
+            where = self._where(controller, sql_id, since, until, instance)
+            if where is None:
+                return []
+            table, condition, params, _ = where
+            rows = self._conn.execute(
+                f"SELECT n.name, COUNT(DISTINCT f.id) FROM {table} JOIN names n ON n.id = f.controller_id "
+                f"WHERE {condition} GROUP BY f.controller_id ORDER BY 2 DESC", params).fetchall()
+        return [{"controller": name, "count": count} for name, count in rows]
+
+    def controllers_for_sql(self, sql_id, since=None, until=None):
+        return self.count_by_controller(sql_id=sql_id, since=since, until=until)
+
+    def _load(self, rows):
+        # 세그먼트 파일마다 한 번만 열어서 위치로 흐름 본문을 읽음 (압축된 세그먼트는 끝 위치로 찾고, 지워진 세그먼트는 건너뜀)
+        by_segment = {}
+        for row in rows:
+            by_segment.setdefault(row[1], []).append(row)
+        loaded = {}
+        for number, segment_rows in by_segment.items():
+            found = read_segment_ranges(self.store_dir, number, [(start, end) for _, _, start, end, _ in segment_rows])
+            for flow_id, _, _, end, _ in segment_rows:
+                if end in found:
+                    loaded[flow_id] = found[end]
+        return [loaded[row[0]] for row in rows if row[0] in loaded]
+
+    def stats(self):
+        with self._lock:
+            self._reload_names()
+            return {
+                "flows": self._conn.execute("SELECT COUNT(*) FROM flows").fetchone()[0],
+                "controllers": sum(1 for kind, _ in self._names if kind == "controller"),
+                "sql_ids": sum(1 for kind, _ in self._names if kind == "sql"),
+                "cursor": self._meta("cursor"),
+            }
+
+    def close(self):
+        self._conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="실행 흐름 색인 갱신 / 조회")
+    parser.add_argument("--rebuild", action="store_true", help="색인을 지우고 처음부터 다시 만듦")
+    parser.add_argument("--store", default=FLOW_STORE_DIR, help=f"흐름 저장소 폴더 (기본: {FLOW_STORE_DIR})")
+    parser.add_argument("--index", default=INDEX_PATH, help=f"색인 파일 (기본: {INDEX_PATH})")
+    parser.add_argument("--controller")
+    parser.add_argument("--sql-id")
+    parser.add_argument("--from", dest="since", help="시작 시각 (epoch 초 / ISO / 상대 시각은 --from=-10m 형식)")
+    parser.add_argument("--to", dest="until", help="끝 시각 (epoch 초 / ISO / -10m)")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    index = FlowIndex(args.index, args.store)
+    started = time.perf_counter()
+    added = index.rebuild() if args.rebuild else index.sync()
+    print(f"### 색인 {added}건 추가 ({time.perf_counter() - started:.2f}초), {index.stats()}")
+
+    if args.controller or args.sql_id or args.since or args.until:
+        conditions = dict(controller=args.controller, sql_id=args.sql_id,
+                          since=parse_time(args.since), until=parse_time(args.until))
+        started = time.perf_counter()
+        flows = index.query(limit=args.limit, **conditions)
+        groups = index.count_by_controller(**conditions)
+        print(f"### 조회 {len(flows)}건 ({(time.perf_counter() - started) * 1000:.1f} ms)")
+        for group in groups:
+            print(f"  {group['count']:>8}  {group['controller']}")
+    index.close()
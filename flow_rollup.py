@@ -0,0 +1,421 @@
+# 시간대별 호출 경로 집계 (rollup) + 원본 흐름 보존 기간 관리
+# 목표 : 같은 LoginController 흐름이 수만 건씩 원본 그대로 쌓이기만 하고 아무도 집계하지 않던 문제 해결
+#        "지금 어떤 호출 경로가 가장 많이 불리는가" 를 적은 메모리 / 디스크로 바로 볼 수 있게 함
+# 방법 : 1) 흐름마다 호출 경로 서명(Controller > Service > DAO > SQL)을 만들어 분(minute) 단위 창에 집계
+#        2) 창마다 경로 카운터는 space-saving 방식으로 최대 capacity 개만 유지
+#           (가득 차면 가장 작은 카운터를 새 경로에 넘겨줌 -> 상위 경로의 count 는 error 이내로 정확)
+#        3) minute_retention 이 지난 분 단위 창은 시간(hour) 단위 창으로 합치고(downsample),
+#           hour_retention 이 지난 시간 단위 창은 버림
+#        4) 집계가 끝난 원본 세그먼트 중 retention 이 지난 것은 삭제하고 색인(flow_index)에서도 제거
+#           남는 세그먼트 중 확정된 지 compact_after 가 지난 것은 압축 형식(.flc)으로 변환
+#        5) 같은 주기에 SQL 단위 분석(sql_analysis)도 삭제 전에 새 흐름을 반영
+# 결과 : flow_rollup.json (web_dashboard 의 /hot-paths 에서 읽음), sql_stats.json (/sql-stats)
+#        python flow_rollup.py [--once] [--retention-hours 72]
+
+# Trouble : 반복 호출(N+1 처럼 같은 DAO 를 여러 번 호출)마다 경로 서명이 달라져 경로 종류가 끝없이 늘어남
+# 해결방법 : 같은 부모 아래에서 바로 앞 형제와 같은 호출은 서명에 한 번만 넣음
+
+import argparse
+import heapq
+import json
+import os
+import threading
+import time
+
+from flow_index import FlowIndex, INDEX_PATH, parse_time
+from flow_store import FLOW_STORE_DIR, COMPACT_AFTER, iter_flows, list_segments, compact_segments
+from sql_analysis import SqlAnalyzer, SQL_STATS_PATH
+from metrics import heartbeat
+
+# 집계 결과 파일 (대시보드에서 읽음)
+ROLLUP_PATH = "flow_rollup.json"
+
+# 창 크기 (초)
+MINUTE = 60
+HOUR = 60 * 60
+
+# 창마다 유지하는 경로 카운터 수 (시간 단위 창은 여러 분 단위 창을 합치므로 더 크게)
+MINUTE_CAPACITY = 100
+HOUR_CAPACITY = 300
+
+# 분 단위 창을 유지하는 기간 / 시간 단위 창을 유지하는 기간 (초)
+MINUTE_RETENTION = 2 * HOUR
+HOUR_RETENTION = 7 * 24 * HOUR
+
+# 원본 흐름(저장소 세그먼트) 보존 기간 (초)
+RAW_RETENTION = 3 * 24 * HOUR
+
+# 집계 / 보존 기간 정리 주기 (초)
+ROLLUP_INTERVAL = 60.0
+
+# 조회 시 창마다 돌려주는 상위 경로 수
+TOP_N = 10
+
+RESOLUTIONS = {"minute": MINUTE, "hour": HOUR}
+
+
+def _node_label(node):
+    if node["layer"] == "sql":
+        return f'{node.get("query_type")} {node["class"]}.{node["method"]}'
+    return f'{node["class"]}.{node["method"]}'
+
+
+def _tree_labels(node, labels):
+    labels.append(_node_label(node))
+    previous = None
+    for child in node["children"]:
+        label = _node_label(child)
+        if label != previous:
+            _tree_labels(child, labels)
+        previous = label
+
+
+def path_signature(flow):
+    """흐름의 호출 경로 서명 (예: LoginController.login > UserService.find > UserDao.select > SELECT UserMapper.select)"""
+    if flow.get("tree"):
+        labels = []
+        _tree_labels(flow["tree"], labels)
+        return " > ".join(labels)
+
+    # 트리가 없는 예전 형식 흐름
+    labels = []
+    controller = flow.get("controller")
+    if controller:
+        labels.append(f'{controller.get("class")}.{controller.get("function")}')
+    for layer in ("service", "dao"):
+        if flow.get(layer):
+            labels.append(f'{flow[layer].get("class")}.{flow[layer].get("method")}')
+    for sql in flow.get("sql") or []:
+        labels.append(f'{sql.get("query_type")} {sql.get("class")}.{sql.get("method")}')
+    return " > ".join(labels)
+
+
+class SpaceSaving:
+    """space-saving 상위 K 카운터 (메모리는 capacity 개로 고정)
+
+    counters : 경로 -> [count, error, duration_ms 합계]
+    count 는 실제 횟수 이상, count - error 는 실제 횟수 이하
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counters = {}
+        self._heap = []  # (count, 경로) - 경로마다 하나, count 가 오래된 값이면 꺼낼 때 다시 넣음
+
+    def add(self, key, count=1, duration_ms=0.0, error=0):
+        counter = self.counters.get(key)
+        if counter is not None:
+            counter[0] += count
+            counter[1] += error
+            counter[2] += duration_ms
+            return
+        if len(self.counters) < self.capacity:
+            self.counters[key] = [count, error, duration_ms]
+            heapq.heappush(self._heap, (count, key))
+            return
+
+        # 가장 작은 카운터를 새 경로에 넘겨줌
+        while True:
+            smallest, smallest_key = heapq.heappop(self._heap)
+            current = self.counters[smallest_key][0]
+            if current == smallest:
+                break
+            heapq.heappush(self._heap, (current, smallest_key))
+        del self.counters[smallest_key]
+        self.counters[key] = [smallest + count, smallest + error, duration_ms]
+        heapq.heappush(self._heap, (smallest + count, key))
+
+    def merge(self, other):
+        for key, (count, error, duration_ms) in other.counters.items():
+            self.add(key, count, duration_ms, error)
+
+    def top(self, n):
+        return heapq.nlargest(n, self.counters.items(), key=lambda item: item[1][0])
+
+
+class RollupWindow:
+    """한 시간 창(분 / 시간 단위)의 흐름 수, 소요 시간 합계, 경로별 카운터"""
+
+    def __init__(self, start, resolution, capacity):
+        self.start = start
+        self.resolution = resolution
+        self.flow_count = 0
+        self.duration_ms = 0.0
+        self.paths = SpaceSaving(capacity)
+
+    def add(self, signature, duration_ms):
+        self.flow_count += 1
+        self.duration_ms += duration_ms
+        self.paths.add(signature, 1, duration_ms)
+
+    def merge(self, other):
+        self.flow_count += other.flow_count
+        self.duration_ms += other.duration_ms
+        self.paths.merge(other.paths)
+
+    def summary(self, limit=TOP_N):
+        paths = []
+        for signature, (count, error, duration_ms) in self.paths.top(limit):
+            observed = max(count - error, 1)
+            paths.append({"path": signature, "count": count, "error": error,
+                          "avg_ms": round(duration_ms / observed, 3)})
+        return {
+            "start": self.start,
+            "resolution": self.resolution,
+            "flows": self.flow_count,
+            "avg_ms": round(self.duration_ms / self.flow_count, 3) if self.flow_count else 0.0,
+            "paths": paths,
+        }
+
+    def to_dict(self):
+        return {
+            "start": self.start,
+            "resolution": self.resolution,
+            "flows": self.flow_count,
+            "duration_ms": round(self.duration_ms, 3),
+            "paths": [[signature, count, error, round(duration_ms, 3)]
+                      for signature, (count, error, duration_ms) in self.paths.counters.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data, capacity):
+        window = cls(data["start"], data["resolution"], capacity)
+        window.flow_count = data["flows"]
+        window.duration_ms = data["duration_ms"]
+        for signature, count, error, duration_ms in data["paths"]:
+            window.paths.add(signature, count, duration_ms, error)
+        return window
+
+
+class FlowRollup:
+    def __init__(self, path=ROLLUP_PATH, store_dir=FLOW_STORE_DIR, minute_retention=MINUTE_RETENTION,
+                 hour_retention=HOUR_RETENTION):
+        self.path = path
+        self.store_dir = store_dir
+        self.minute_retention = minute_retention
+        self.hour_retention = hour_retention
+        self._lock = threading.Lock()
+        self.windows = {}  # (resolution, 창 시작 시각) -> RollupWindow
+        self.cursor = None  # 집계에 반영된 마지막 저장소 위치
+        self.latest_timestamp = 0.0  # 지금까지 집계한 가장 늦은 흐름 시각 (downsample 기준)
+        self.load()
+
+    # ---- 저장 / 불러오기 ----
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        with self._lock:
+            self.cursor = data.get("cursor")
+            self.latest_timestamp = data.get("latest_timestamp", 0.0)
+            self.windows = {}
+            for window_data in data.get("windows", []):
+                capacity = MINUTE_CAPACITY if window_data["resolution"] == MINUTE else HOUR_CAPACITY
+                window = RollupWindow.from_dict(window_data, capacity)
+                self.windows[(window.resolution, window.start)] = window
+
+    def save(self):
+        with self._lock:
+            data = {
+                "cursor": self.cursor,
+                "latest_timestamp": self.latest_timestamp,
+                "windows": [window.to_dict() for _, window in sorted(self.windows.items())],
+            }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    # ---- 집계 ----
+    def _window(self, resolution, timestamp):
+        start = timestamp - timestamp % resolution
+        window = self.windows.get((resolution, start))
+        if window is None:
+            capacity = MINUTE_CAPACITY if resolution == MINUTE else HOUR_CAPACITY
+            window = self.windows[(resolution, start)] = RollupWindow(start, resolution, capacity)
+        return window
+
+    def add(self, flows):
+        with self._lock:
+            for flow in flows:
+                timestamp = flow.get("timestamp") or 0.0
+                if timestamp > self.latest_timestamp:
+                    self.latest_timestamp = timestamp
+                # 이미 분 단위 보존 기간이 지난 흐름(과거 로그 backfill)은 바로 시간 단위 창에 집계
+                resolution = MINUTE if timestamp >= self.latest_timestamp - self.minute_retention else HOUR
+                self._window(resolution, timestamp).add(path_signature(flow), flow.get("duration_ms") or 0.0)
+
+    def downsample(self):
+        """보존 기간이 지난 분 단위 창은 시간 단위 창으로 합치고, 오래된 시간 단위 창은 버림"""
+        with self._lock:
+            minute_deadline = self.latest_timestamp - self.minute_retention
+            hour_deadline = self.latest_timestamp - self.hour_retention
+            for key in sorted(self.windows):
+                resolution, start = key
+                if resolution == MINUTE and start + MINUTE <= minute_deadline:
+                    self._window(HOUR, start).merge(self.windows.pop(key))
+            for key in [key for key in self.windows if key[0] == HOUR and key[1] + HOUR <= hour_deadline]:
+                del self.windows[key]
+
+    def sync(self, batch_size=5000):
+        """저장소에 새로 추가된 흐름만 집계에 반영하고 반영한 개수를 반환"""
+        added = 0
+        batch = []
+        cursor = self.cursor
+        for cursor, flow in iter_flows(self.store_dir, self.cursor):
+            batch.append(flow)
+            if len(batch) >= batch_size:
+                self.add(batch)
+                self.cursor = cursor
+                self.downsample()  # 많이 밀려 있어도 분 단위 창이 쌓이지 않도록 중간중간 합침
+                added += len(batch)
+                batch = []
+        if batch:
+            self.add(batch)
+            added += len(batch)
+        self.cursor = cursor
+        self.downsample()
+        return added
+
+    # ---- 조회 ----
+    def hot_paths(self, resolution="minute", since=None, until=None, windows=10, limit=TOP_N):
+        """창별 상위 경로 (최신 창부터 windows 개) + 그 창들을 합친 전체 상위 경로"""
+        resolution = RESOLUTIONS.get(resolution, MINUTE)
+        with self._lock:
+            # 시간 단위 조회에는 아직 합쳐지지 않은 최근 분 단위 창도 시간 단위로 묶어서 포함
+            groups = {}
+            for (window_resolution, start), window in self.windows.items():
+                if window_resolution > resolution:
+                    continue
+                group_start = start - start % resolution
+                if (since is None or group_start + resolution > since) and (until is None or group_start <= until):
+                    groups.setdefault(group_start, []).append(window)
+            selected = []
+            for group_start in sorted(groups, reverse=True)[:max(windows, 0)]:
+                group = groups[group_start]
+                if len(group) == 1 and group[0].resolution == resolution:
+                    selected.append(group[0])
+                    continue
+                merged = RollupWindow(group_start, resolution, HOUR_CAPACITY)
+                for window in group:
+                    merged.merge(window)
+                selected.append(merged)
+            total = RollupWindow(selected[-1].start if selected else 0, resolution, HOUR_CAPACITY)
+            for window in selected:
+                total.merge(window)
+            return {
+                "windows": [window.summary(limit) for window in selected],
+                "top": total.summary(limit),
+            }
+
+    def stats(self):
+        with self._lock:
+            return {
+                "minute_windows": sum(1 for resolution, _ in self.windows if resolution == MINUTE),
+                "hour_windows": sum(1 for resolution, _ in self.windows if resolution == HOUR),
+                "counters": sum(len(window.paths.counters) for window in self.windows.values()),
+                "cursor": self.cursor,
+            }
+
+
+def enforce_retention(store_dir=FLOW_STORE_DIR, retention=RAW_RETENTION, index=None, now=None):
+    """retention 보다 오래된 확정 세그먼트를 앞에서부터 삭제하고 삭제한 세그먼트 수를 반환
+
+    집계(rollup)가 먼저 해당 세그먼트를 읽은 뒤에 호출해야 함
+    """
+    deadline = (now or time.time()) - retention
+    segments = list_segments(store_dir)
+    removed = 0
+    # 커서가 가리키는 순서가 깨지지 않도록 가장 오래된 것부터 연속으로만 삭제 (마지막 세그먼트는 항상 남김)
+    for number, path, active in segments[:-1]:
+        try:
+            if active or os.stat(path).st_mtime > deadline:
+                break
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        removed += 1
+
+    if removed and index is not None:
+        index.prune(segments[removed][0])
+    return removed
+
+
+class RollupMaintainer:
+    """주기적으로 집계 / SQL 분석 -> 보존 기간 정리(색인에서도 삭제) -> 집계 파일 저장 (flow_rollup.py 실행 / pipeline 에서 사용)"""
+
+    def __init__(self, rollup=None, index=None, retention=RAW_RETENTION, compact_after=COMPACT_AFTER, sql=None):
+        self.rollup = rollup or FlowRollup()
+        self.sql = sql or SqlAnalyzer(store_dir=self.rollup.store_dir)
+        self.index = index
+        self.retention = retention
+        self.compact_after = compact_after
+        self.segments_removed = 0
+        self.segments_compacted = 0
+
+    def run_once(self):
+        added = self.rollup.sync()  # 지우기 전에 집계에 반영 (색인은 조회하는 쪽에서 sync, 여기서는 삭제만 반영)
+        sql_added = self.sql.sync()
+        removed = enforce_retention(self.rollup.store_dir, self.retention, self.index)
+        if removed:
+            self.segments_removed += removed
+            print(f"### 보존 기간({self.retention / HOUR:g}시간)이 지난 세그먼트 {removed}개 삭제")
+        compacted, before, after = compact_segments(self.rollup.store_dir, self.compact_after)
+        if compacted:
+            self.segments_compacted += compacted
+            print(f"### 세그먼트 {compacted}개 압축 ({before:,} -> {after:,} bytes)")
+        if added or removed:
+            self.rollup.save()
+        if sql_added:
+            self.sql.save()
+        return added
+
+    def run(self, stopping, interval=ROLLUP_INTERVAL):
+        """stopping(threading.Event)이 설정될 때까지 interval 마다 run_once 실행"""
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                # 깨진 흐름 하나 때문에 집계 스레드가 조용히 죽지 않도록 매번 기록하고 다음 주기에 다시 시도
+                print(f"### [rollup] 집계 중 오류 발생: {type(e).__name__}: {e}")
+            heartbeat()
+            if stopping.wait(interval):
+                return
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="호출 경로 시간대별 집계 + 원본 흐름 보존 기간 관리")
+    parser.add_argument("--store", default=FLOW_STORE_DIR, help=f"흐름 저장소 폴더 (기본: {FLOW_STORE_DIR})")
+    parser.add_argument("--rollup", default=ROLLUP_PATH, help=f"집계 결과 파일 (기본: {ROLLUP_PATH})")
+    parser.add_argument("--retention-hours", type=float, default=RAW_RETENTION / HOUR,
+                        help=f"원본 흐름 보존 기간 (기본: {RAW_RETENTION / HOUR:g}시간)")
+    parser.add_argument("--compact-after-minutes", type=float, default=COMPACT_AFTER / MINUTE,
+                        help=f"확정 후 이 시간이 지난 세그먼트를 압축 (기본: {COMPACT_AFTER / MINUTE:g}분)")
+    parser.add_argument("--sql-stats", default=SQL_STATS_PATH, help=f"SQL 분석 결과 파일 (기본: {SQL_STATS_PATH})")
+    parser.add_argument("--once", action="store_true", help="한 번만 집계하고 상위 경로를 출력한 뒤 종료")
+    parser.add_argument("--resolution", choices=sorted(RESOLUTIONS), default="minute")
+    parser.add_argument("--from", dest="since", help="조회 시작 시각 (epoch 초 / ISO / --from=-30m)")
+    args = parser.parse_args()
+
+    maintainer = RollupMaintainer(FlowRollup(args.rollup, args.store),
+                                  FlowIndex(INDEX_PATH, args.store), retention=args.retention_hours * HOUR,
+                                  compact_after=args.compact_after_minutes * MINUTE,
+                                  sql=SqlAnalyzer(args.sql_stats, args.store))
+    if args.once:
+        started = time.perf_counter()
+        added = maintainer.run_once()
+        print(f"### 흐름 {added}건 집계 ({time.perf_counter() - started:.2f}초), {maintainer.rollup.stats()}")
+        top = maintainer.rollup.hot_paths(args.resolution, since=parse_time(args.since))["top"]
+        for item in top["paths"]:
+            print(f"  {item['count']:>8}  {item['avg_ms']:>10} ms  {item['path']}")
+    else:
+        print("## 호출 경로 집계 시작 ##")
+        try:
+            maintainer.run(threading.Event())
+        except KeyboardInterrupt:
+            pass
+        maintainer.rollup.save()
+        maintainer.sql.save()
+    maintainer.index.close()
@@ -0,0 +1,401 @@
+# 실행 흐름 저장소 (append-only NDJSON 세그먼트)
+# 목표 : 로그가 바뀔 때마다 execution_flow.json 전체를 읽고 다시 쓰던 방식을 없앰
+# 방법 : 한 줄에 흐름 하나(JSON)를 기록하는 세그먼트 파일에 append만 수행
+#        fsync는 일정 개수/시간 단위로 묶어서 처리하고, 세그먼트는 크기/시간 기준으로 교체(roll)
+#        작성 중인 세그먼트는 .active 로 두고, 닫을 때 rename 으로 원자적으로 확정
+# 결과 : 흐름 저장 비용이 전체 이력 크기가 아니라 새로 추가된 흐름 크기에만 비례함
+# 압축 : 확정된 지 COMPACT_AFTER 가 지난 세그먼트는 flow_codec 형식(.flc)으로 바꿔 보관 (flow_rollup 의 정리 작업에서 실행)
+#        흐름별 원래 NDJSON 끝 위치를 함께 저장하므로 기존 커서 / 색인 위치는 그대로 유효
+
+# Trouble : log_watcher / pipeline / log_ingest 를 같은 저장소로 동시에 실행하면 두 writer 가 같은 .active 세그먼트를
+#           복구(truncate + rename)하고 이어 쓰면서 흐름이 섞이거나 잘림
+# 해결방법 : writer 는 저장소 폴더의 writer.lock 을 배타적으로 잠그고, 이미 잠겨 있으면 StoreLockedError 로 시작하지 않음
+#           (잠금은 프로세스가 죽으면 OS 가 풀어줌)
+
+# 커서 : "<세그먼트 번호>:<바이트 오프셋>" 형식의 문자열
+#        read_flows(since=커서) 로 그 이후에 추가된 흐름만 가져올 수 있음
+
+import json
+import os
+import re
+import threading
+import time
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+from flow_codec import decode, encode_flows, DEFAULT_COMPRESSION
+from metrics import registry
+
+# 세그먼트 저장 폴더
+FLOW_STORE_DIR = "execution_flow_store"
+
+# 이전 버전에서 사용하던 전체 JSON 파일 (최초 1회 세그먼트로 옮김)
+LEGACY_JSON_PATH = "execution_flow.json"
+
+# 세그먼트 교체 기준
+SEGMENT_MAX_BYTES = 16 * 1024 * 1024  # 16MB
+SEGMENT_MAX_AGE = 60 * 60  # 1시간
+
+# fsync 묶음 기준
+FSYNC_BATCH_RECORDS = 500
+FSYNC_INTERVAL = 1.0  # 초
+
+# 확정 후 이 시간(초)이 지난 세그먼트는 압축 형식으로 변환
+COMPACT_AFTER = 30 * 60
+
+SEGMENT_PREFIX = "segment-"
+SEALED_SUFFIX = ".ndjson"
+ACTIVE_SUFFIX = ".ndjson.active"
+COMPACTED_SUFFIX = ".flc"
+
+WRITER_LOCK_NAME = "writer.lock"
+
+_SEGMENT_RE = re.compile(r"^segment-(\d+)(?:\.ndjson(\.active)?|\.flc)$")
+
+
+def segment_path(store_dir, number, active=False, compacted=False):
+    suffix = ACTIVE_SUFFIX if active else COMPACTED_SUFFIX if compacted else SEALED_SUFFIX
+    return os.path.join(store_dir, f"{SEGMENT_PREFIX}{number:06d}{suffix}")
+
+
+def is_compacted_path(path):
+    return path.endswith(COMPACTED_SUFFIX)
+
+
+def is_segment_path(path):
+    return _SEGMENT_RE.match(os.path.basename(path)) is not None
+
+
+def list_segments(store_dir=FLOW_STORE_DIR):
+    """세그먼트 목록을 (번호, 경로, active 여부) 형태로 번호 순서대로 반환"""
+    if not os.path.isdir(store_dir):
+        return []
+
+    by_number = {}
+    for name in os.listdir(store_dir):
+        match = _SEGMENT_RE.match(name)
+        if match:
+            number = int(match.group(1))
+            # 압축 직후 원본을 지우기 전이면 압축본만 사용 (rename 으로 만들어지므로 항상 완전함)
+            if number not in by_number or is_compacted_path(name):
+                by_number[number] = (number, os.path.join(store_dir, name), bool(match.group(2)))
+    return sorted(by_number.values())
+
+
+def store_signature(store_dir=FLOW_STORE_DIR):
+    """세그먼트별 (번호, 크기, 수정 시각) 목록 - 저장소 내용이 바뀌었는지 판단하는 캐시 키"""
+    signature = []
+    for number, path, _ in list_segments(store_dir):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue  # 확정 rename 도중
+        signature.append((number, st.st_size, st.st_mtime_ns))
+    return tuple(signature)
+
+
+def format_cursor(number, offset):
+    return f"{number}:{offset}"
+
+
+def parse_cursor(cursor):
+    """커서 문자열을 (세그먼트 번호, 오프셋) 으로 변환, 잘못된 값이면 ValueError"""
+    number, _, offset = str(cursor).partition(":")
+    return int(number), int(offset or 0)
+
+
+def _fsync_dir(path):
+    # 디렉토리 fsync 는 POSIX 에서만 가능 (Windows 는 건너뜀)
+    if os.name != "posix":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class StoreLockedError(RuntimeError):
+    """다른 프로세스가 이미 같은 저장소에 쓰고 있음"""
+
+
+def _lock_store(store_dir):
+    # writer.lock 을 배타적으로 잠근 파일 객체를 반환 (닫으면 잠금 해제)
+    path = os.path.join(store_dir, WRITER_LOCK_NAME)
+    f = open(path, "a+b")
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        f.close()
+        raise StoreLockedError(f"다른 프로세스가 이미 {store_dir} 에 흐름을 저장하고 있습니다. "
+                               f"(log_watcher / pipeline / log_ingest 는 같은 저장소로 동시에 실행할 수 없음)")
+    return f
+
+
+class FlowStoreWriter:
+    """실행 흐름을 세그먼트 파일에 append 하는 저장기 (프로세스당 하나만 사용)"""
+
+    def __init__(self, store_dir=FLOW_STORE_DIR, max_bytes=SEGMENT_MAX_BYTES, max_age=SEGMENT_MAX_AGE,
+                 fsync_records=FSYNC_BATCH_RECORDS, fsync_interval=FSYNC_INTERVAL, legacy_path=LEGACY_JSON_PATH):
+        self.store_dir = store_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.fsync_records = fsync_records
+        self.fsync_interval = fsync_interval
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._number = 0
+        self._size = 0
+        self._opened_at = 0.0
+        self._pending = 0  # fsync 되지 않은 레코드 수
+        self._last_fsync = time.monotonic()
+
+        # 자체 계측 : append / fsync 지연, 저장한 흐름 수 / 바이트
+        self._append_ms = registry.histogram("flow_store_append_ms", "저장소 append 시간 (ms, 직렬화 포함)")
+        self._fsync_ms = registry.histogram("flow_store_fsync_ms", "저장소 fsync 시간 (ms)")
+        self._flows_written = registry.counter("flow_store_flows_written_total", "저장한 흐름 수")
+        self._bytes_written = registry.counter("flow_store_bytes_written_total", "저장한 바이트 수")
+
+        os.makedirs(self.store_dir, exist_ok=True)
+        self._store_lock = _lock_store(self.store_dir)  # 잠근 뒤에만 .active 세그먼트를 복구
+        self._recover()
+        if not list_segments(self.store_dir) and legacy_path and os.path.exists(legacy_path):
+            self._import_legacy(legacy_path)
+
+    def _recover(self):
+        # 비정상 종료로 남은 .active 세그먼트는 마지막 불완전한 줄을 잘라낸 뒤 확정
+        for number, path, active in list_segments(self.store_dir):
+            self._number = max(self._number, number)
+            if not active:
+                continue
+            with open(path, "rb+") as f:
+                data = f.read()
+                end = data.rfind(b"\n") + 1
+                if end != len(data):
+                    f.truncate(end)
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(path, segment_path(self.store_dir, number))
+        _fsync_dir(self.store_dir)
+
+    def _import_legacy(self, legacy_path):
+        try:
+            with open(legacy_path, "r", encoding="utf-8") as f:
+                legacy_flows = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            print("### 기존 실행 흐름 파일을 읽지 못해 저장소로 옮기지 않았습니다.")
+            return
+
+        if isinstance(legacy_flows, list) and legacy_flows:
+            self.append(legacy_flows)
+            self.roll()
+            print(f"### 기존 {legacy_path}의 실행 흐름 {len(legacy_flows)}건을 저장소로 옮겼습니다.")
+
+    def _open_segment(self):
+        self._number += 1
+        path = segment_path(self.store_dir, self._number, active=True)
+        self._file = open(path, "ab")
+        self._size = self._file.tell()
+        self._opened_at = time.monotonic()
+
+    def _sync(self):
+        started = time.perf_counter()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._fsync_ms.record((time.perf_counter() - started) * 1000)
+        self._pending = 0
+        self._last_fsync = time.monotonic()
+
+    def _seal(self):
+        # 현재 세그먼트를 fsync 후 rename 으로 확정
+        if self._file is None:
+            return
+        self._sync()
+        self._file.close()
+        self._file = None
+        os.replace(segment_path(self.store_dir, self._number, active=True),
+                   segment_path(self.store_dir, self._number))
+        _fsync_dir(self.store_dir)
+
+    def append(self, flows):
+        """흐름 목록을 현재 세그먼트 끝에 추가하고, 추가된 위치 이후를 가리키는 커서를 반환"""
+        started = time.perf_counter()
+        with self._lock:
+            if self._file is not None and (self._size >= self.max_bytes
+                                           or time.monotonic() - self._opened_at >= self.max_age):
+                self._seal()
+            if self._file is None:
+                self._open_segment()
+
+            data = "".join(json.dumps(flow, ensure_ascii=False, separators=(",", ":")) + "\n"
+                           for flow in flows).encode("utf-8")
+            self._file.write(data)
+            self._file.flush()  # 다른 프로세스의 reader 가 바로 읽을 수 있도록 OS 버퍼까지는 항상 내보냄
+            self._size += len(data)
+            self._pending += len(flows)
+
+            if (self._pending >= self.fsync_records
+                    or time.monotonic() - self._last_fsync >= self.fsync_interval):
+                self._sync()
+            cursor = format_cursor(self._number, self._size)
+
+        self._append_ms.record((time.perf_counter() - started) * 1000)
+        self._flows_written.inc(len(flows))
+        self._bytes_written.inc(len(data))
+        return cursor
+
+    def flush(self):
+        """묶여 있는 레코드를 즉시 fsync"""
+        with self._lock:
+            if self._file is not None and self._pending:
+                self._sync()
+
+    def roll(self):
+        """현재 세그먼트를 확정하고 다음 append 부터 새 세그먼트 사용"""
+        with self._lock:
+            self._seal()
+
+    def close(self):
+        self.roll()
+        if self._store_lock is not None:
+            self._store_lock.close()
+            self._store_lock = None
+
+
+def _open_segment_for_read(store_dir, number):
+    # 읽는 도중 .active -> 확정 -> 압축으로 이름이 바뀔 수 있으므로 모든 이름을 시도 -> (파일, 압축 여부)
+    for active, compacted in ((False, False), (False, True), (True, False)):
+        try:
+            return open(segment_path(store_dir, number, active=active, compacted=compacted), "rb"), compacted
+        except FileNotFoundError:
+            continue
+    return None, False
+
+
+def read_segment_ranges(store_dir, number, ranges):
+    """세그먼트 하나에서 (시작, 끝) 바이트 구간의 흐름을 읽어 {끝 위치: 흐름} 으로 반환 (세그먼트가 없으면 빈 dict)"""
+    f, compacted = _open_segment_for_read(store_dir, number)
+    if f is None:
+        return {}
+    found = {}
+    with f:
+        if compacted:
+            flows, offsets = decode(f.read())
+            by_end = dict(zip(offsets, flows))
+            return {end: by_end[end] for _, end in ranges if end in by_end}
+        for start, end in ranges:
+            f.seek(start)
+            # 읽지 못한(깨진) 줄이 구간에 함께 들어 있을 수 있으므로 마지막 줄만 사용
+            line = f.read(end - start).rstrip(b"\n").rsplit(b"\n", 1)[-1]
+            try:
+                found[end] = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+    return found
+
+
+def iter_flows(store_dir=FLOW_STORE_DIR, since=None):
+    """since 커서 이후의 흐름을 (다음 커서, 흐름) 형태로 순서대로 반환"""
+    start_number, start_offset = parse_cursor(since) if since else (0, 0)
+
+    for number, _, _ in list_segments(store_dir):
+        if number < start_number:
+            continue
+        f, compacted = _open_segment_for_read(store_dir, number)
+        if f is None:
+            continue
+        with f:
+            offset = start_offset if number == start_number else 0
+            if compacted:
+                flows, offsets = decode(f.read())
+                for end, flow in zip(offsets, flows):
+                    if end > offset:
+                        yield format_cursor(number, end), flow
+                continue
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # 아직 쓰는 중인 마지막 줄은 다음에 읽음
+                offset += len(line)
+                try:
+                    flow = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                yield format_cursor(number, offset), flow
+
+
+def compact_segment(store_dir, number, compression=DEFAULT_COMPRESSION):
+    """확정된 NDJSON 세그먼트를 압축 형식(.flc)으로 바꾸고 (이전 크기, 압축 후 크기) 를 반환"""
+    source = segment_path(store_dir, number)
+    flows, offsets = [], []
+    offset = 0
+    with open(source, "rb") as f:
+        for line in f:
+            offset += len(line)
+            try:
+                flows.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+            offsets.append(offset)  # 흐름이 끝나는 원래 위치 = 커서 / 색인이 가리키는 값
+
+    target = segment_path(store_dir, number, compacted=True)
+    data = encode_flows(flows, offsets, compression)
+    with open(target + ".tmp", "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(target + ".tmp", target)
+    _fsync_dir(store_dir)
+    os.remove(source)
+    return offset, len(data)
+
+
+def compact_segments(store_dir=FLOW_STORE_DIR, older_than=COMPACT_AFTER, now=None):
+    """확정된 지 older_than(초)이 지난 NDJSON 세그먼트를 모두 압축 -> (압축한 세그먼트 수, 이전 크기, 압축 후 크기)"""
+    deadline = (now or time.time()) - older_than
+    compacted = before = after = 0
+    for number, path, active in list_segments(store_dir):
+        if active or is_compacted_path(path):
+            continue
+        try:
+            if os.stat(path).st_mtime > deadline:
+                continue
+            size, compacted_size = compact_segment(store_dir, number)
+        except FileNotFoundError:
+            continue  # 보존 기간 정리로 그 사이 삭제됨
+        compacted += 1
+        before += size
+        after += compacted_size
+    return compacted, before, after
+
+
+def read_flows(store_dir=FLOW_STORE_DIR, since=None, limit=None):
+    """since 커서 이후의 흐름을 최대 limit 개까지 읽어 (흐름 목록, 다음 커서) 로 반환"""
+    flows = []
+    cursor = since
+    for cursor, flow in iter_flows(store_dir, since):
+        flows.append(flow)
+        if limit is not None and len(flows) >= limit:
+            break
+    return flows, cursor
+
+
+# 실행 흐름 전체 로드 (visualizer / web_dashboard 공용)
+def load_execution_flow(store_dir=FLOW_STORE_DIR, legacy_path=LEGACY_JSON_PATH):
+    if list_segments(store_dir):
+        return read_flows(store_dir)[0]
+
+    # 저장소가 아직 없으면 이전 JSON 파일을 그대로 읽음
+    try:
+        with open(legacy_path, "r", encoding="utf-8") as json_file:
+            return json.load(json_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        print("### 실행 흐름 파일을 찾을 수 없습니다.")
+        return []
@@ -0,0 +1,223 @@
+# HTTP 캡처 기록기 (http_sniffer 의 백그라운드 writer)
+# 목표 : 본문 디코딩 / 파라미터 파싱 / 파일 기록을 mitmproxy 이벤트 루프 밖에서 처리해서 프록시 지연을 없앰
+# 방법 : http_sniffer 는 필요한 참조와 잘라낸 본문만 bounded 큐에 넣고(가득 차면 버림)
+#        전용 스레드가 꺼내서 헤더/쿼리/폼/본문을 정리한 뒤 한 줄짜리 JSON(NDJSON)으로 파일에 기록
+# 결과 : http_capture.ndjson 에 요청/응답 단위의 구조화된 기록이 남음
+
+# Trouble : 샘플링된 캡처에 Authorization / Cookie / Set-Cookie 헤더와 로그인 폼의 비밀번호가 그대로 남고
+#           캡처 파일은 끝없이 커짐
+# 해결방법 : 기록 전에 민감한 헤더와 이름이 민감해 보이는 폼 / 쿼리 / JSON 필드 값을 가림(REDACTED)
+#           파일이 CAPTURE_MAX_BYTES 를 넘으면 .1, .2 ... 로 밀어내고 CAPTURE_BACKUPS 개만 남김
+
+import json
+import os
+import queue
+import re
+import threading
+import time
+import zlib
+from urllib.parse import parse_qs, urlencode, urlparse
+
+# 캡처 파일 경로
+CAPTURE_OUTPUT_PATH = "http_capture.ndjson"
+
+# writer 대기 큐 크기 (가득 차면 캡처를 버리고 dropped 증가)
+CAPTURE_QUEUE_SIZE = 10000
+
+# 파일 flush 간격 (초)
+FLUSH_INTERVAL = 1.0
+
+# 캡처 파일 최대 크기 / 남겨두는 이전 파일 수 (http_capture.ndjson.1 ~ .N)
+CAPTURE_MAX_BYTES = 100 * 1024 * 1024
+CAPTURE_BACKUPS = 3
+
+# 값을 가리는 헤더 (소문자)
+SENSITIVE_HEADERS = {"authorization", "proxy-authorization", "cookie", "set-cookie", "x-auth-token", "x-api-key",
+                     "x-csrf-token", "x-xsrf-token"}
+
+# 값을 가리는 폼 / 쿼리 / JSON 필드 이름
+SENSITIVE_FIELD = re.compile(r"pass(?:wd|word)?|pwd|secret|token|credential|api[_-]?key|auth|session|jsessionid|"
+                             r"csrf|card|ssn", re.IGNORECASE)
+
+REDACTED = "***"
+
+
+def _redact_headers(headers):
+    if headers is None:
+        return {}
+    return {key: REDACTED if key.lower() in SENSITIVE_HEADERS else value for key, value in headers.items()}
+
+
+def _redact_params(params):
+    # parse_qs 결과 {이름: [값, ...]}
+    return {key: [REDACTED] * len(values) if SENSITIVE_FIELD.search(key) else values for key, values in params.items()}
+
+
+def _redact_json(value):
+    if isinstance(value, dict):
+        return {key: REDACTED if SENSITIVE_FIELD.search(str(key)) else _redact_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_redact_json(item) for item in value]
+    return value
+
+
+def _redact_body(body, content_type):
+    """폼 / JSON 본문의 민감한 필드 값을 가림 (잘렸거나 파싱할 수 없는 JSON 은 본문을 남기지 않음)"""
+    if not body or body.startswith("<"):
+        return body  # 없음 / 압축 본문 안내 문구
+    content_type = (content_type or "").lower()
+    if "application/x-www-form-urlencoded" in content_type:
+        return urlencode(_redact_params(parse_qs(body, keep_blank_values=True)), doseq=True, safe="*")
+    if "json" in content_type:
+        try:
+            return json.dumps(_redact_json(json.loads(body)), ensure_ascii=False)
+        except ValueError:
+            return f"<JSON 본문 {len(body)}자 (파싱 불가, 기록하지 않음)>"
+    return body
+
+
+def redact_url(url):
+    """URL 쿼리의 민감한 파라미터 값을 가림"""
+    parsed = urlparse(url)
+    if not parsed.query or not SENSITIVE_FIELD.search(parsed.query):
+        return url
+    query = urlencode(_redact_params(parse_qs(parsed.query, keep_blank_values=True)), doseq=True, safe="*")
+    return parsed._replace(query=query).geturl()
+
+
+def _decode_body(body, content_encoding, truncated):
+    """잘라낸 본문을 문자열로 변환 (gzip/deflate 는 전체가 들어온 경우에만 해제)"""
+    if not body:
+        return None
+    encoding = (content_encoding or "").lower()
+    if encoding in ("gzip", "deflate"):
+        if truncated:
+            return f"<{encoding} 압축 본문 {len(body)} bytes (잘림)>"
+        try:
+            body = zlib.decompress(body, 16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS)
+        except zlib.error:
+            return f"<{encoding} 압축 본문 {len(body)} bytes>"
+    elif encoding and encoding != "identity":
+        return f"<{encoding} 압축 본문 {len(body)} bytes>"
+    return body.decode("utf-8", "replace")
+
+
+def _header_size(headers):
+    return sum(len(k) + len(v) for k, v in headers.items()) if headers is not None else 0
+
+
+def build_capture_record(capture):
+    """http_sniffer 가 넣은 캡처 항목 -> 파일에 기록할 dict (writer 스레드에서 실행)"""
+    request_headers = capture.get("request_headers")
+    response_headers = capture.get("response_headers")
+
+    url = redact_url(capture["url"])
+    record = {
+        "id": capture["id"],
+        "time": capture["started"],
+        "method": capture["method"],
+        "url": url,
+        "status": capture.get("status"),
+        "latency_ms": capture.get("latency_ms"),
+        "request_size": capture.get("request_body_size", 0) + _header_size(request_headers),
+        "response_size": capture.get("response_body_size", 0) + _header_size(response_headers),
+        "query": parse_qs(urlparse(url).query),
+    }
+
+    if capture.get("sampled"):
+        # 인증 정보 / 비밀번호 등은 파일에 남기지 않음
+        record["request_headers"] = _redact_headers(request_headers)
+        record["response_headers"] = _redact_headers(response_headers)
+
+        request_content_type = capture.get("request_content_type")
+        request_body = _redact_body(_decode_body(capture.get("request_body"), capture.get("request_encoding"),
+                                                 capture.get("request_truncated")), request_content_type)
+        if request_body and "application/x-www-form-urlencoded" in (request_content_type or ""):
+            record["form"] = parse_qs(request_body)
+        record["request_body"] = request_body
+        record["request_truncated"] = capture.get("request_truncated", False)
+        response_content_type = next((value for key, value in response_headers.items() if key.lower() == "content-type"),
+                                     None) if response_headers is not None else None
+        record["response_body"] = _redact_body(_decode_body(capture.get("response_body"),
+                                                            capture.get("response_encoding"),
+                                                            capture.get("response_truncated")), response_content_type)
+        record["response_truncated"] = capture.get("response_truncated", False)
+    return record
+
+
+class CaptureWriter:
+    def __init__(self, output_path=CAPTURE_OUTPUT_PATH, queue_size=CAPTURE_QUEUE_SIZE, max_bytes=CAPTURE_MAX_BYTES,
+                 backups=CAPTURE_BACKUPS):
+        self.output_path = output_path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.rotations = 0
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name="http_capture", daemon=True)
+        self._thread.start()
+
+    def submit(self, capture):
+        """프록시 스레드에서 호출 - 큐에 넣기만 하고 바로 반환"""
+        try:
+            self._queue.put_nowait(capture)
+        except queue.Full:
+            self.dropped += 1
+
+    def _rotate(self):
+        # http_capture.ndjson -> .1 -> .2 ... (가장 오래된 것은 삭제)
+        for index in range(self.backups, 0, -1):
+            source = self.output_path if index == 1 else f"{self.output_path}.{index - 1}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.output_path}.{index}")
+        if self.backups <= 0:
+            os.remove(self.output_path)
+        self.rotations += 1
+
+    def _run(self):
+        f = open(self.output_path, "ab")
+        try:
+            last_flush = time.monotonic()
+            while True:
+                try:
+                    capture = self._queue.get(timeout=FLUSH_INTERVAL)
+                except queue.Empty:
+                    f.flush()
+                    last_flush = time.monotonic()
+                    continue
+                if capture is None:
+                    break
+
+                try:
+                    f.write((json.dumps(build_capture_record(capture), ensure_ascii=False) + "\n").encode("utf-8"))
+                    self.written += 1
+                except Exception as e:
+                    self.errors += 1
+                    print(f"### HTTP 캡처 기록 실패: {e}")
+
+                if self._queue.empty() or time.monotonic() - last_flush >= FLUSH_INTERVAL:
+                    f.flush()
+                    last_flush = time.monotonic()
+                if f.tell() >= self.max_bytes:
+                    f.close()
+                    try:
+                        self._rotate()
+                    except OSError as e:
+                        print(f"### HTTP 캡처 파일 교체 실패: {e}")
+                    f = open(self.output_path, "ab")
+        finally:
+            f.close()
+
+    def close(self, timeout=2.0):
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {"queued": self._queue.qsize(), "written": self.written, "dropped": self.dropped, "errors": self.errors,
+                "rotations": self.rotations}
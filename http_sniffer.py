@@ -7,93 +7,175 @@
 # Trouble : Port 문제 발생
 # 해결방법 : mitmproxy를 작동해야하는 프로그램과 같은 포트가 아닌 다른 포트에서 실행 -> 목표 포트에서 오는 요청을 대체 포트를 통해 프록시로 전달하는 방식 사용
 
+# Trouble : 요청/응답마다 본문 디코딩, JSON pretty-print, 헤더 순회, 여러 줄의 ctx.log 출력을 이벤트 루프에서 직접 처리해서 프록시 지연이 커짐
+# 해결방법 : 프록시 스레드에서는 시간 기록 + 잘라낸 본문 참조만 큐에 넣고(O(1)), 나머지는 http_capture 의 writer 스레드에서 처리
+#           본문 캡처는 CAPTURE_SAMPLE_RATE 비율의 요청만, 최대 CAPTURE_MAX_BODY_BYTES 까지만 저장
+
 from mitmproxy import http, ctx
-from datetime import datetime
-import json
-from urllib.parse import parse_qs, urlparse
+import random
+import time
+from flow_channel import FlowPublisher
+from http_capture import CaptureWriter, redact_url
+from latency_stats import ExpiringTable, HttpStatsCollector
+from metrics import registry, start_exporter
+import threading
+
+
+## 분석 대상 (reverse 프록시 대상 서버)
+TARGET_HOST = "localhost"
+TARGET_PORT = 8082
+
+## 본문/헤더까지 캡처할 요청 비율 (0.0 ~ 1.0), 나머지는 메타데이터(URL, 상태, 크기, 응답 시간)만 기록
+CAPTURE_SAMPLE_RATE = 0.1
+
+## 캡처할 본문 최대 크기 (bytes)
+CAPTURE_MAX_BODY_BYTES = 64 * 1024
+
+## 요청마다 한 줄 요약을 mitmproxy 로그에 남길지 여부
+LOG_SUMMARY = True
+
+## 엔드포인트별 통계(http_stats.json) 내보내기 간격 (초)
+STATS_EXPORT_INTERVAL = 5
 
 
 
 class HttpSniffer:
 
     def __init__(self):
-        self.request_times = {}  ## 요청 시간을 저장할 딕셔너리
+        self.request_times = ExpiringTable()  ## 요청 시간 + 샘플링 여부 (응답이 오지 않은 요청은 TTL/최대 개수로 정리)
+        self.stats = HttpStatsCollector()  ## 엔드포인트별 지연 히스토그램 / 크기 / 처리량
+        self.publisher = FlowPublisher()  ## 요청 기록을 대시보드(실행 흐름 연결)로 전달
+        self.capture_writer = CaptureWriter()  ## 본문 디코딩/파일 기록은 별도 스레드에서 처리
+        self.hook_count = 0  ## 프록시가 추가한 지연 측정용 (response 훅 처리 횟수 / 누적 시간)
+        self.hook_seconds = 0.0
 
+        ## 자체 계측 (metrics/http_sniffer.json -> 대시보드 /metrics)
+        self.metrics_exporter = start_exporter("http_sniffer")
+        self.hook_ms = registry.histogram("http_sniffer_hook_ms", "response 훅 처리 시간 (ms, 프록시가 추가한 지연)")
+        self.responses = registry.counter("http_sniffer_responses_total", "기록한 응답 수")
+        self.errors = registry.counter("http_sniffer_errors_total", "연결 실패 / 중단된 요청 수")
+        registry.gauge("http_sniffer_pending_requests", "응답을 기다리는 요청 수", func=lambda: len(self.request_times))
+        registry.gauge("http_sniffer_capture_queue_depth", "캡처 writer 큐에 쌓인 항목 수",
+                       func=lambda: self.capture_writer.stats()["queued"])
 
+        ## 통계 파일을 주기적으로 내보내는 스레드
+        self._stop_export = threading.Event()
+        threading.Thread(target=self._export_loop, name="http_stats", daemon=True).start()
 
-    ## JSON 파싱 함수
-    def try_parse_json(self, content):
+
+
+    def _export_loop(self):
+        while not self._stop_export.wait(STATS_EXPORT_INTERVAL):
+            self.export_stats()
+
+
+
+    def export_stats(self):
+        self.request_times.expire()
         try:
-            return json.dumps(json.loads(content), indent=4, sort_keys=True)
-        except json.JSONDecodeError:
-            return content
-        
+            self.stats.export({
+                "pending_requests": len(self.request_times),
+                "expired_requests": self.request_times.expired,
+                "capture": self.capture_writer.stats(),
+                "proxy_overhead_ms": round(self.hook_seconds / self.hook_count * 1000, 4) if self.hook_count else None,
+            })
+        except OSError as e:
+            ctx.log.warn(f"HTTP 통계 저장 실패: {e}")
+
 
 
     def request(self, flow: http.HTTPFlow):
-        ## HTTP 요청을 감지하여 로깅
-        if flow.request.host == "localhost" and flow.request.port == 8082:  
-            request_time = datetime.now()
-            self.request_times[flow.id] = request_time  ## 요청 시간 저장
-
-            ctx.log.info(f"[{request_time}] -> [HTTP 요청 감지] {flow.request.method} {flow.request.pretty_url}")
-
-            ## 요청 크기 계산
-            request_size = len(flow.request.content) + sum(len(v) for v in flow.request.headers.values())
-            ctx.log.info(f"Request Size: {request_size} bytes")
-
-            ## Query 파라미터 출력
-            query_params = parse_qs(urlparse(flow.request.url).query)
-            if query_params:
-                ctx.log.info("Query parameters:")
-                for param, values in query_params.items():
-                    for value in values:
-                        ctx.log.info(f"     {param} : {value}")
-
-            ## Content-Type 확인 후 데이터 출력
-            content_type = flow.request.headers.get('Content-Type', '')
-
-            if flow.request.content:
-                if 'application/xml' in content_type:
-                    ctx.log.info("Request Body (XML):\n" + self.try_parse_json(flow.request.content.decode()))
-                elif 'application/x-www-form-urlencoded' in content_type:
-                    ctx.log.info("Form Data:")
-                    form_data = parse_qs(flow.request.content.decode())
-                    for field, values in form_data.items():
-                        for value in values:
-                            ctx.log.info(f"     {field} : {value}")
-                else:
-                    ctx.log.info(f"Request Body:\n{flow.request.content.decode('utf-8', 'ignore')}")
+        ## HTTP 요청 감지 -> 시간 기록과 샘플링 여부만 결정 (무거운 처리는 응답 이후 writer 스레드로)
+        if flow.request.host == TARGET_HOST and flow.request.port == TARGET_PORT:
+            sampled = random.random() < CAPTURE_SAMPLE_RATE
+            self.request_times.put(flow.id, (time.time(), sampled))  ## 요청 시간 저장
 
 
 
     def response(self, flow: http.HTTPFlow):
-       ## HTTP 응답을 감지하여 로깅
-        response_time = datetime.now()
-        request_time = self.request_times.pop(flow.id, None)  ## 요청 시간 가져오기
-
-        if request_time:
-            elapsed_time = (response_time - request_time).total_seconds() * 1000  ## ms 단위 변환
-        else:
-            elapsed_time = -1  # 요청 시간이 없으면 -1로 설정
-
-        ctx.log.info(f"[{response_time}] -> [HTTP 응답 감지] {flow.response.status_code} {flow.response.reason}")
-
-        ## 응답 크기 계산
-        response_size = len(flow.response.content) + sum(len(v) for v in flow.response.headers.values())
-        ctx.log.info(f"Response Size: {response_size} bytes")
-
-        ## 응답 속도 출력
-        if elapsed_time >= 0:
-            ctx.log.info(f"Response Time: {elapsed_time:.2f} ms")
-
-        ## Content-Type 확인 후 데이터 출력
-        content_type = flow.response.headers.get('Content-Type', '')
-        if flow.response.content:
-            if 'application/xml' in content_type:
-                ctx.log.info("Response Body (XML):\n" + self.try_parse_json(flow.response.content.decode()))
-            else:
-                ctx.log.info(f"Response Body:\n{flow.response.content.decode('utf-8', 'ignore')}")
+       ## HTTP 응답 감지 -> 응답 시간 계산 후 캡처 항목을 큐에 넣기만 함
+        hook_started = time.perf_counter()
+        response_time = time.time()
+        pending = self.request_times.pop(flow.id)  ## 요청 시간 가져오기
+        if pending is None:
+            return  ## 분석 대상이 아닌 요청 (또는 TTL 로 정리된 요청)
+
+        request_time, sampled = pending
+        elapsed_time = (response_time - request_time) * 1000  ## ms 단위 변환
+
+        request_body = flow.request.raw_content or b""
+        response_body = flow.response.raw_content or b""
+        capture = {
+            "id": flow.id,
+            "started": request_time,
+            "method": flow.request.method,
+            "url": flow.request.pretty_url,
+            "status": flow.response.status_code,
+            "latency_ms": round(elapsed_time, 2),
+            "request_body_size": len(request_body),
+            "response_body_size": len(response_body),
+            "request_headers": flow.request.headers,
+            "response_headers": flow.response.headers,
+            "sampled": sampled,
+        }
+        if sampled:
+            capture.update({
+                "request_body": request_body[:CAPTURE_MAX_BODY_BYTES],
+                "request_truncated": len(request_body) > CAPTURE_MAX_BODY_BYTES,
+                "request_encoding": flow.request.headers.get("Content-Encoding"),
+                "request_content_type": flow.request.headers.get("Content-Type", ""),
+                "response_body": response_body[:CAPTURE_MAX_BODY_BYTES],
+                "response_truncated": len(response_body) > CAPTURE_MAX_BODY_BYTES,
+                "response_encoding": flow.response.headers.get("Content-Encoding"),
+            })
+        self.capture_writer.submit(capture)
+        self.stats.record(flow.request.method, flow.request.path, flow.response.status_code,
+                          elapsed_time, len(request_body), len(response_body))
+
+        ## 로그 / 대시보드로 내보내는 URL 도 캡처 파일과 같이 민감한 쿼리 값을 가림
+        url = redact_url(flow.request.pretty_url)
+        if LOG_SUMMARY:
+            ctx.log.info(f"[HTTP] {flow.request.method} {url} -> "
+                         f"{flow.response.status_code} ({elapsed_time:.2f} ms)")
+
+        ## 요청 기록 전달 -> 대시보드에서 log_watcher 의 실행 흐름과 연결
+        self.publisher.publish({"type": "http", "record": {
+            "id": flow.id,
+            "method": flow.request.method,
+            "url": url,
+            "path": redact_url(flow.request.path),
+            "status": flow.response.status_code,
+            "started": request_time,
+            "ended": response_time,
+            "latency_ms": round(elapsed_time, 2),
+            "request_id": flow.request.headers.get("X-Request-ID") or flow.response.headers.get("X-Request-ID"),
+        }})
+
+        hook_seconds = time.perf_counter() - hook_started
+        self.hook_count += 1
+        self.hook_seconds += hook_seconds
+        self.hook_ms.record(hook_seconds * 1000)
+        self.responses.inc()
+
+
+
+    def error(self, flow: http.HTTPFlow):
+        ## 연결 실패 / 중단된 요청 -> 요청 시간 정리 + 에러 수 집계
+        if self.request_times.pop(flow.id) is not None:
+            self.stats.record_error(flow.request.method, flow.request.path)
+            self.errors.inc()
+
+
+
+    def done(self):
+        ## mitmproxy 종료 시 남은 캡처 기록 + 마지막 통계 저장
+        self._stop_export.set()
+        self.capture_writer.close()
+        self.export_stats()
+        self.metrics_exporter.close()
+        ctx.log.info(f"HTTP 캡처 통계: {self.capture_writer.stats()}")
+        if self.hook_count:
+            ctx.log.info(f"프록시 처리 시간(평균): {self.hook_seconds / self.hook_count * 1000:.3f} ms / 요청")
 
 
 
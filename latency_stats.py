@@ -0,0 +1,224 @@
+# HTTP 요청 통계 (http_sniffer 용)
+# 목표 : 요청 시작 시각 테이블이 끝없이 커지지 않도록 하고, 로그를 스크롤하지 않아도 엔드포인트별 지연 분포를 볼 수 있게 함
+# 방법 : 1) ExpiringTable : 삽입 순서 OrderedDict + TTL/최대 개수 -> 응답이 오지 않은 요청은 오래된 것부터 정리
+#        2) LatencyHistogram : 로그 스케일 버킷(약 9% 해상도) 히스토그램 -> 메모리 고정, p50/p95/p99 계산
+#        3) HttpStatsCollector : (메서드 + 정규화된 경로) 별 지연/크기/상태코드/처리량을 모아 JSON 파일로 내보냄
+# 결과 : http_stats.json 을 대시보드(/http-stats)에서 읽어 표시
+
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# 통계 파일 경로 (대시보드에서 읽음)
+HTTP_STATS_PATH = "http_stats.json"
+
+# 응답을 기다리는 요청의 최대 대기 시간(초) / 최대 개수
+PENDING_TTL = 300
+MAX_PENDING_REQUESTS = 50000
+
+# 히스토그램 버킷 비율 (2^(1/8) ~= 9% 간격)
+BUCKET_BASE = 2 ** (1 / 8)
+
+# 통계를 따로 모을 엔드포인트 최대 개수 (넘으면 "OTHER" 로 합침)
+MAX_ENDPOINTS = 500
+
+# 경로 정규화 : 숫자 / UUID / 긴 16진수 세그먼트는 {id} 로 치환
+_ID_SEGMENT = re.compile(r"^(?:\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|[0-9a-fA-F]{16,})$")
+
+
+def normalize_path(path):
+    path = path.split("?", 1)[0].split(";", 1)[0]  # 쿼리 / jsessionid 제거
+    return "/".join("{id}" if _ID_SEGMENT.match(segment) else segment for segment in path.split("/")) or "/"
+
+
+class ExpiringTable:
+    """TTL 과 최대 개수가 정해진 key -> (등록 시각, 값) 테이블 (스레드 안전)"""
+
+    def __init__(self, ttl=PENDING_TTL, max_size=MAX_PENDING_REQUESTS):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.expired = 0
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = (time.monotonic(), value)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self.expired += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._items.pop(key, None)
+        return default if item is None else item[1]
+
+    def expire(self):
+        """TTL 이 지난 항목 정리 (삽입 순서 = 시간 순서이므로 앞에서부터만 확인)"""
+        deadline = time.monotonic() - self.ttl
+        removed = 0
+        with self._lock:
+            while self._items:
+                key, (registered, _) = next(iter(self._items.items()))
+                if registered > deadline:
+                    break
+                del self._items[key]
+                removed += 1
+            self.expired += removed
+        return removed
+
+    def __len__(self):
+        return len(self._items)
+
+
+class LatencyHistogram:
+    """로그 스케일 버킷 히스토그램 (값은 0 이상)"""
+
+    def __init__(self, base=BUCKET_BASE):
+        self._log_base = math.log(base)
+        self.base = base
+        self.buckets = {}  # 버킷 번호 -> 개수
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, value):
+        index = int(math.log(value) / self._log_base) if value > 1e-3 else -1000
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, p):
+        """p(0~100) 백분위수 - 해당 버킷의 상한값 (max 를 넘지 않음)"""
+        if not self.count:
+            return None
+        rank = math.ceil(self.count * p / 100)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                upper = 0.0 if index == -1000 else self.base ** (index + 1)
+                return round(min(upper, self.max), 3)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 3) if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+    def to_dict(self):
+        return {"buckets": [[index, n] for index, n in sorted(self.buckets.items())], "count": self.count,
+                "total": round(self.total, 3), "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data, base=BUCKET_BASE):
+        histogram = cls(base)
+        histogram.buckets = {index: n for index, n in data["buckets"]}
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
+
+
+class SizeStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, size):
+        self.count += 1
+        self.total += size
+        if size > self.max:
+            self.max = size
+
+    def summary(self):
+        return {"mean": round(self.total / self.count, 1) if self.count else None, "max": self.max, "total": self.total}
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.request_size = SizeStats()
+        self.response_size = SizeStats()
+        self.status = {}
+        self.errors = 0
+        self.exported_count = 0  # 직전 export 시점의 요청 수 (처리량 계산용)
+
+
+class HttpStatsCollector:
+    def __init__(self, output_path=HTTP_STATS_PATH):
+        self.output_path = output_path
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._last_export = time.monotonic()
+
+    def _endpoint(self, method, path):
+        key = f"{method} {normalize_path(path)}"
+        stats = self._endpoints.get(key)
+        if stats is None:
+            if len(self._endpoints) >= MAX_ENDPOINTS:
+                key = "OTHER"
+                stats = self._endpoints.get(key)
+            if stats is None:
+                stats = self._endpoints[key] = EndpointStats()
+        return stats
+
+    def record(self, method, path, status, latency_ms, request_size, response_size):
+        with self._lock:
+            stats = self._endpoint(method, path)
+            stats.latency.record(latency_ms)
+            stats.request_size.record(request_size)
+            stats.response_size.record(response_size)
+            stats.status[status] = stats.status.get(status, 0) + 1
+
+    def record_error(self, method, path):
+        with self._lock:
+            self._endpoint(method, path).errors += 1
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            interval = max(now - self._last_export, 1e-6)
+            self._last_export = now
+            endpoints = []
+            for key, stats in self._endpoints.items():
+                count = stats.latency.count
+                endpoints.append({
+                    "endpoint": key,
+                    "latency_ms": stats.latency.summary(),
+                    "request_size": stats.request_size.summary(),
+                    "response_size": stats.response_size.summary(),
+                    "status": {str(code): n for code, n in stats.status.items()},
+                    "errors": stats.errors,
+                    "rps": round((count - stats.exported_count) / interval, 3),
+                })
+                stats.exported_count = count
+        endpoints.sort(key=lambda e: e["latency_ms"]["count"], reverse=True)
+        return {"generated": time.time(), "since": self.started, "endpoints": endpoints}
+
+    def export(self, extra=None):
+        """통계를 JSON 파일로 원자적으로 기록"""
+        data = self.snapshot()
+        if extra:
+            data.update(extra)
+        tmp_path = self.output_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.output_path)
+        return data
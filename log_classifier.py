@@ -0,0 +1,123 @@
+# 로그 라인 분류기 (Controller / Service / DAO / SQL)
+# 목표 : 라인마다 정규식 4개를 차례로 돌리던 비용을 줄여 바쁜 application.log 도 따라갈 수 있도록 함
+# 방법 : 1) 소문자 변환 후 문자열 포함 여부(controller, service, dao, sql_id:)로 대부분의 라인을 먼저 걸러냄
+#        2) 남은 라인만 네 패턴을 named group 으로 합친 정규식 한 번으로 분류
+# 결과 : 라인마다 LogEvent 하나(또는 None)를 반환
+#        SQL 라인에 실행 시간 표시(log4jdbc sqltiming 의 {executed in 12 msec}, p6spy 의 took 12ms 등)가 있으면 elapsed_ms 로 함께 반환
+
+import re
+from collections import namedtuple
+from datetime import datetime
+from functools import lru_cache
+
+# 개별 정규식 패턴 (Controller → DAO → SQL 추적)
+patterns = {
+    "controller": re.compile(r"\[\s*([\w\d_.]+controller)\.([\w\d_]+)?\s*\]", re.IGNORECASE),
+    "dao": re.compile(r"\[([\w\d_.]+dao)\.([\w\d_]+)\]\s+=+([\w\d_]+)=+", re.IGNORECASE),
+    "service" : re.compile(r"\[([\w\d_.]+service)\.([\w\d_]+)\]\s+=+([\w\d_]+)=+", re.IGNORECASE),
+    "sql": re.compile(r"(SELECT|UPDATE|INSERT|DELETE).*SQL_ID:\s+([\w\d_.]+)\.(\w+)", re.IGNORECASE)
+}
+
+# 분류 결과
+# kind : "controller" | "service" | "dao" | "sql"
+# class_name / method : 매칭된 클래스와 메서드 (controller 의 메서드가 없으면 None)
+# detail : service/dao 는 ===xxx=== 태그, sql 은 쿼리 종류(SELECT 등)
+# elapsed_ms : sql 라인에 찍힌 실행 시간 (없으면 None)
+LogEvent = namedtuple("LogEvent", ["kind", "class_name", "method", "detail", "elapsed_ms"], defaults=(None,))
+
+# SQL 실행 시간 표시 (log4jdbc : {executed in 12 msec}, p6spy : took 12ms, 기타 elapsed: 12 ms)
+ELAPSED_PATTERN = re.compile(r"(?:executed in|took|elapsed(?: time)?\s*[:=]?)\s*(\d+(?:\.\d+)?)\s*(?:msec|ms)\b",
+                             re.IGNORECASE)
+
+# 1차 필터용 문자열 (소문자 기준)
+PREFILTER_KEYWORDS = ("controller", "service", "dao", "sql_id:")
+
+# 기존 if/elif 순서(controller -> service -> dao -> sql)를 그대로 지키기 위해
+# 각 대안 앞에 .*? 를 붙여 라인 시작 기준으로 앞의 대안부터 시도하도록 합침
+_COMBINED_PATTERN = re.compile(
+    r"^(?:"
+    r".*?\[\s*(?P<ctrl_class>[\w\d_.]+controller)\.(?P<ctrl_method>[\w\d_]+)?\s*\]"
+    r"|.*?\[(?P<svc_class>[\w\d_.]+service)\.(?P<svc_method>[\w\d_]+)\]\s+=+(?P<svc_tag>[\w\d_]+)=+"
+    r"|.*?\[(?P<dao_class>[\w\d_.]+dao)\.(?P<dao_method>[\w\d_]+)\]\s+=+(?P<dao_tag>[\w\d_]+)=+"
+    r"|.*?(?P<sql_type>SELECT|UPDATE|INSERT|DELETE).*SQL_ID:\s+(?P<sql_class>[\w\d_.]+)\.(?P<sql_method>\w+)"
+    r")",
+    re.IGNORECASE,
+)
+
+
+# 라인 앞부분의 로그 시각 (log4j 기본 형식 yyyy-MM-dd HH:mm:ss,SSS 또는 .SSS)
+TIMESTAMP_PATTERN = re.compile(r"(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2}:\d{2})(?:[,.](\d{1,6}))?")
+
+# 스레드 이름 (Tomcat 요청 스레드 등)
+THREAD_PATTERN = re.compile(r"\[([\w.-]*(?:exec|thread|worker|pool|main)[\w.-]*)\]", re.IGNORECASE)
+
+# MDC 로 찍히는 요청 ID (reqId=..., requestId: ..., X-Request-ID=..., traceId=...)
+REQUEST_ID_PATTERN = re.compile(r"\b(?:x-request-id|request[_-]?id|req[_-]?id|trace[_-]?id)\s*[=:]\s*([\w-]+)", re.IGNORECASE)
+
+# 라인 문맥 정보 (시각은 epoch 초, 없으면 None)
+LineContext = namedtuple("LineContext", ["timestamp", "thread", "request_id"])
+
+
+@lru_cache(maxsize=4096)
+def _epoch_seconds(date, clock):
+    # strptime 이 느리므로 같은 초(second)의 라인은 한 번만 변환
+    try:
+        return datetime.strptime(f"{date} {clock}", "%Y-%m-%d %H:%M:%S").timestamp()
+    except ValueError:
+        return None
+
+
+def parse_line_context(line):
+    """분류된 라인에서 로그 시각 / 스레드 이름 / 요청 ID 를 추출"""
+    timestamp = None
+    if match := TIMESTAMP_PATTERN.match(line):
+        seconds = _epoch_seconds(match.group(1), match.group(2))
+        if seconds is not None:
+            fraction = match.group(3)
+            timestamp = seconds + int(fraction) / 10 ** len(fraction) if fraction else seconds
+
+    thread = match.group(1) if (match := THREAD_PATTERN.search(line)) else None
+    request_id = match.group(1) if (match := REQUEST_ID_PATTERN.search(line)) else None
+    return LineContext(timestamp, thread, request_id)
+
+
+def _prefilter(line):
+    lowered = line.lower()
+    for keyword in PREFILTER_KEYWORDS:
+        if keyword in lowered:
+            return True
+    return False
+
+
+def classify_line(line):
+    """라인 하나를 분류해 LogEvent 를 반환, 해당 없는 라인이면 None"""
+    if not _prefilter(line):
+        return None
+
+    match = _COMBINED_PATTERN.match(line)
+    if match is None:
+        return None
+
+    groups = match.groupdict()
+    if groups["ctrl_class"] is not None:
+        return LogEvent("controller", groups["ctrl_class"], groups["ctrl_method"], None)
+    if groups["svc_class"] is not None:
+        return LogEvent("service", groups["svc_class"], groups["svc_method"], groups["svc_tag"])
+    if groups["dao_class"] is not None:
+        return LogEvent("dao", groups["dao_class"], groups["dao_method"], groups["dao_tag"])
+    elapsed = ELAPSED_PATTERN.search(line, match.end())
+    return LogEvent("sql", groups["sql_class"], groups["sql_method"], groups["sql_type"],
+                    float(elapsed.group(1)) if elapsed else None)
+
+
+def classify_line_legacy(line):
+    """기존 방식(정규식 4개를 차례로 search) - 벤치마크 비교용"""
+    if match := patterns["controller"].search(line):
+        return LogEvent("controller", match.group(1), match.group(2), None)
+    elif match := patterns["service"].search(line):
+        return LogEvent("service", match.group(1), match.group(2), match.group(3))
+    elif match := patterns["dao"].search(line):
+        return LogEvent("dao", match.group(1), match.group(2), match.group(3))
+    elif match := patterns["sql"].search(line):
+        return LogEvent("sql", match.group(2), match.group(3), match.group(1))
+    return None
@@ -0,0 +1,349 @@
+# 여러 로그 파일 / 여러 인스턴스 병렬 수집
+# 목표 : 로드밸런서 뒤의 여러 Spring 인스턴스 로그와 로테이션된 과거 로그(.gz 포함)를 한 저장소로 모음
+# 방법 : 1) 경로/glob 목록("인스턴스=glob" 또는 glob)을 파일 목록으로 펼침 (인스턴스 이름이 없으면 상위 폴더 이름)
+#        2) backfill : 파일마다 process pool 의 worker 가 읽기 + 분류 + 흐름 조립 (CPU 작업을 코어 수만큼 병렬 처리)
+#           -> worker 는 흐름을 RUN_FLOWS 개씩 시각 순 정렬해서 임시 run 파일(NDJSON)로 내보내고
+#              부모는 모든 run 파일을 한 줄씩 읽으면서 heapq.merge 로 시각 순서대로 합쳐 저장소에 append
+#        3) follow : .gz 가 아닌 파일은 backfill 이 끝난 위치부터 LogTailer 로 계속 따라 읽음 (파일별 checkpoint)
+#        모든 흐름에는 "instance" 를 붙임
+# 결과 : python log_ingest.py "node1=/logs/node1/application.log*" "node2=/logs/node2/application.log*"
+
+# Trouble : 재시작하면 이미 저장한 로테이션 파일(.gz)을 다시 읽어 같은 흐름이 두 번 저장됨
+# 해결방법 : 인스턴스별로 마지막으로 저장한 흐름 시각(watermark)을 ingest_state.json 에 기록하고
+#           checkpoint 가 없는 파일을 backfill 할 때는 watermark 이전 흐름을 버림
+
+# Trouble : 로그 시각이 같은 흐름이 여럿이면 watermark 와 같은 시각인데 아직 저장하지 않은 흐름까지 함께 버려짐
+# 해결방법 : watermark 시각에 저장한 흐름의 내용 해시(개수 포함)를 같이 기록하고
+#           watermark 보다 이전 흐름 + 같은 시각이면서 이미 저장한 흐름만 버림
+
+# Trouble : worker 가 파일 전체의 흐름 목록을 pickle 로 돌려주고 부모가 모든 파일의 결과를 들고 있다가 합쳐서
+#           여러 노드의 하루치 로그를 backfill 하면 메모리가 전체 흐름 크기만큼 늘어남
+# 해결방법 : 정렬된 흐름은 임시 run 파일로 주고받고, 합치는 쪽은 run 파일마다 한 줄씩만 메모리에 둠 (외부 정렬)
+
+import argparse
+import glob
+import gzip
+import hashlib
+import heapq
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from flow_builder import FlowBuilder
+from flow_channel import FlowPublisher
+from flow_store import FlowStoreWriter, FLOW_STORE_DIR, StoreLockedError
+from log_tailer import LogTailer, write_checkpoint
+
+# 기본 수집 대상 (log_watcher 와 같은 로그 + 로테이션 파일)
+DEFAULT_SOURCES = ["/efc_dev/logs/application.log*"]
+
+# 파일별 checkpoint 폴더 / 인스턴스별 watermark 기록 파일
+CHECKPOINT_DIR = "ingest_checkpoints"
+INGEST_STATE_PATH = "ingest_state.json"
+
+# 저장소에 한 번에 append 할 흐름 수
+APPEND_BATCH_SIZE = 1000
+
+# worker 가 메모리에 모아 정렬하는 최대 흐름 수 (넘으면 정렬해서 run 파일로 내보냄)
+RUN_FLOWS = 50000
+
+# backfill 중 run 파일을 두는 임시 폴더 이름 앞부분 (끝나면 삭제)
+RUN_DIR_PREFIX = "ingest_runs_"
+
+# follow 모드에서 새 로그 확인 간격 (초)
+FOLLOW_POLL_INTERVAL = 0.5
+
+# 파일 이름에 쓸 수 없는 문자
+_UNSAFE_CHARS = re.compile(r"[^\w.-]+")
+
+
+def expand_sources(sources):
+    """["인스턴스=glob" 또는 "glob", ...] -> [(인스턴스, 경로), ...] (중복 경로 제외)"""
+    files = []
+    seen = set()
+    for source in sources:
+        instance, sep, pattern = source.partition("=")
+        if not sep:
+            instance, pattern = None, source
+        for path in sorted(glob.glob(pattern)):
+            path = os.path.abspath(path)
+            if path in seen or not os.path.isfile(path):
+                continue
+            seen.add(path)
+            files.append((instance or os.path.basename(os.path.dirname(path)) or "default", path))
+    return files
+
+
+def checkpoint_path_for(instance, path):
+    return os.path.join(CHECKPOINT_DIR, _UNSAFE_CHARS.sub("_", f"{instance}-{os.path.basename(path)}") + ".checkpoint")
+
+
+def load_state(state_path=INGEST_STATE_PATH):
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_state(state, state_path=INGEST_STATE_PATH):
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, state_path)
+
+
+def flow_digest(flow):
+    """watermark 와 같은 시각의 흐름을 구분하는 내용 해시 (instance 제외)"""
+    content = {key: value for key, value in flow.items() if key != "instance"}
+    return hashlib.sha1(json.dumps(content, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _write_run(flows, run_path):
+    # 시각 순으로 정렬해서 NDJSON run 파일로 기록
+    flows.sort(key=lambda flow: flow["timestamp"])
+    with open(run_path, "w", encoding="utf-8") as f:
+        for flow in flows:
+            f.write(json.dumps(flow, ensure_ascii=False))
+            f.write("\n")
+
+
+def _read_run(run_path):
+    with open(run_path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def parse_log_file(instance, path, start_offset=0, watermark=None, run_prefix=None, replay=None):
+    """(worker 프로세스) 로그 파일 하나를 시각 순 정렬된 run 파일들로 변환
+
+    run_prefix 뒤에 번호를 붙인 파일에 흐름을 RUN_FLOWS 개씩 정렬해서 기록
+    watermark : (마지막으로 저장한 흐름 시각, 그 시각에 저장한 흐름 해시 -> 개수) - 이미 저장한 흐름은 건너뜀
+    replay : follow checkpoint 의 (처리했던 위치, 진행 중이던 흐름 시작 위치 목록) - 그 앞에서 시작해 이미 저장한 흐름은 건너뜀
+    반환값 : (instance, path, run 파일 목록, inode, 완전한 라인까지 읽은 바이트 위치, 흐름 수)
+    .gz 파일은 처음부터 끝까지 읽고, 위치는 None
+    """
+    skip = None
+    if replay:
+        processed, open_offsets = replay[0], set(replay[1])
+        skip = lambda position: position[1] < processed and position[1] not in open_offsets
+    if watermark is not None:
+        watermark, stored = watermark[0], dict(watermark[1])
+    builder = FlowBuilder(skip=skip)
+    flows = []
+    run_paths = []
+    count = 0
+    compressed = path.endswith(".gz")
+    offset = None if compressed else start_offset
+
+    def keep(completed):
+        nonlocal flows, count
+        for flow in completed:
+            if watermark is not None and flow["timestamp"] <= watermark:
+                if flow["timestamp"] < watermark:
+                    continue
+                digest = flow_digest(flow)
+                if stored.get(digest):
+                    stored[digest] -= 1  # watermark 시각에 이미 저장한 흐름
+                    continue
+            flow["instance"] = instance
+            flows.append(flow)
+        if len(flows) >= RUN_FLOWS:
+            run_paths.append(f"{run_prefix}-{len(run_paths)}.ndjson")
+            _write_run(flows, run_paths[-1])
+            count += len(flows)
+            flows = []
+
+    with (gzip.open(path, "rb") if compressed else open(path, "rb")) as f:
+        inode = None if compressed else os.fstat(f.fileno()).st_ino
+        if start_offset and not compressed:
+            f.seek(start_offset)
+        for raw_line in f:
+            if not raw_line.endswith(b"\n"):
+                break  # 아직 쓰는 중인 마지막 라인은 follow 단계에서 읽음
+            position = None
+            if not compressed:
+                position = (inode, offset)
+                offset += len(raw_line)
+            completed = builder.feed_line(raw_line.decode("utf-8", "replace"), position)
+            if completed:
+                keep(completed)
+    keep(builder.finish())
+
+    if flows:
+        run_paths.append(f"{run_prefix}-{len(run_paths)}.ndjson")
+        _write_run(flows, run_paths[-1])
+        count += len(flows)
+    return instance, path, run_paths, inode, offset, count
+
+
+class LogIngestor:
+    def __init__(self, sources, store_dir=FLOW_STORE_DIR, workers=None, state_path=INGEST_STATE_PATH):
+        self.files = expand_sources(sources)
+        self.workers = workers or os.cpu_count()
+        self.state_path = state_path
+        # 인스턴스 -> {"watermark": 마지막으로 저장한 흐름 시각, "at_watermark": {그 시각에 저장한 흐름 해시: 개수}}
+        self.state = load_state(state_path)
+        self.writer = FlowStoreWriter(store_dir)
+        self.publisher = None
+        self.tailers = []  # (instance, LogTailer, FlowBuilder)
+
+        self.flows_written = 0
+        self.bytes_read = 0
+
+    def _watermark(self, instance):
+        instance_state = self.state.get(instance, {})
+        if instance_state.get("watermark") is None:
+            return None
+        return instance_state["watermark"], instance_state.get("at_watermark", {})
+
+    def _append(self, flows):
+        cursor = self.writer.append(flows)
+        for flow in flows:
+            instance_state = self.state.setdefault(flow["instance"], {})
+            watermark = instance_state.get("watermark")
+            if watermark is None or flow["timestamp"] > watermark:
+                instance_state["watermark"] = flow["timestamp"]
+                instance_state["at_watermark"] = {flow_digest(flow): 1}
+            elif flow["timestamp"] == watermark:
+                at_watermark = instance_state.setdefault("at_watermark", {})
+                digest = flow_digest(flow)
+                at_watermark[digest] = at_watermark.get(digest, 0) + 1
+        if self.publisher is not None:
+            self.publisher.publish({"type": "flows", "cursor": cursor, "flows": flows})
+        self.flows_written += len(flows)
+
+    # ---- backfill ----
+    def backfill(self):
+        """모든 파일을 병렬로 읽어 시각 순으로 합친 뒤 저장소에 기록"""
+        os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+        run_dir = tempfile.mkdtemp(prefix=RUN_DIR_PREFIX, dir=".")
+        jobs = []
+        for instance, path in self.files:
+            checkpoint_path = checkpoint_path_for(instance, path)
+            resume = self._resume_offset(path, checkpoint_path)
+            if resume is None:
+                start_offset, watermark, replay = 0, self._watermark(instance), None
+            else:
+                (start_offset, replay), watermark = resume, None
+            jobs.append((instance, path, start_offset, watermark, os.path.join(run_dir, str(len(jobs))), replay))
+            self.bytes_read += max(os.path.getsize(path) - start_offset, 0)
+
+        started = time.monotonic()
+        print(f"### {len(jobs)}개 파일 backfill 시작 (worker {self.workers}개)")
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                results = list(executor.map(parse_log_file, *zip(*jobs))) if jobs else []
+
+            # run 파일마다 한 줄씩만 읽으면서 시각 순서대로 합침
+            runs = [_read_run(run_path) for result in results for run_path in result[2]]
+            batch = []
+            for flow in heapq.merge(*runs, key=lambda flow: flow["timestamp"]):
+                batch.append(flow)
+                if len(batch) >= APPEND_BATCH_SIZE:
+                    self._append(batch)
+                    batch = []
+            if batch:
+                self._append(batch)
+            self.writer.flush()
+        finally:
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+        # 저장이 끝난 뒤에 파일별 읽은 위치 기록 -> follow 는 그 위치부터 이어서 읽음
+        for instance, path, _, inode, offset, _ in results:
+            if offset is not None:
+                write_checkpoint(checkpoint_path_for(instance, path), path, inode, offset)
+        save_state(self.state, self.state_path)
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        print(f"### backfill 완료: 흐름 {self.flows_written}건, {self.bytes_read / 1024 / 1024:.1f} MB, "
+              f"{elapsed:.1f}초 ({self.bytes_read / 1024 / 1024 / elapsed:.1f} MB/s)")
+
+    def _resume_offset(self, path, checkpoint_path):
+        # 같은 파일의 checkpoint 가 있으면 (그 위치, 다시 읽는 구간 정보) (없거나 다른 파일이면 None)
+        if path.endswith(".gz") or not os.path.exists(checkpoint_path):
+            return None
+        try:
+            with open(checkpoint_path, "r", encoding="utf-8") as f:
+                checkpoint = json.load(f)
+            st = os.stat(path)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if checkpoint.get("inode") == st.st_ino and checkpoint.get("offset", 0) <= st.st_size:
+            replay = (checkpoint["processed"], checkpoint.get("open", ())) if "processed" in checkpoint else None
+            return checkpoint["offset"], replay
+        return None
+
+    # ---- follow ----
+    def follow(self):
+        """.gz 가 아닌 파일을 Ctrl+C 까지 계속 따라 읽음"""
+        self.publisher = FlowPublisher()
+        for instance, path in self.files:
+            if not path.endswith(".gz"):
+                tailer = LogTailer(path, checkpoint_path=checkpoint_path_for(instance, path))
+                self.tailers.append((instance, tailer, FlowBuilder(skip=tailer.replayed)))
+        print(f"## {len(self.tailers)}개 로그 파일 감시 시작 ##")
+
+        try:
+            while True:
+                if not self.poll():
+                    time.sleep(FOLLOW_POLL_INTERVAL)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for instance, tailer, builder in self.tailers:
+                flows = builder.finish()  # 진행 중이던 흐름도 저장
+                for flow in flows:
+                    flow["instance"] = instance
+                if flows:
+                    self._append(flows)
+                tailer.close()
+            save_state(self.state, self.state_path)
+            self.publisher.close()
+
+    def poll(self):
+        """모든 파일의 새 라인을 한 번 읽어 저장, 새 흐름이 있었으면 True"""
+        found = False
+        for instance, tailer, builder in self.tailers:
+            flows = []
+            for line in tailer.read_lines():
+                flows.extend(builder.feed_line(line, tailer.line_position))
+            flows.extend(builder.expire_idle())  # 한동안 라인이 없는 흐름은 완료 처리 (로그 시각 기준, 밀린 파일도 안전)
+            if flows:
+                for flow in flows:
+                    flow["instance"] = instance
+                self._append(flows)
+                found = True
+            tailer.commit(tailer.position(builder.open_positions()))
+        if found:
+            save_state(self.state, self.state_path)
+        return found
+
+    def close(self):
+        self.writer.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="여러 로그 파일 / 인스턴스 병렬 수집")
+    parser.add_argument("sources", nargs="*", default=DEFAULT_SOURCES, help='"인스턴스=glob" 또는 glob (.gz 포함)')
+    parser.add_argument("--workers", type=int, default=None, help="backfill worker 프로세스 수 (기본: CPU 수)")
+    parser.add_argument("--no-follow", action="store_true", help="backfill 만 하고 종료")
+    args = parser.parse_args()
+
+    try:
+        # 같은 저장소에 log_watcher / pipeline 이 쓰고 있으면 시작하지 않음
+        ingestor = LogIngestor(args.sources, workers=args.workers)
+    except StoreLockedError as e:
+        print(f"### {e}")
+        sys.exit(1)
+    try:
+        ingestor.backfill()
+        if not args.no_follow:
+            ingestor.follow()
+    finally:
+        ingestor.close()
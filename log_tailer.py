@@ -0,0 +1,195 @@
+# 로그 파일 tail (바이트 오프셋 기반 스트리밍 읽기)
+# 목표 : 로그가 수 GB 가 되어도 메모리에 한 번에 올리지 않고, 로테이션/truncate 후에도 계속 따라 읽음
+# 방법 : 바이너리 모드로 일정 크기(chunk)씩 읽어 완전한 라인만 돌려주고, 잘린 마지막 라인은 다음 읽기로 넘김
+#        inode 가 바뀌면 로테이션(기존 파일을 끝까지 읽은 뒤 새 파일로 전환), 크기가 줄면 copytruncate 로 판단
+#        읽은 위치는 checkpoint 파일에 저장해서 재시작 시 그 위치부터 이어서 읽음
+# 결과 : LogHandler 는 read_lines() 제너레이터로 새 라인만 스트리밍으로 처리
+
+# Trouble : 흐름은 여러 라인에 걸쳐 있어서, 읽은 위치까지 checkpoint 하면 진행 중이던 흐름의 앞부분이 재시작 시 사라짐
+# 해결방법 : checkpoint 에는 진행 중인 가장 오래된 흐름의 시작 위치를 저장하고, 처리했던 위치와 진행 중이던 흐름의 시작 위치도
+#           함께 남겨서 재시작 후 다시 읽는 구간에서 이미 저장한 흐름은 FlowBuilder(skip=tailer.replayed) 로 건너뜀
+#           (로테이션 전 파일에서 시작된 흐름은 다시 읽을 수 없으므로 제외)
+
+# Trouble : Windows 에서는 열린 파일을 log4j 가 rename 하지 못하므로 읽을 때마다 파일을 열고 닫음
+#           (이 경우 로테이션 직전에 기록된 마지막 라인은 놓칠 수 있음)
+
+import json
+import os
+
+# 한 번에 읽을 크기
+CHUNK_SIZE = 64 * 1024
+
+# 개행 없이 이 크기를 넘는 라인은 강제로 잘라서 반환 (carry 버퍼 상한)
+MAX_LINE_BYTES = 1024 * 1024
+
+# 파일 핸들을 읽기 사이에도 유지할지 여부 (POSIX 에서만 유지)
+KEEP_FILE_OPEN = os.name == "posix"
+
+
+def write_checkpoint(checkpoint_path, path, inode, offset, processed=None, open_offsets=()):
+    """checkpoint 파일을 원자적으로 저장 (다음에 LogTailer 를 만들면 이 위치부터 읽음)
+
+    processed : 실제로 처리한 위치 (offset 보다 뒤면 그 사이에서 시작해 이미 저장한 흐름은 재시작 후 건너뜀)
+    open_offsets : 저장 시점에 진행 중이던 흐름의 시작 위치 (processed 앞이어도 다시 만들어야 하는 흐름)
+    """
+    checkpoint = {"path": path, "inode": inode, "offset": offset}
+    if processed is not None and processed > offset:
+        checkpoint["processed"] = processed
+        checkpoint["open"] = sorted(open_offsets)
+    tmp_path = checkpoint_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, checkpoint_path)
+
+
+class LogTailer:
+    def __init__(self, path, checkpoint_path=None, chunk_size=CHUNK_SIZE, encoding="utf-8"):
+        self.path = path
+        self.checkpoint_path = checkpoint_path
+        self.chunk_size = chunk_size
+        self.encoding = encoding
+
+        self._file = None
+        self._inode = None
+        self._offset = 0  # 파일에서 다음에 읽을 바이트 위치
+        self._carry = b""  # 아직 개행을 만나지 못한 마지막 라인 조각
+        self.line_offset = 0  # 마지막으로 반환한 라인의 시작 위치
+        self._replay = None  # 재시작 후 다시 읽는 구간 (inode, 처리했던 위치, 진행 중이던 흐름 시작 위치 set)
+        self.rotations = 0
+        self.truncations = 0
+
+        self._load_checkpoint()
+
+    @property
+    def committed_offset(self):
+        """완전한 라인으로 처리된 위치 (checkpoint 에 저장되는 값)"""
+        return self._offset - len(self._carry)
+
+    def _load_checkpoint(self):
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                checkpoint = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            print("### checkpoint 파일을 읽지 못해 처음부터 읽겠습니다.")
+            return
+
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        # 같은 파일이고 그 사이 잘리지 않았을 때만 이어서 읽음
+        if checkpoint.get("inode") == st.st_ino and checkpoint.get("offset", 0) <= st.st_size:
+            self._inode = st.st_ino
+            self._offset = checkpoint["offset"]
+            if checkpoint.get("processed", 0) > self._offset:
+                self._replay = (st.st_ino, checkpoint["processed"], set(checkpoint.get("open", ())))
+            print(f"### checkpoint 위치({self._offset} bytes)부터 이어서 읽습니다.")
+
+    @property
+    def line_position(self):
+        """마지막으로 반환한 라인의 위치 (inode, 시작 offset) - FlowBuilder.feed_line(line, position) 에 넘김"""
+        return (self._inode, self.line_offset)
+
+    def position(self, open_positions=()):
+        """checkpoint 에 기록할 위치 - 다른 스레드에서 저장이 끝난 뒤 commit(position) 으로 기록
+
+        open_positions(FlowBuilder.open_positions()) 가 있으면 그중 가장 오래된 흐름의 시작 위치부터 다시 읽도록 함
+        반환값 : (inode, 다시 읽을 offset, 처리한 offset, 진행 중인 흐름 시작 offset 목록)
+        """
+        processed = self.committed_offset
+        open_offsets = [offset for inode, offset in open_positions if inode == self._inode and offset < processed]
+        return (self._inode, min(open_offsets, default=processed), processed, open_offsets)
+
+    def replayed(self, position):
+        """재시작 전에 이미 완료해서 저장한 흐름의 시작 위치면 True (FlowBuilder(skip=...) 용)"""
+        if self._replay is None:
+            return False
+        inode, processed, open_offsets = self._replay
+        return position[0] == inode and position[1] < processed and position[1] not in open_offsets
+
+    def backlog_bytes(self):
+        """로그 파일에서 아직 처리하지 않은 바이트 수 (대략값, 자체 계측용)"""
+        try:
+            return max(os.stat(self.path).st_size - self.committed_offset, 0)
+        except FileNotFoundError:
+            return 0
+
+    def commit(self, position=None):
+        """처리한 위치(기본값은 현재 위치)를 checkpoint 파일에 원자적으로 저장"""
+        inode, offset, processed, open_offsets = position or self.position()
+        if not self.checkpoint_path or inode is None:
+            return
+        write_checkpoint(self.checkpoint_path, self.path, inode, offset, processed, open_offsets)
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _reopen(self, st):
+        self._close()
+        self._file = open(self.path, "rb")
+        if st.st_ino != self._inode:
+            self._inode = st.st_ino
+            self._offset = 0
+            self._carry = b""
+        self._file.seek(self._offset)
+
+    def _read_to_end(self):
+        # 현재 열린 파일을 EOF 까지 chunk 단위로 읽어 완전한 라인만 반환
+        while True:
+            chunk = self._file.read(self.chunk_size)
+            if not chunk:
+                return
+            start = self.committed_offset  # data 의 시작 위치
+            self._offset += len(chunk)
+            data = self._carry + chunk
+            end = data.rfind(b"\n") + 1
+            self._carry = data[end:]
+            if end:
+                for raw_line in data[:end - 1].split(b"\n"):
+                    self.line_offset = start
+                    start += len(raw_line) + 1
+                    yield raw_line.decode(self.encoding, "replace") + "\n"
+            if len(self._carry) > MAX_LINE_BYTES:
+                carry, self._carry = self._carry, b""
+                self.line_offset = start
+                yield carry.decode(self.encoding, "replace") + "\n"
+
+    def read_lines(self):
+        """마지막으로 읽은 위치 이후의 완전한 라인을 하나씩 반환 (개행 포함)"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return  # 로테이션 직후 새 파일이 아직 없는 경우
+
+        if self._file is not None and st.st_ino != self._inode:
+            # 로테이션 : 기존 파일에 남은 라인을 먼저 읽고 새 파일로 전환
+            yield from self._read_to_end()
+            self._close()
+            self.rotations += 1
+            print("### 로그 로테이션 감지 -> 새 로그 파일부터 다시 읽습니다.")
+        elif st.st_ino == self._inode and st.st_size < self._offset:
+            # copytruncate : 같은 파일의 크기가 줄어듦 -> 처음부터 다시 읽음
+            self._offset = 0
+            self._carry = b""
+            self._replay = None
+            self.truncations += 1
+            self._close()
+            print("### 로그 파일 truncate 감지 -> 처음부터 다시 읽습니다.")
+
+        if self._file is None:
+            self._reopen(st)
+
+        try:
+            yield from self._read_to_end()
+        finally:
+            if not KEEP_FILE_OPEN:
+                self._close()
+
+    def close(self):
+        self._close()
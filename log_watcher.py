@@ -10,140 +10,161 @@
 
 import time
 import os
-import re
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-import json
 import threading
 import subprocess
 import sys
+from flow_store import FlowStoreWriter, FLOW_STORE_DIR
+from flow_builder import FlowBuilder
+from log_tailer import LogTailer
+from flow_channel import FlowPublisher
+from event_scheduler import CoalescingScheduler
+from metrics import heartbeat, registry, start_exporter
 
 # 로그 파일 경로
 LOG_FILE_PATH = "/efc_dev/logs/application.log"
 LOG_DIR = os.path.dirname(LOG_FILE_PATH)
 
-# 로그 -> json 저장 파일
-LOG_OUTPUT_PATH = "execution_flow.json"
+# 마지막으로 읽은 로그 위치 저장 파일 (재시작 시 이어 읽기)
+CHECKPOINT_PATH = "log_watcher.checkpoint"
 
-# 정규식 패턴 (Controller → DAO → SQL 추적)
-patterns = {
-    "controller": re.compile(r"\[\s*([\w\d_.]+controller)\.([\w\d_]+)?\s*\]", re.IGNORECASE),
-    "dao": re.compile(r"\[([\w\d_.]+dao)\.([\w\d_]+)\]\s+=+([\w\d_]+)=+", re.IGNORECASE),
-    "service" : re.compile(r"\[([\w\d_.]+service)\.([\w\d_]+)\]\s+=+([\w\d_]+)=+", re.IGNORECASE),
-    "sql": re.compile(r"(SELECT|UPDATE|INSERT|DELETE).*SQL_ID:\s+([\w\d_.]+)\.(\w+)", re.IGNORECASE)
-}
+# 한 번의 처리에서 이 개수만큼 흐름이 모이면 중간 저장
+FLOW_BATCH_SIZE = 1000
 
+# modified 이벤트 묶음 처리 설정 (초)
+EVENT_COALESCE_WINDOW = 0.2
+MIN_PROCESS_INTERVAL = 0.5
 
-# 실행 흐름 JSON 저장(누적방식)
+# 저장소 writer / 대시보드 채널은 직접 실행할 때(__main__) 생성
+# (pipeline.py 등에서 import 할 때는 파일 감시나 저장이 시작되지 않도록 함)
+flow_writer = None
+flow_publisher = None
+
+# 실행 흐름 저장(누적방식) -> 기존 데이터를 다시 읽지 않고 새 흐름만 append
 def save_execution_flow(execution_flows):
-    # 데이터 불러오기
-    if os.path.exists(LOG_OUTPUT_PATH):
-        print("### 실행 흐름을 저장하겠습니다. 데이터를 읽기 시작")
-        with open(LOG_OUTPUT_PATH, "r", encoding="utf-8") as f:
-            try:
-                existing_data = json.load(f)
-            except json.JSONDecodeError:
-                existing_data = []
-                print("### 데이터 읽기 실패")
-    else:
-        existing_data = []
+    cursor = flow_writer.append(execution_flows)
+    flow_publisher.publish({"type": "flows", "cursor": cursor, "flows": execution_flows})
+    print(f"### 실행 흐름 {len(execution_flows)}건이 {FLOW_STORE_DIR}에 누적 저장되었습니다.")
+
 
-    # 새 실행 흐름 추가
-    with open(LOG_OUTPUT_PATH, "w", encoding="utf-8") as f:
-        json.dump(existing_data, f, ensure_ascii=False, indent=4)
+# 실행 흐름 출력
+def print_execution_flows(execution_flows):
+    print("\n### 실행 흐름 추적 결과 ###")
+    for flow in execution_flows:
+        result = []
+        if flow["controller"]:
+            result.append(f"Controller: {flow['controller']}")
+        if flow["service"]:
+            result.append(f"Service: {flow['service']}")
+        if flow["dao"]:
+            result.append(f"DAO: {flow['dao']}")
+        if flow["sql"]:
+            sql_strings = [f"{sql['query_type']}.{sql['class']}.{sql['method']}\n" for sql in flow["sql"]]
+            result.append(f"SQL: {', '.join(sql_strings)}")
 
-    print(f"### 실행 흐름이 {LOG_OUTPUT_PATH}에 누적 저장되었습니다.")
+        print(" -> ".join(result))
 
 
 class LogHandler(FileSystemEventHandler):
     def __init__(self):
-        self.last_position = 0  # 마지막으로 읽은 위치
-    
+        # 바이트 오프셋 기반 tail (로테이션/truncate 감지 + checkpoint 로 재시작 시 이어 읽기)
+        self.tailer = LogTailer(LOG_FILE_PATH, checkpoint_path=CHECKPOINT_PATH)
+
+        # 스레드/요청별로 진행 중인 흐름을 읽기 사이에도 유지 (흐름 하나가 여러 번의 읽기에 걸쳐 있을 수 있음)
+        # 재시작 후 checkpoint 앞부분을 다시 읽을 때 이미 저장한 흐름은 건너뜀
+        self.builder = FlowBuilder(skip=self.tailer.replayed)
+
+        # modified 이벤트 폭주를 묶어서 전용 스레드에서 처리 (observer 스레드는 바로 반환)
+        self.scheduler = CoalescingScheduler(self.process_new_lines, window=EVENT_COALESCE_WINDOW,
+                                             min_interval=MIN_PROCESS_INTERVAL, name="log_watcher").start()
+
+        # 자체 계측 (web_dashboard /metrics 에서 수집) - 라인 처리량, 밀린 로그, 진행 중인 흐름
+        self.lines_read = registry.counter("log_lines_read_total", "읽은 로그 라인 수")
+        self.flows_built = registry.counter("log_flows_built_total", "완성된 실행 흐름 수")
+        registry.gauge("log_backlog_bytes", "아직 읽지 않은 로그 바이트 수", func=self.tailer.backlog_bytes)
+        registry.gauge("log_open_flows", "진행 중인 흐름 수", func=lambda: self.builder.open_flows)
+
+
+    # 모아둔 흐름을 출력/저장한 뒤 읽은 위치를 checkpoint 에 기록 (진행 중인 흐름이 있으면 그 시작 위치까지만)
+    def flush_flows(self, execution_flows):
+        if execution_flows:
+            self.flows_built.inc(len(execution_flows))
+            print_execution_flows(execution_flows)
+            save_execution_flow(execution_flows)
+
+            # 실행 흐름 시각화 갱신
+            #subprocess.Popen([sys.executable, "visualizer.py"], creationflags=subprocess.CREATE_NEW_CONSOLE)
+
+        self.tailer.commit(self.tailer.position(self.builder.open_positions()))
+
 
     def on_modified(self, event):
-        if not event.is_directory and event.src_path.endswith("application.log"):
-            with open(LOG_FILE_PATH, "r", encoding="utf-8") as f:
-                f.seek(self.last_position)  # 마지막 읽은 위치부터 읽기
-                new_lines = f.readlines()
-                self.last_position = f.tell()  # 현재 파일 위치 저장
-
-            if not new_lines:
-                return  # 새로운 로그가 없으면 리턴
-
-            execution_flows = []  # 실행 흐름 리스트
-            temp_flow = {"controller": None, "service" : None , "dao": None, "sql": []}
-
-            for line in new_lines:
-                if match := patterns["controller"].search(line):
-                    if temp_flow["controller"]:
-                        execution_flows.append(temp_flow)  # 이전 흐름 저장
-                        temp_flow = {"controller": None, "service" : None , "dao": None, "sql": []}
-
-                    temp_flow["controller"] = {
-                        "class": match.group(1),
-                        "function": match.group(2) if match.group(2) else "Unknown"
-                    }
-                elif match := patterns["service"].search(line):
-                    temp_flow["service"] = {
-                        "class": match.group(1),
-                        "method": match.group(2)
-                    }
-
-                elif match := patterns["dao"].search(line):
-                    temp_flow["dao"] = {
-                        "class": match.group(1),
-                        "method": match.group(2)
-                    }
-
-                elif match := patterns["sql"].search(line):
-                    temp_flow["sql"].append({
-                        "query_type": match.group(1),
-                        "class": match.group(2),
-                        "method": match.group(3)
-                    })
-
-
-            if temp_flow["controller"]:
-                execution_flows.append(temp_flow)  
-
-            # 실행 흐름 출력
-            if execution_flows:
-                print("\n### 실행 흐름 추적 결과 ###")
-                for flow in execution_flows:
-                    result = []
-                    if flow["controller"]:
-                        result.append(f"Controller: {flow['controller']}")
-                    if flow["service"]:
-                        result.append(f"Service: {flow['service']}")
-                    if flow["dao"]:
-                        result.append(f"DAO: {flow['dao']}")
-                    if flow["sql"]:
-                        sql_strings = [f"{sql['query_type']}.{sql['class']}.{sql['method']}\n" for sql in flow["sql"]]
-                        result.append(f"SQL: {', '.join(sql_strings)}")
-
-                    print(" -> ".join(result))
-
-
-            #실행 흐름 Json 저장
-            if execution_flows:
-                save_execution_flow(execution_flows)
-
-
-                # 실행 흐름 시각화 갱신
-                #subprocess.Popen([sys.executable, "visualizer.py"], creationflags=subprocess.CREATE_NEW_CONSOLE)
-                
-
-
-# 파일 감시 설정
-observer = Observer()
-event_handler = LogHandler()
-observer.schedule(event_handler, path=LOG_DIR, recursive=False)
-observer.start()
-
-try:
-    print("## 로그 감지 시작 ##")
-    while True:
-        time.sleep(1)
-except KeyboardInterrupt:
-    observer.stop()
-observer.join()
+        # 감시 대상 로그 파일만 처리 (여러 파일/인스턴스 수집은 log_ingest.py 사용)
+        if not event.is_directory and os.path.basename(event.src_path) == os.path.basename(LOG_FILE_PATH):
+            self.scheduler.notify()
+
+
+    # 새로 추가된 로그 라인을 읽어 실행 흐름으로 변환 (scheduler 의 worker 스레드에서 실행)
+    def process_new_lines(self):
+        execution_flows = []  # 실행 흐름 리스트
+        lines_read = 0  # 라인마다 counter 잠금을 잡지 않도록 모아서 반영
+
+        # 전체를 readlines() 하지 않고 완전한 라인만 chunk 단위로 스트리밍
+        for line in self.tailer.read_lines():
+            lines_read += 1
+            # 1차 문자열 필터 + 합쳐진 정규식 한 번으로 분류 -> 같은 스레드/요청에 새 Controller 가 나오면 이전 흐름 완료
+            execution_flows.extend(self.builder.feed_line(line, self.tailer.line_position))
+
+            # 밀린 로그가 많아도 메모리에 쌓아두지 않도록 일정 개수마다 저장
+            if len(execution_flows) >= FLOW_BATCH_SIZE:
+                self.lines_read.inc(lines_read)
+                lines_read = 0
+                self.flush_flows(execution_flows)
+                execution_flows = []
+        self.lines_read.inc(lines_read)
+
+        # 한동안 라인이 없는 흐름은 완료 처리
+        execution_flows.extend(self.builder.expire_idle())
+
+        #실행 흐름 저장 + checkpoint 기록
+        self.flush_flows(execution_flows)
+
+        # 처리 한 번이 끝까지 진행됐음을 supervisor 에 알림 (멈춤 감지)
+        heartbeat()
+
+
+
+
+if __name__ == "__main__":
+    # 로그 -> 실행 흐름 저장소 (append-only 세그먼트)
+    flow_writer = FlowStoreWriter(FLOW_STORE_DIR)
+
+    # 새 흐름을 대시보드로 바로 전달하는 채널 (대시보드가 꺼져 있으면 버려짐)
+    flow_publisher = FlowPublisher()
+
+    # 자체 계측 지표를 metrics/log_watcher.json 에 주기적으로 기록
+    metrics_exporter = start_exporter("log_watcher")
+
+    # 파일 감시 설정
+    observer = Observer()
+    event_handler = LogHandler()
+    observer.schedule(event_handler, path=LOG_DIR, recursive=False)
+    observer.start()
+
+    try:
+        print("## 로그 감지 시작 ##")
+        while True:
+            time.sleep(1)
+            # 로그가 더 쌓이지 않아도 진행 중인 흐름이 제때 완료되고 heartbeat 가 갱신되도록 주기적으로 처리 요청
+            event_handler.scheduler.notify()
+    except KeyboardInterrupt:
+        observer.stop()
+    observer.join()
+    event_handler.scheduler.stop()
+    event_handler.flush_flows(event_handler.builder.finish())
+    print(f"### 이벤트 처리 통계: {event_handler.scheduler.stats()}")
+    event_handler.tailer.close()
+    flow_writer.close()
+    flow_publisher.close()
+    metrics_exporter.close()
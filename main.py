@@ -4,6 +4,7 @@
 # http_sniffer.py -> HTTP 요청을 가로채 추적 시작
 # visualizer.py -> 실시간 로그 감지 후 실행 흐름을 시각화 (원하는 시점은 일단 선택 사항)
 # web_dashboard.py -> Flask 웹 대시보드 실행
+# flow_rollup.py -> 시간대별 호출 경로 집계 + 오래된 원본 흐름 정리
 # 방법 : subprocess 모듈을 활용해서 각 파일을 백그라운드에서 실행
 #        threading 또는 multithreading을 사용해서 병렬 실행
 
@@ -20,13 +21,16 @@
 # 3. 항상 포트번호 신경쓰기 -> 폐쇠망일 경우엔 더더욱 사용할 수 있는지 체크해야함
 
 
+import argparse
 import subprocess
 import time
-import signal
 import sys
-import datetime
-import threading
-from visualizer import visualize_execution_flow
+import os
+import asyncio
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from visualizer import visualize_execution_flow, render_farm
+from supervisor import Supervisor, python_child
+from flow_channel import channel_authkey
 import matplotlib.pyplot as plt
 
 # Windows 환경에서 UTF-8 출력 강제 설정
@@ -36,9 +40,20 @@ sys.stdout.reconfigure(encoding="utf-8")
 MODULES = {
     "log_watcher": "log_watcher.py",
     "visualizer": "visualizer.py",
-    "web_dashboard": "web_dashboard\web_dashboard.py"
+    "web_dashboard": os.path.join("web_dashboard", "web_dashboard.py"),
+    "flow_rollup": "flow_rollup.py",
 }
 
+# 작업 루프가 metrics.heartbeat() 를 호출하는 모듈만 멈춤 감지 (이 시간 동안 heartbeat 가 없으면 재시작, 초)
+# log_watcher 는 1초마다 로그를 확인하고, flow_rollup 은 ROLLUP_INTERVAL(60초)마다 집계
+STALL_TIMEOUTS = {
+    "log_watcher": 60.0,
+    "flow_rollup": 300.0,
+}
+
+# 종료 시 최종 그래프 렌더링을 기다리는 최대 시간 (초)
+FINAL_RENDER_TIMEOUT = 15
+
 # 터미널 실행 명령어
 MITMPROXY_CMD_UI = ["mitmproxy", "--mode", "reverse:http://localhost:8082", "-p", "8080", "-s", "http_sniffer.py"]
 
@@ -55,81 +70,82 @@ def start_mitmproxy():
     return process
     
 
-# 실행할 프로세스 저장 리스트
-processes = {}
+# 모듈 실행 + 관리 (출력 수집 / 죽으면 재시작 / 상태 기록)
+# Trouble : stdout 만 읽고 stderr 는 읽지 않아서, 에러를 많이 찍는 모듈은 파이프가 가득 차 멈춰버림
+#           모듈 하나가 죽어도 아무도 다시 띄우지 않아 분석 전체가 조용히 멈춤
+# 해결방법 : supervisor.Supervisor 가 asyncio 로 stdout / stderr 를 모두 읽고, 죽은 모듈은 backoff 후 재시작
+def run_modules():
+    supervisor = Supervisor([python_child(name, script, stall_timeout=STALL_TIMEOUTS.get(name))
+                             for name, script in MODULES.items()])
+    try:
+        asyncio.run(supervisor.run())
+    except KeyboardInterrupt:
+        pass  # Ctrl+C -> supervisor 가 모든 모듈을 동시에 종료한 뒤 여기로 옴
 
-# 실시간 프로세스 출력 읽기
-def read_process_output(name, process):
-    """각 프로세스의 실시간 출력을 읽어와 표시"""
-    for line in process.stdout:
-        print(f"[{name}] {line.strip()}")  # .decode() 제거
 
-# 모듈 실행
-def start_modules():
-    for name, script in MODULES.items():
-        try:
-            print(f"### {name} 실행 중...")
-            process = subprocess.Popen(
-                [sys.executable, script],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                encoding="utf-8",  # UTF-8 강제 설정
-                bufsize=1,
-                universal_newlines=True
-            )
-            processes[name] = process
-
-            # 각 프로세스 출력을 별도 스레드에서 읽어오기
-            thread = threading.Thread(target=read_process_output, args=(name, process), daemon=True)
-            thread.start()
-
-        except Exception as e:
-            now = datetime.datetime.now()
-            print(f"### [{now}] {name} 실행 실패: {e}")
-
-# 실행 중인 모듈 종료
-def stop_modules():
-    print("\n### 모든 프로세스 종료 중...")
-    for name, process in processes.items():
-        print(f"⏹ {name} 종료")
-        process.terminate()
-        process.wait()
+# 실행 중인 http_sniffer 종료
+def stop_mitmproxy(mitmproxy_process):
     print(f"⏹ http_sniffer 종료")
     mitmproxy_process.terminate()
-    mitmproxy_process.wait()
+    try:
+        mitmproxy_process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        mitmproxy_process.kill()
     print("### 모든 모듈이 정상 종료되었습니다.")
 
 
 
-# Ctrl+C (KeyboardInterrupt) 감지 시 종료
-def signal_handler(sig, frame):
-    print("\n### Ctrl+C 감지 -> 모든 프로세스 종료")
-    stop_modules()
-
+# 종료 후 최종 결과물 출력
+# Trouble : 흐름이 많으면 마지막 dot 렌더링이 몇 분씩 걸려 종료가 끝나지 않음
+# 해결방법 : 렌더링은 render_farm 에서 백그라운드로 하고 FINAL_RENDER_TIMEOUT 만 기다림
+#           (같은 그래프는 캐시에서 바로 나오고, 시간이 넘으면 마지막으로 저장된 그래프를 띄움)
+def show_final_graph():
     # 마지막 실행 그래프 생성 -> 프로그램 동작동안의 최종 결과물 출력
     print("### 최종 실행 흐름 그래프 생성 중...")
-    visualize_execution_flow()
-    print("### 최종 실행 흐름 그래프 생성 완료")
+    future = visualize_execution_flow()
+    if future is not None:
+        try:
+            future.result(timeout=FINAL_RENDER_TIMEOUT)
+            print("### 최종 실행 흐름 그래프 생성 완료")
+        except FutureTimeoutError:
+            print(f"### {FINAL_RENDER_TIMEOUT}초 안에 렌더링이 끝나지 않아 마지막으로 저장된 그래프를 사용합니다.")
+        except Exception:
+            pass  # 실패 내용은 visualizer 에서 출력
+    render_farm.close()  # 남은 dot 프로세스는 종료
+
+    if not os.path.exists("execution_flow.png"):
+        print("### 저장된 그래프가 없습니다.")
+        return
     print("### 그래프를 띄우겠습니다.")
     # Matplotlib으로 이미지 출력
     plt.imshow(plt.imread("execution_flow.png"))
     plt.axis("off")
     plt.show()
 
-    sys.exit(0)
+
+# 단일 프로세스 파이프라인 실행 (log_watcher / visualizer / web_dashboard 를 한 프로세스의 스레드로 실행)
+# 모듈 사이에 저장소 파일을 거치지 않고 메모리 큐로 흐름을 넘겨서 로그 -> 대시보드 지연을 줄임
+def run_pipeline():
+    from pipeline import run_pipeline as run
+    run()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pipeline", action="store_true", help="모듈을 따로 실행하지 않고 한 프로세스 파이프라인으로 실행")
+    args = parser.parse_args()
 
-    signal.signal(signal.SIGINT, signal_handler)
+    # 실행별 채널 인증키를 먼저 만들어 환경 변수로 둠 -> mitmproxy(http_sniffer) / 모듈 프로세스가 같은 키를 물려받음
+    channel_authkey()
 
-    # mitmproxy 실행 + 모듈 실행
+    # mitmproxy 실행 + 모듈 실행 (Ctrl+C 까지 블로킹)
     mitmproxy_process = start_mitmproxy()
-    start_modules()
+    print("\n### Ctrl+C 로 모든 프로세스를 종료합니다.")
+    if args.pipeline:
+        run_pipeline()
+    else:
+        run_modules()
 
-    try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        signal_handler(None, None)
-        
+    print("\n### Ctrl+C 감지 -> 모든 프로세스 종료")
+    stop_mitmproxy(mitmproxy_process)
+    show_final_graph()
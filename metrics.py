@@ -0,0 +1,437 @@
+# 분석기 자체 계측 (counter / gauge / 시간 히스토그램 + 필요할 때만 CPU / 메모리 프로파일)
+# 목표 : 분석기 안에서 시간이 어디에 쓰이는지(라인 처리량, 밀린 로그, 저장 지연, 렌더링 시간, 대시보드 응답 시간) 보이게 해서
+#        log_watcher 가 몇 시간씩 뒤처지기 전에 성능 저하 / 적체를 알아챔
+# 방법 : 1) 프로세스마다 전역 registry 하나 - 각 모듈은 registry.counter(...) / gauge(...) / histogram(...) 로 지표를 만들어 갱신
+#           (히스토그램은 latency_stats.LatencyHistogram, 값이 이미 다른 곳에 있으면 func 로 읽을 때만 계산)
+#        2) start_exporter("log_watcher") : METRICS_EXPORT_INTERVAL 마다 metrics/<프로세스>.json 에 스냅샷을 원자적으로 기록
+#        3) web_dashboard 의 /metrics 가 자기 registry + 다른 프로세스의 스냅샷 + supervisor_stats.json 을 합쳐 Prometheus 형식으로 응답
+#           (같은 지표는 process 라벨로 구분, 히스토그램은 quantile 이 있는 summary 로 표시)
+#        4) 프로파일 : metrics/<프로세스>.profile-request.json 이 생기면 exporter 가 별도 스레드에서
+#           cpu(모든 스레드 스택 샘플링) 또는 memory(tracemalloc 증가량)를 seconds 동안 수집해 텍스트로 저장
+# 결과 : main.py 로 실행한 자식 프로세스 전체의 지표를 http://localhost:5000/metrics 한 곳에서 수집
+
+# Trouble : cProfile 은 enable() 을 호출한 스레드만 측정해서 (3.11) 이미 실행 중인 watchdog / scheduler / Flask 스레드를 볼 수 없음
+# 해결방법 : cpu 프로파일은 sys._current_frames() 로 모든 스레드의 스택을 주기적으로 샘플링해서 함수별 비율을 계산
+
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter as CountTable
+from contextlib import contextmanager
+
+from latency_stats import LatencyHistogram
+
+# 프로세스별 스냅샷 / 프로파일 결과 폴더
+METRICS_DIR = "metrics"
+
+# 스냅샷 기록 간격 (초) / 이 시간 동안 갱신되지 않은 스냅샷은 종료된 프로세스로 보고 무시
+METRICS_EXPORT_INTERVAL = 5.0
+METRICS_STALE_AFTER = 30.0
+
+# supervisor 가 자식에게 heartbeat 파일 경로를 넘기는 환경변수 / 파일을 다시 갱신하기까지의 최소 간격 (초)
+HEARTBEAT_ENV = "SPRING_ANALYZE_HEARTBEAT"
+HEARTBEAT_MIN_INTERVAL = 1.0
+_last_heartbeat = 0.0
+
+# 프로파일 설정
+PROFILE_KINDS = ("cpu", "memory")
+PROFILE_MAX_SECONDS = 300
+PROFILE_SAMPLE_INTERVAL = 0.005  # cpu 샘플링 간격 (초)
+PROFILE_TOP = 40  # 결과에 남길 상위 항목 수
+
+# summary 로 내보낼 백분위수
+QUANTILES = (50, 95, 99)
+
+
+class CounterMetric:
+    """증가만 하는 값 (func 가 있으면 읽을 때 func() 값을 사용)"""
+    kind = "counter"
+
+    def __init__(self, func=None):
+        self.func = func
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def export(self):
+        return {"value": self.func() if self.func is not None else self._value}
+
+
+class GaugeMetric(CounterMetric):
+    """현재 값 (큐 길이, 밀린 바이트 수 등)"""
+    kind = "gauge"
+
+    def set(self, value):
+        self._value = value
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+
+class HistogramMetric:
+    """시간(ms) 분포 - 프로세스 사이에서 합칠 수 있도록 버킷 그대로 내보냄"""
+    kind = "histogram"
+
+    def __init__(self):
+        self._histogram = LatencyHistogram()
+        self._lock = threading.Lock()
+
+    def record(self, value):
+        with self._lock:
+            self._histogram.record(max(value, 0.0))
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record((time.perf_counter() - started) * 1000)
+
+    def export(self):
+        with self._lock:
+            histogram = self._histogram
+            return {"buckets": dict(histogram.buckets), "count": histogram.count, "sum": histogram.total,
+                    "min": histogram.min, "max": histogram.max}
+
+
+class MetricsRegistry:
+    """프로세스 하나의 지표 모음 (스레드 안전, 같은 이름 + 라벨이면 같은 객체를 돌려줌)"""
+
+    def __init__(self, process=None):
+        self.process = process
+        self._lock = threading.Lock()
+        self._metrics = {}  # (이름, 라벨) -> 지표
+        self._help = {}  # 이름 -> 설명
+
+    def _get(self, cls, name, help, labels, **kwargs):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = self._metrics[key] = cls(**kwargs)
+                if help:
+                    self._help[name] = help
+            elif metric.kind != cls.kind:
+                raise ValueError(f"{name} 은(는) 이미 {metric.kind} 로 등록된 지표입니다.")
+            if kwargs.get("func") is not None:
+                metric.func = kwargs["func"]  # 같은 지표를 다시 등록하면 (재시작된 객체의) 마지막 func 사용
+        return metric
+
+    def counter(self, name, help="", func=None, **labels):
+        return self._get(CounterMetric, name, help, labels, func=func)
+
+    def gauge(self, name, help="", func=None, **labels):
+        return self._get(GaugeMetric, name, help, labels, func=func)
+
+    def histogram(self, name, help="", **labels):
+        return self._get(HistogramMetric, name, help, labels)
+
+    def snapshot(self):
+        with self._lock:
+            items = list(self._metrics.items())
+            helps = dict(self._help)
+        metrics = []
+        for (name, labels), metric in items:
+            try:
+                data = metric.export()
+            except Exception:
+                continue  # func 가 실패하면 (종료 중인 객체 등) 이번 스냅샷에서만 제외
+            metrics.append(dict(data, name=name, type=metric.kind, labels=dict(labels), help=helps.get(name, "")))
+        return {"process": self.process, "pid": os.getpid(), "time": time.time(), "metrics": metrics}
+
+
+# 프로세스 전역 registry (모듈들은 import 해서 바로 사용, 프로세스 이름은 start_exporter 에서 정함)
+registry = MetricsRegistry()
+
+
+# ---- heartbeat (supervisor 멈춤 감지) ----
+def heartbeat():
+    """실제 작업(로그 처리 / 집계)이 한 번 끝날 때마다 호출 -> supervisor 가 넘긴 heartbeat 파일의 수정 시각 갱신
+
+    지표 exporter 스레드처럼 작업과 상관없이 도는 스레드에서는 호출하지 않음 (작업 스레드가 멈춰도 갱신되므로)
+    supervisor 밖에서 실행하면 아무 것도 하지 않음
+    """
+    global _last_heartbeat
+    path = os.environ.get(HEARTBEAT_ENV)
+    now = time.monotonic()
+    if not path or now - _last_heartbeat < HEARTBEAT_MIN_INTERVAL:
+        return
+    _last_heartbeat = now
+    try:
+        with open(path, "a", encoding="utf-8"):
+            pass
+        os.utime(path)
+    except OSError as e:
+        print(f"### heartbeat 기록 실패: {e}")
+
+
+# ---- 프로파일 ----
+def _frame_key(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_cpu_profile(seconds, interval=PROFILE_SAMPLE_INTERVAL, top=PROFILE_TOP):
+    """seconds 동안 모든 스레드의 스택을 샘플링 -> 함수별 자체 / 누적 비율 텍스트"""
+    own = CountTable()
+    cumulative = CountTable()
+    by_thread = CountTable()
+    samples = 0
+    me = threading.get_ident()
+    names = {}
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names.update((thread.ident, thread.name) for thread in threading.enumerate())
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            samples += 1
+            by_thread[names.get(ident, ident)] += 1
+            own[_frame_key(frame.f_code)] += 1
+            seen = set()
+            while frame is not None:
+                key = _frame_key(frame.f_code)
+                if key not in seen:  # 재귀 호출은 한 번만 셈
+                    seen.add(key)
+                    cumulative[key] += 1
+                frame = frame.f_back
+        time.sleep(interval)
+
+    lines = [f"# cpu 샘플링 프로파일 : {seconds:g}초, 샘플 {samples}개 (대기 중인 스레드 포함)", "", "## 스레드별 샘플"]
+    lines += [f"{count:>8} {count / samples:7.1%}  {name}" for name, count in by_thread.most_common()] if samples else []
+    for title, table in (("자체 시간", own), ("누적 시간", cumulative)):
+        lines += ["", f"## 함수별 {title} 상위 {top}"]
+        lines += [f"{count:>8} {count / samples:7.1%}  {key}" for key, count in table.most_common(top)]
+    return "\n".join(lines) + "\n"
+
+
+def sample_memory_profile(seconds, top=PROFILE_TOP):
+    """seconds 동안 tracemalloc 으로 늘어난 메모리 할당 위치 + 현재 할당 상위 텍스트"""
+    started_here = not tracemalloc.is_tracing()
+    if started_here:
+        tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        time.sleep(seconds)
+        after = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started_here:
+            tracemalloc.stop()
+
+    lines = [f"# 메모리 프로파일 : {seconds:g}초, 추적 중인 할당 {current / 1024 / 1024:.1f}MB (최대 {peak / 1024 / 1024:.1f}MB)",
+             "", f"## 증가량 상위 {top}"]
+    lines += [str(stat) for stat in after.compare_to(before, "lineno")[:top]]
+    lines += ["", f"## 현재 할당 상위 {top}"]
+    lines += [str(stat) for stat in after.statistics("lineno")[:top]]
+    return "\n".join(lines) + "\n"
+
+
+def request_path(process, metrics_dir=METRICS_DIR):
+    return os.path.join(metrics_dir, f"{process}.profile-request.json")
+
+
+def result_path(process, metrics_dir=METRICS_DIR):
+    return os.path.join(metrics_dir, f"{process}.profile.txt")
+
+
+def request_profile(process, kind="cpu", seconds=10, metrics_dir=METRICS_DIR):
+    """다른 프로세스에 프로파일 요청 (다음 스냅샷 기록 때 시작), 잘못된 값이면 ValueError"""
+    if kind not in PROFILE_KINDS:
+        raise ValueError(f"kind 는 {' / '.join(PROFILE_KINDS)} 중 하나여야 합니다.")
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        raise ValueError(f"seconds 는 0 초과 {PROFILE_MAX_SECONDS} 이하여야 합니다.")
+    os.makedirs(metrics_dir, exist_ok=True)
+    _write_atomic(request_path(process, metrics_dir), json.dumps({"kind": kind, "seconds": seconds,
+                                                                  "requested": time.time()}))
+
+
+def _write_atomic(path, text):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+# ---- 스냅샷 기록 ----
+class MetricsExporter:
+    """registry 스냅샷을 주기적으로 파일에 기록하고 프로파일 요청을 처리하는 스레드"""
+
+    def __init__(self, registry, process, metrics_dir=METRICS_DIR, interval=METRICS_EXPORT_INTERVAL):
+        self.registry = registry
+        self.process = process
+        self.metrics_dir = metrics_dir
+        self.interval = interval
+        self.path = os.path.join(metrics_dir, f"{process}.json")
+        self.profiling = False
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics_exporter", daemon=True)
+        os.makedirs(metrics_dir, exist_ok=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def export(self):
+        data = self.registry.snapshot()
+        data["process"] = self.process
+        data["profiling"] = self.profiling
+        _write_atomic(self.path, json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            try:
+                self.export()
+                self._check_profile_request()
+            except OSError as e:
+                print(f"### [{self.process}] 지표 기록 실패: {e}")
+
+    def _check_profile_request(self):
+        path = request_path(self.process, self.metrics_dir)
+        if self.profiling or not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                profile_request = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return  # 쓰는 중이면 다음에 확인
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.profiling = True
+        self.export()  # 대시보드가 수집 중임을 바로 알 수 있도록
+        threading.Thread(target=self._profile, args=(profile_request["kind"], profile_request["seconds"]),
+                         name="metrics_profile", daemon=True).start()
+
+    def _profile(self, kind, seconds):
+        print(f"### [{self.process}] {kind} 프로파일 시작 ({seconds}초)")
+        try:
+            os.remove(result_path(self.process, self.metrics_dir))  # 이전 결과를 새 결과로 착각하지 않도록
+        except FileNotFoundError:
+            pass
+        try:
+            text = sample_cpu_profile(seconds) if kind == "cpu" else sample_memory_profile(seconds)
+            _write_atomic(result_path(self.process, self.metrics_dir), text)
+            print(f"### [{self.process}] 프로파일 저장 완료: {result_path(self.process, self.metrics_dir)}")
+        except Exception as e:
+            print(f"### [{self.process}] 프로파일 실패: {e}")
+        finally:
+            self.profiling = False
+
+    def close(self):
+        """스레드를 멈추고 스냅샷 파일 삭제 (종료한 프로세스의 지표가 남지 않도록)"""
+        self._stopping.set()
+        self._thread.join(self.interval)
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def start_exporter(process, metrics_dir=METRICS_DIR, interval=METRICS_EXPORT_INTERVAL):
+    """전역 registry 의 프로세스 이름을 정하고 스냅샷 기록 시작"""
+    registry.process = process
+    return MetricsExporter(registry, process, metrics_dir, interval).start()
+
+
+# ---- 수집 (web_dashboard /metrics) ----
+def load_snapshots(metrics_dir=METRICS_DIR, stale_after=METRICS_STALE_AFTER, exclude_pid=None):
+    """최근에 갱신된 다른 프로세스 스냅샷 목록"""
+    if not os.path.isdir(metrics_dir):
+        return []
+    snapshots = []
+    now = time.time()
+    for name in sorted(os.listdir(metrics_dir)):
+        if not name.endswith(".json") or name.endswith(".profile-request.json"):
+            continue
+        try:
+            with open(os.path.join(metrics_dir, name), "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            continue
+        if now - snapshot.get("time", 0) > stale_after or snapshot.get("pid") == exclude_pid:
+            continue
+        snapshots.append(snapshot)
+    return snapshots
+
+
+def supervisor_snapshot(stats_path, stale_after=METRICS_STALE_AFTER * 2):
+    """supervisor_stats.json (main.py 의 자식 프로세스 상태) -> 스냅샷 형식"""
+    try:
+        with open(stats_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if time.time() - data.get("time", 0) > stale_after:
+        return None
+
+    metrics = []
+    for child in data.get("children", []):
+        labels = {"child": child["name"]}
+        metrics.append({"name": "supervisor_child_up", "type": "gauge", "labels": labels, "value": int(child["running"]),
+                        "help": "자식 프로세스 실행 여부"})
+        metrics.append({"name": "supervisor_child_restarts_total", "type": "counter", "labels": labels,
+                        "value": child["restarts"], "help": "자식 프로세스 재시작 횟수"})
+        metrics.append({"name": "supervisor_child_stalls_total", "type": "counter", "labels": labels,
+                        "value": child.get("stalls", 0), "help": "heartbeat 가 끊겨 재시작한 횟수"})
+        for key, name, help in (("cpu_percent", "supervisor_child_cpu_percent", "자식 프로세스 CPU 사용률"),
+                                ("rss_bytes", "supervisor_child_rss_bytes", "자식 프로세스 메모리(RSS)")):
+            if key in child:
+                metrics.append({"name": name, "type": "gauge", "labels": labels, "value": child[key], "help": help})
+    return {"process": "supervisor", "metrics": metrics}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in sorted(labels.items())) + "}"
+
+
+def _histogram_quantile(data, p):
+    histogram = LatencyHistogram()
+    histogram.buckets = {int(index): count for index, count in data["buckets"].items()}
+    histogram.count = data["count"]
+    histogram.max = data["max"]
+    return histogram.percentile(p)
+
+
+def render_prometheus(snapshots):
+    """스냅샷 목록 -> Prometheus text format (지표 이름별로 묶고 process 라벨 추가)"""
+    by_name = {}
+    for snapshot in snapshots:
+        for metric in snapshot["metrics"]:
+            labels = dict(metric["labels"], process=snapshot["process"] or "unknown")
+            by_name.setdefault(metric["name"], []).append((labels, metric))
+
+    lines = []
+    for name in sorted(by_name):
+        samples = by_name[name]
+        kind = samples[0][1]["type"]
+        help = next((metric["help"] for _, metric in samples if metric.get("help")), "")
+        if help:
+            lines.append(f"# HELP {name} {_escape(help)}")
+        lines.append(f"# TYPE {name} {'summary' if kind == 'histogram' else kind}")
+        for labels, metric in samples:
+            if kind != "histogram":
+                value = metric["value"]
+                lines.append(f"{name}{_format_labels(labels)} {float(value) if value is not None else 'NaN'}")
+                continue
+            for p in QUANTILES:
+                quantile = _histogram_quantile(metric, p) if metric["count"] else None
+                lines.append(f"{name}{_format_labels(dict(labels, quantile=p / 100))} "
+                             f"{quantile if quantile is not None else 'NaN'}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {metric['sum']}")
+            lines.append(f"{name}_count{_format_labels(labels)} {metric['count']}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,238 @@
+# 단일 프로세스 파이프라인 모드 (main.py --pipeline)
+# 목표 : log_watcher -> (저장소 파일) -> visualizer / web_dashboard 처럼 디스크를 거쳐 모듈끼리 데이터를 넘기지 않고
+#        로그 라인이 대시보드에 보이기까지의 지연을 초 단위에서 ms 단위로 줄임
+# 방법 : 한 프로세스 안에서 단계별 스레드를 bounded 큐로 연결
+#        1) tail     : 로그를 짧은 간격으로 tail + 분류 + 흐름 조립 -> flow 큐 (가득 차면 대기 = 역압)
+#        2) aggregate: 저장소에 append(OS 버퍼까지만) -> 집계 그래프 갱신 -> 대시보드(SSE / 요청 연결)로 바로 전달 -> 렌더링 예약
+#        3) sync     : fsync 와 checkpoint 기록은 주기적으로 따로 실행 (디스크는 뒤따라가는 sink 역할만 함)
+#        4) render / serve : 그래프 렌더링은 CoalescingScheduler, 대시보드는 같은 프로세스의 Flask 스레드
+#        5) rollup   : 시간대별 호출 경로 집계 + SQL 분석 + 색인 + 원본 흐름 보존 기간 정리 (flow_rollup.RollupMaintainer)
+# 결과 : 모듈별 프로세스 실행(기본 모드)과 같은 저장소/체크포인트/그래프 파일을 남기면서 단계 사이에는 dict 만 전달
+
+# Trouble : SSE 메시지에 저장소 커서가 있어야 브라우저가 /data 와 중복 없이 이어 붙일 수 있음
+# 해결방법 : append 는 aggregate 단계에서 하되 OS 버퍼까지만 쓰고(수 µs), 느린 fsync 만 sync 단계로 미룸
+
+import queue
+import threading
+import time
+
+import visualizer
+from event_scheduler import CoalescingScheduler
+from flow_builder import FlowBuilder
+from flow_channel import serve_channel
+from flow_rollup import RollupMaintainer, ROLLUP_INTERVAL
+from flow_store import FlowStoreWriter, FLOW_STORE_DIR, FSYNC_INTERVAL
+from log_tailer import LogTailer
+from log_watcher import LOG_FILE_PATH, CHECKPOINT_PATH, FLOW_BATCH_SIZE
+from metrics import registry, start_exporter
+from web_dashboard import web_dashboard as dashboard
+
+# 새 로그 확인 간격 (초) - 파일 변경 이벤트를 기다리지 않고 stat 으로 바로 확인
+TAIL_POLL_INTERVAL = 0.05
+
+# tail -> aggregate 사이 큐 크기 (흐름 묶음 단위)
+FLOW_QUEUE_SIZE = 100
+
+# 그래프 렌더링 묶음 처리 설정 (초)
+RENDER_COALESCE_WINDOW = 1.0
+MIN_RENDER_INTERVAL = 5.0
+
+# 대시보드 주소
+DASHBOARD_HOST = "0.0.0.0"
+DASHBOARD_PORT = 5000
+
+
+class Pipeline:
+    def __init__(self, log_path=LOG_FILE_PATH, store_dir=FLOW_STORE_DIR, checkpoint_path=CHECKPOINT_PATH):
+        self.tailer = LogTailer(log_path, checkpoint_path=checkpoint_path)
+
+        # fsync 는 sync 단계에서만 하도록 writer 자체의 fsync 조건은 끔
+        self.writer = FlowStoreWriter(store_dir, fsync_records=float("inf"), fsync_interval=float("inf"))
+
+        self.builder = FlowBuilder(skip=self.tailer.replayed)  # tail 스레드에서만 사용
+        self.rollup = RollupMaintainer(index=dashboard.flow_index)
+        self.flow_queue = queue.Queue(maxsize=FLOW_QUEUE_SIZE)
+        self.renderer = CoalescingScheduler(self.render, window=RENDER_COALESCE_WINDOW,
+                                            min_interval=MIN_RENDER_INTERVAL, name="pipeline_render")
+
+        self._stopping = threading.Event()
+        self._appended_position = None  # 저장소에 append 된 흐름까지의 로그 위치 (아직 fsync 전일 수 있음)
+        self._position_lock = threading.Lock()
+        # stop() 에서 순서대로 기다려야 하는 스레드 (start() 에서 생성)
+        self.tail_thread = None
+        self.aggregate_thread = None
+        self.rollup_thread = None
+
+        self.lines_read = 0
+        self.flows_processed = 0
+        self.queue_waits = 0  # flow 큐가 가득 차서 tail 이 기다린 횟수
+        self.metrics_exporter = None
+
+        # 자체 계측 (log_watcher 와 같은 지표 이름 + 단계 사이 큐 길이)
+        registry.counter("log_lines_read_total", "읽은 로그 라인 수", func=lambda: self.lines_read)
+        registry.counter("log_flows_built_total", "완성된 실행 흐름 수", func=lambda: self.flows_processed)
+        registry.gauge("log_backlog_bytes", "아직 읽지 않은 로그 바이트 수", func=self.tailer.backlog_bytes)
+        registry.gauge("log_open_flows", "진행 중인 흐름 수", func=lambda: self.builder.open_flows)
+        registry.gauge("pipeline_flow_queue_depth", "tail -> aggregate 큐에 쌓인 흐름 묶음 수",
+                       func=self.flow_queue.qsize)
+        registry.counter("pipeline_queue_waits_total", "flow 큐가 가득 차서 tail 이 기다린 횟수",
+                         func=lambda: self.queue_waits)
+
+        # 기존 저장소 내용으로 집계 그래프를 채운 뒤부터는 새 흐름만 메모리로 반영
+        with visualizer.graph_lock:
+            visualizer.update_flow_graph()
+
+    # ---- 1) tail ----
+    def _position(self):
+        # checkpoint 위치는 진행 중인 흐름이 있으면 그중 가장 오래된 흐름의 시작 위치까지만
+        return self.tailer.position(self.builder.open_positions())
+
+    def _put(self, flows, position):
+        try:
+            self.flow_queue.put_nowait((flows, position))
+        except queue.Full:
+            self.queue_waits += 1
+            self.flow_queue.put((flows, position))
+
+    def _tail_loop(self):
+        while not self._stopping.is_set():
+            execution_flows = []
+            read_any = False
+            for line in self.tailer.read_lines():
+                read_any = True
+                self.lines_read += 1
+                execution_flows.extend(self.builder.feed_line(line, self.tailer.line_position))
+                if len(execution_flows) >= FLOW_BATCH_SIZE:
+                    self._put(execution_flows, self._position())
+                    execution_flows = []
+
+            # 한동안 라인이 없는 흐름은 완료 처리
+            execution_flows.extend(self.builder.expire_idle())
+            if execution_flows or read_any:
+                self._put(execution_flows, self._position())
+            else:
+                self._stopping.wait(TAIL_POLL_INTERVAL)
+
+        # 종료 시 진행 중인 흐름도 저장
+        self._put(self.builder.finish(), self.tailer.position())
+
+    # ---- 2) aggregate ----
+    def _aggregate_loop(self):
+        while True:
+            item = self.flow_queue.get()
+            if item is None:
+                return
+            execution_flows, position = item
+            try:
+                self.process_flows(execution_flows)
+            except Exception as e:
+                # 저장하지 못한 흐름의 위치는 checkpoint 에 남기지 않음 (재시작 시 다시 읽음)
+                print(f"### [pipeline] 흐름 처리 중 오류 발생: {e}")
+                continue
+            with self._position_lock:
+                self._appended_position = position
+
+    def process_flows(self, execution_flows):
+        if not execution_flows:
+            return
+        cursor = self.writer.append(execution_flows)
+        with visualizer.graph_lock:
+            visualizer.flow_graph.update(execution_flows)
+            visualizer.graph_cursor = cursor  # visualize_execution_flow() 가 같은 흐름을 다시 읽지 않도록
+        dashboard.on_channel_message({"type": "flows", "cursor": cursor, "flows": execution_flows})
+        self.renderer.notify()
+        self.flows_processed += len(execution_flows)
+
+    # ---- 3) sync ----
+    def sync(self):
+        """append 된 흐름을 fsync 한 뒤 그 흐름까지의 로그 위치를 checkpoint 에 기록"""
+        with self._position_lock:
+            position = self._appended_position
+        self.writer.flush()
+        if position is not None:
+            self.tailer.commit(position)
+
+    def _sync_loop(self):
+        while not self._stopping.wait(FSYNC_INTERVAL):
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"### [pipeline] 저장소 동기화 실패: {type(e).__name__}: {e}")
+
+    # ---- 4) render / serve ----
+    def render(self):
+        visualizer.render_flow_graph(visualizer.flow_graph, visualizer.graph_lock)
+
+    def _serve(self):
+        # 리로더는 프로세스를 다시 실행하므로 사용하지 않음
+        dashboard.app.run(host=DASHBOARD_HOST, port=DASHBOARD_PORT, debug=False, use_reloader=False, threaded=True)
+
+    # ---- 5) rollup ----
+    def _rollup_loop(self):
+        self.rollup.run(self._stopping, ROLLUP_INTERVAL)
+
+    # ---- 실행 / 종료 ----
+    def start(self):
+        self.metrics_exporter = start_exporter("pipeline")
+        self.renderer.start()
+        serve_channel(dashboard.on_channel_message)  # http_sniffer(mitmproxy 프로세스)가 보내는 요청 기록
+        self.tail_thread = self._start_thread("pipeline_tail", self._tail_loop)
+        self.aggregate_thread = self._start_thread("pipeline_aggregate", self._aggregate_loop)
+        self._start_thread("pipeline_sync", self._sync_loop)
+        self._start_thread("pipeline_serve", self._serve)
+        self.rollup_thread = self._start_thread("pipeline_rollup", self._rollup_loop)
+        print(f"## 파이프라인 시작 (로그: {self.tailer.path}, 대시보드: http://localhost:{DASHBOARD_PORT}) ##")
+        return self
+
+    def _start_thread(self, name, target):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self, timeout=10.0):
+        """tail 을 멈추고 큐에 남은 흐름까지 처리한 뒤 저장소를 닫음"""
+        self._stopping.set()
+        self.tail_thread.join(timeout)
+        self.flow_queue.put(None)
+        self.aggregate_thread.join(timeout)
+
+        self.renderer.stop(flush=False)  # 최종 그래프는 main.show_final_graph 에서 렌더링
+        self.sync()
+        self.writer.close()
+        self.rollup_thread.join(timeout)  # 집계 중이면 끝날 때까지 기다린 뒤 마지막으로 한 번 더 집계
+        self.rollup.rollup.sync()
+        self.rollup.rollup.save()
+        self.rollup.sql.sync()
+        self.rollup.sql.save()
+        self.tailer.close()
+        self.metrics_exporter.close()
+        print(f"### 파이프라인 통계: {self.stats()}")
+
+    def stats(self):
+        return {
+            "lines_read": self.lines_read,
+            "flows_processed": self.flows_processed,
+            "queued_batches": self.flow_queue.qsize(),
+            "queue_waits": self.queue_waits,
+            "render": self.renderer.stats(),
+            "render_farm": visualizer.render_farm.stats(),
+            "rollup": self.rollup.rollup.stats(),
+            "sql": self.rollup.sql.stats(),
+        }
+
+
+def run_pipeline():
+    """Ctrl+C 까지 파이프라인 실행"""
+    pipeline = Pipeline().start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    pipeline.stop()
+    return pipeline
+
+
+if __name__ == "__main__":
+    run_pipeline()
+    visualizer.render_farm.close()  # 진행 중인 dot 은 기다리지 않음
@@ -0,0 +1,248 @@
+# 그래프 렌더링 작업자 풀 + 결과 캐시 (visualizer / web_dashboard 공용)
+# 목표 : 그래프가 바뀌지 않았는데도 dot 을 다시 실행하거나, 렌더링이 끝날 때까지 호출한 쪽(종료 처리 포함)이 멈추는 일을 없앰
+# 방법 : 1) 집계 그래프 -> DOT 소스를 만들고 (엔진 + 형식 + DOT 소스)의 sha1 을 캐시 키로 사용
+#        2) 캐시 폴더에 같은 키의 파일이 있으면 dot 을 실행하지 않고 그대로 사용 (수정 시각을 갱신 = LRU 순서)
+#        3) 없으면 ThreadPoolExecutor 의 worker 가 dot 프로세스로 렌더링 -> 임시 파일에 쓰고 rename
+#           같은 키를 렌더링하는 중에 들어온 요청은 같은 Future 를 받음
+#        4) 캐시 폴더가 max_bytes 를 넘으면 가장 오래 쓰이지 않은 파일부터 삭제
+# 결과 : RenderFarm.submit(DOT 소스, "svg"|"png") -> (캐시 키, 결과 파일 경로를 돌려주는 Future)
+
+# Trouble : ThreadPoolExecutor 는 종료 시 실행 중인 작업을 기다리므로 큰 그래프의 dot 이 끝날 때까지 프로그램이 안 꺼짐
+# 해결방법 : graphviz 의 render() 대신 dot 프로세스를 직접 실행하고, close() 에서 실행 중인 dot 을 종료시킴
+
+import hashlib
+import math
+import os
+import signal
+import subprocess
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+
+from graphviz import Digraph
+
+from metrics import registry
+
+# 렌더링 결과 캐시 폴더 / 최대 크기
+RENDER_CACHE_DIR = "render_cache"
+RENDER_CACHE_MAX_BYTES = 200 * 1024 * 1024  # 200MB
+
+# 동시에 실행하는 dot 프로세스 수
+RENDER_WORKERS = 2
+
+# dot 프로세스 하나의 최대 실행 시간 (초)
+RENDER_TIMEOUT = 300.0
+
+# 지원하는 출력 형식 -> MIME 타입
+RENDER_FORMATS = {"svg": "image/svg+xml", "png": "image/png"}
+
+# 레이어별 노드 모양
+NODE_STYLES = {
+    "controller": {"shape": "box", "color": "lightblue"},
+    "service": {"shape": "diamond", "color": "orange"},
+    "dao": {"shape": "ellipse", "color": "lightgreen"},
+    "sql": {"shape": "parallelogram", "color": "lightcoral"},
+}
+
+
+# 엣지 두께 범위 (비용이 가장 큰 엣지 = MAX_PENWIDTH)
+MAX_PENWIDTH = 8.0
+
+# N+1 의심 엣지 색
+N_PLUS_ONE_COLOR = "red"
+
+
+# 집계 그래프 -> Graphviz 방향 그래프
+# 엣지 두께 = 비용 합계(로그 스케일, 가장 비싼 엣지 기준 / 비용이 없는 예전 흐름만 있으면 호출 횟수)
+# 라벨 = 호출 횟수 + 평균 비용, 같은 호출이 반복된(N+1 의심) 엣지는 빨간색
+def build_digraph(graph):
+    G = Digraph(format="png", engine="dot")
+    G.attr(rankdir="TB")
+    G.attr(ranksep="1.0", nodesep="0.8")
+    max_cost = max((edge.get("total_ms", 0.0) for edge in graph.edges.values()), default=0.0)
+
+    for key, node in graph.nodes.items():
+        style = NODE_STYLES[node["layer"]]
+        G.node(key, label=node["label"], shape=style["shape"], color=style["color"], style="filled",
+               fontsize="16", width="2", height="1")
+
+    for (src, dst), edge in graph.edges.items():
+        count = edge["count"]
+        cost = edge.get("total_ms", 0.0)
+        first_seen = datetime.fromtimestamp(edge["first_seen"]).strftime("%Y-%m-%d %H:%M:%S")
+        last_seen = datetime.fromtimestamp(edge["last_seen"]).strftime("%Y-%m-%d %H:%M:%S")
+        label = f'{edge["label"]} x{count}'
+        if max_cost > 0:
+            penwidth = 1 + (MAX_PENWIDTH - 1) * math.log1p(cost) / math.log1p(max_cost)
+            label += f"\navg {cost / count:,.1f} ms"
+        else:
+            penwidth = 1 + math.log2(count)
+        color = "gray60"
+        tooltip = f"first: {first_seen} / last: {last_seen} / total: {cost:,.1f} ms"
+        if edge.get("n_plus_one"):
+            color = N_PLUS_ONE_COLOR
+            label += f'\nN+1 x{edge["max_repeats"]}'
+            tooltip += f' / N+1 의심 {edge["n_plus_one"]}회 (최대 {edge["max_repeats"]}번 반복)'
+        G.edge(src, dst, label=label, color=color, fontcolor=color if edge.get("n_plus_one") else "black",
+               penwidth=f"{penwidth:.1f}", weight=str(count), tooltip=tooltip)
+    return G
+
+
+def _kill(process):
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        pass  # 이미 종료됨
+
+
+def render_key(source, fmt, engine="dot"):
+    return hashlib.sha1(f"{engine}|{fmt}|{source}".encode("utf-8")).hexdigest()
+
+
+class RenderFarm:
+    def __init__(self, cache_dir=RENDER_CACHE_DIR, max_bytes=RENDER_CACHE_MAX_BYTES, workers=RENDER_WORKERS,
+                 timeout=RENDER_TIMEOUT):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render")
+        self._lock = threading.Lock()
+        self._inflight = {}  # 캐시 키 -> 렌더링 중인 Future
+        self._processes = set()  # 실행 중인 dot 프로세스
+        self._closed = False
+
+        self.hits = 0  # 캐시 파일 / 렌더링 중인 같은 작업으로 처리한 요청 수
+        self.renders = 0  # 실제로 dot 을 실행한 횟수
+        self.failures = 0
+        self.evicted = 0
+        self.render_seconds = 0.0
+
+        # 자체 계측 (visualizer / web_dashboard 의 farm 이 같은 지표에 함께 기록)
+        self._render_ms = registry.histogram("render_duration_ms", "dot 렌더링 시간 (ms)")
+        self._hits = registry.counter("render_cache_hits_total", "렌더링 캐시 / 진행 중인 같은 작업으로 처리한 요청 수")
+        self._failures = registry.counter("render_failures_total", "렌더링 실패 / 시간 초과 수")
+        self._inflight_gauge = registry.gauge("render_inflight", "렌더링 중인 작업 수")
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def cache_path(self, key, fmt):
+        return os.path.join(self.cache_dir, f"{key}.{fmt}")
+
+    def submit(self, source, fmt="png", engine="dot"):
+        """DOT 소스 렌더링 요청 -> (캐시 키, 결과 파일 경로를 돌려주는 Future), 지원하지 않는 형식이면 ValueError"""
+        if fmt not in RENDER_FORMATS:
+            raise ValueError(f"지원하지 않는 그래프 형식: {fmt}")
+        key = render_key(source, fmt, engine)
+        path = self.cache_path(key, fmt)
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.hits += 1
+                self._hits.inc()
+                return key, future
+            try:
+                os.utime(path)  # 캐시에 있으면 LRU 순서만 갱신하고 그대로 사용
+            except FileNotFoundError:
+                pass
+            else:
+                self.hits += 1
+                self._hits.inc()
+                future = Future()
+                future.set_result(path)
+                return key, future
+            if self._closed:
+                raise RuntimeError("렌더링 작업자 풀이 이미 종료되었습니다.")
+            future = self._inflight[key] = self._executor.submit(self._render, source, fmt, engine, path)
+            self._inflight_gauge.inc()
+        future.add_done_callback(lambda _: self._finish(key))
+        return key, future
+
+    def _finish(self, key):
+        with self._lock:
+            if self._inflight.pop(key, None) is not None:
+                self._inflight_gauge.dec()
+
+    def _render(self, source, fmt, engine, path):
+        # (worker 스레드) dot 실행 -> 임시 파일 -> rename
+        started = time.monotonic()
+        # 새 프로세스 그룹으로 실행 -> 종료시킬 때 자식 프로세스까지 함께 종료 (POSIX)
+        process = subprocess.Popen([engine, f"-T{fmt}"], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE, start_new_session=os.name == "posix")
+        with self._lock:
+            self._processes.add(process)
+            if self._closed:
+                _kill(process)
+        try:
+            output, error = process.communicate(source.encode("utf-8"), timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            _kill(process)
+            process.communicate()
+            self.failures += 1
+            self._failures.inc()
+            raise RuntimeError(f"{engine} 렌더링 시간 초과 ({self.timeout:g}초)")
+        finally:
+            with self._lock:
+                self._processes.discard(process)
+        if process.returncode != 0:
+            self.failures += 1
+            self._failures.inc()
+            if self._closed:
+                raise RuntimeError("렌더링 작업자 풀 종료로 렌더링이 중단되었습니다.")
+            raise RuntimeError(error.decode("utf-8", "replace").strip() or f"{engine} 종료 코드 {process.returncode}")
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(output)
+        os.replace(tmp_path, path)
+        self.renders += 1
+        self.render_seconds += time.monotonic() - started
+        self._render_ms.record((time.monotonic() - started) * 1000)
+        self.evict()
+        return path
+
+    def evict(self):
+        """캐시 폴더가 max_bytes 이하가 될 때까지 가장 오래 쓰이지 않은 파일부터 삭제"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".tmp"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        entries.sort()
+        for _, size, path in entries[:-1]:  # 방금 렌더링한 파일은 남김
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evicted += 1
+
+    def close(self):
+        """새 요청을 받지 않고, 실행 중인 dot 은 종료시킴 (렌더링을 기다리지 않음)"""
+        with self._lock:
+            self._closed = True
+            for process in self._processes:
+                _kill(process)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            inflight = len(self._inflight)
+        return {
+            "hits": self.hits,
+            "renders": self.renders,
+            "failures": self.failures,
+            "evicted": self.evicted,
+            "inflight": inflight,
+            "avg_render_seconds": round(self.render_seconds / self.renders, 3) if self.renders else 0.0,
+        }
@@ -0,0 +1,322 @@
+# SQL 단위 분석 (SQL_ID 별 실행 횟수 / 비용, N+1 반복 호출, Controller 별 비싼 쿼리 순위)
+# 목표 : 흐름 그래프와 호출 경로 집계는 "어떤 SQL 이 불리는가" 만 보여줘서
+#        느린 쿼리나 루프 안에서 같은 쿼리를 반복하는 N+1 패턴을 찾으려면 원본 로그를 직접 뒤져야 했음
+# 방법 : 1) SQL 노드마다 비용 = 로그에 찍힌 실행 시간(elapsed_ms : log4jdbc sqltiming / p6spy 등),
+#           없으면 로그 시각 차이로 잰 노드 시간(duration_ms)
+#        2) SQL_ID(매퍼 클래스.메서드) 별 실행 횟수, 비용 합계, 비용 히스토그램(p50/p95/p99)을 누적
+#        3) 한 흐름에서 같은 SQL_ID 가 N_PLUS_ONE_MIN_REPEATS(flow_graph 와 공용) 번 이상 실행되면 N+1 의심으로 기록
+#           (Controller, 반복 횟수, 가장 많이 반복시킨 부모 호출, 요청 ID) - 최근 MAX_FINDINGS 개만 유지
+#        4) Controller 별로 SQL_ID 비용 합계를 모아 가장 비싼 쿼리 순위를 만듦
+#        5) flow_rollup 과 같이 저장소 커서 이후에 추가된 흐름만 반영하고 sql_stats.json 에 저장
+# 결과 : sql_stats.json (flow_rollup 의 RollupMaintainer 가 주기적으로 갱신, web_dashboard 의 /sql-stats 에서 읽음)
+#        python sql_analysis.py [--controller LoginController] [--limit 20]
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from flow_graph import N_PLUS_ONE_MIN_REPEATS, name_matches, node_cost
+from flow_index import controller_name
+from flow_store import FLOW_STORE_DIR, iter_flows
+from latency_stats import LatencyHistogram
+
+# 분석 결과 파일 (대시보드에서 읽음)
+SQL_STATS_PATH = "sql_stats.json"
+
+# 따로 모을 SQL_ID 최대 개수 (넘으면 "OTHER" 로 합침)
+MAX_SQL_IDS = 2000
+
+# 보관하는 최근 N+1 의심 기록 수
+MAX_FINDINGS = 200
+
+# 조회 시 기본으로 돌려주는 순위 수
+TOP_N = 20
+
+OTHER = "OTHER"
+
+
+def sql_id(node):
+    return f'{node.get("class")}.{node.get("method")}'
+
+
+def _walk_sql(node, found):
+    # (SQL 노드, 부모 노드) 를 호출 순서대로 모음
+    for child in node.get("children", ()):
+        if child["layer"] == "sql":
+            found.append((child, node))
+        _walk_sql(child, found)
+
+
+def flow_sql_calls(flow):
+    """흐름의 SQL 호출 목록 [(SQL 노드, 부모 노드 또는 None)] (트리가 없는 예전 흐름은 비용 없이 sql 목록만)"""
+    tree = flow.get("tree")
+    if tree:
+        found = []
+        _walk_sql(tree, found)
+        return found
+    return [(sql, None) for sql in flow.get("sql") or []]
+
+
+class SqlStats:
+    """SQL_ID 하나의 누적 통계"""
+
+    def __init__(self, query_type=None):
+        self.query_type = query_type
+        self.cost = LatencyHistogram()  # 실행 1회 비용 분포 (ms)
+        self.timed = 0  # 로그에 실행 시간이 찍혀 있던 실행 수
+        self.n_plus_one_flows = 0  # N+1 의심 흐름 수
+        self.max_repeats = 0  # 한 흐름 안에서 가장 많이 반복된 횟수
+
+    def summary(self, name):
+        cost = self.cost
+        return {
+            "sql_id": name,
+            "query_type": self.query_type,
+            "count": cost.count,
+            "total_ms": round(cost.total, 3),
+            "avg_ms": round(cost.total / cost.count, 3) if cost.count else None,
+            "p50": cost.percentile(50),
+            "p95": cost.percentile(95),
+            "p99": cost.percentile(99),
+            "max_ms": cost.max,
+            "timed_ratio": round(self.timed / cost.count, 3) if cost.count else 0.0,
+            "n_plus_one_flows": self.n_plus_one_flows,
+            "max_repeats": self.max_repeats,
+        }
+
+    def to_dict(self):
+        return {"query_type": self.query_type, "cost": self.cost.to_dict(), "timed": self.timed,
+                "n_plus_one_flows": self.n_plus_one_flows, "max_repeats": self.max_repeats}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls(data["query_type"])
+        stats.cost = LatencyHistogram.from_dict(data["cost"])
+        stats.timed = data["timed"]
+        stats.n_plus_one_flows = data["n_plus_one_flows"]
+        stats.max_repeats = data["max_repeats"]
+        return stats
+
+
+class SqlAnalyzer:
+    """path 가 None 이면 파일 없이 메모리에서만 분석 (batch_analyze)"""
+
+    def __init__(self, path=SQL_STATS_PATH, store_dir=FLOW_STORE_DIR, min_repeats=N_PLUS_ONE_MIN_REPEATS):
+        self.path = path
+        self.store_dir = store_dir
+        self.min_repeats = min_repeats
+        self._lock = threading.Lock()
+        self.sql = {}  # SQL_ID -> SqlStats
+        self.controllers = {}  # Controller -> {"flows", "sql_ms", "sql": {SQL_ID -> [실행 수, 비용 합계]}}
+        self.findings = deque(maxlen=MAX_FINDINGS)  # 최근 N+1 의심 기록
+        self.flow_count = 0
+        self.cursor = None  # 분석에 반영된 마지막 저장소 위치
+        self.load()
+
+    # ---- 저장 / 불러오기 ----
+    def load(self):
+        if self.path is None:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        with self._lock:
+            self.cursor = data.get("cursor")
+            self.flow_count = data.get("flows", 0)
+            self.sql = {name: SqlStats.from_dict(stats) for name, stats in data.get("sql", {}).items()}
+            self.controllers = data.get("controllers", {})
+            self.findings = deque(data.get("findings", []), maxlen=MAX_FINDINGS)
+
+    def save(self):
+        with self._lock:
+            data = {
+                "cursor": self.cursor,
+                "flows": self.flow_count,
+                "sql": {name: stats.to_dict() for name, stats in self.sql.items()},
+                "controllers": self.controllers,
+                "findings": list(self.findings),
+            }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    # ---- 분석 ----
+    def _stats(self, name, query_type):
+        stats = self.sql.get(name)
+        if stats is None:
+            if len(self.sql) >= MAX_SQL_IDS:
+                name = OTHER
+                stats = self.sql.get(name)
+            if stats is None:
+                stats = self.sql[name] = SqlStats(query_type)
+        return name, stats
+
+    def add_flow(self, flow):
+        calls = flow_sql_calls(flow)
+        controller = controller_name(flow)
+        per_controller = self.controllers.get(controller)
+        if per_controller is None:
+            per_controller = self.controllers[controller] = {"flows": 0, "sql_ms": 0.0, "sql": {}}
+        per_controller["flows"] += 1
+        self.flow_count += 1
+        if not calls:
+            return
+
+        repeats = {}  # SQL_ID -> [흐름 안 실행 수, 비용 합계, {부모 -> 실행 수}]
+        for node, parent in calls:
+            name, stats = self._stats(sql_id(node), node.get("query_type"))
+            cost = node_cost(node)
+            stats.cost.record(cost)
+            if node.get("elapsed_ms") is not None:
+                stats.timed += 1
+            per_controller["sql_ms"] += cost
+            entry = per_controller["sql"].get(name)
+            if entry is None:
+                entry = per_controller["sql"][name] = [0, 0.0]
+            entry[0] += 1
+            entry[1] += cost
+
+            repeat = repeats.get(name)
+            if repeat is None:
+                repeat = repeats[name] = [0, 0.0, {}]
+            repeat[0] += 1
+            repeat[1] += cost
+            if parent is not None:
+                parent_name = f'{parent.get("class")}.{parent.get("method")}'
+                repeat[2][parent_name] = repeat[2].get(parent_name, 0) + 1
+
+        for name, (count, cost, parents) in repeats.items():
+            stats = self.sql[name]
+            if count > stats.max_repeats:
+                stats.max_repeats = count
+            if count < self.min_repeats or name == OTHER:
+                continue
+            stats.n_plus_one_flows += 1
+            self.findings.append({
+                "timestamp": flow.get("timestamp"),
+                "controller": controller,
+                "sql_id": name,
+                "repeats": count,
+                "total_ms": round(cost, 3),
+                "parent": max(parents, key=parents.get) if parents else None,  # 반복을 일으킨 호출 (루프 위치)
+                "request_id": flow.get("request_id"),
+            })
+
+    def add(self, flows):
+        with self._lock:
+            for flow in flows:
+                self.add_flow(flow)
+
+    def sync(self, batch_size=5000):
+        """저장소에 새로 추가된 흐름만 분석에 반영하고 반영한 개수를 반환"""
+        added = 0
+        batch = []
+        cursor = self.cursor
+        for cursor, flow in iter_flows(self.store_dir, self.cursor):
+            batch.append(flow)
+            if len(batch) >= batch_size:
+                self.add(batch)
+                self.cursor = cursor
+                added += len(batch)
+                batch = []
+        if batch:
+            self.add(batch)
+            added += len(batch)
+        self.cursor = cursor
+        return added
+
+    # ---- 조회 ----
+    def report(self, controller=None, limit=TOP_N):
+        """비용 합계 순 SQL_ID 순위, Controller 별 비싼 쿼리 순위, 최근 N+1 의심 기록 (controller 로 거를 수 있음)"""
+        with self._lock:
+            controllers = []
+            for name, data in self.controllers.items():
+                if controller and not name_matches(name, controller):
+                    continue
+                flows = data["flows"]
+                top = sorted(data["sql"].items(), key=lambda item: item[1][1], reverse=True)[:limit]
+                controllers.append({
+                    "controller": name,
+                    "flows": flows,
+                    "sql_ms": round(data["sql_ms"], 3),
+                    "avg_sql_ms": round(data["sql_ms"] / flows, 3) if flows else 0.0,
+                    "top": [{"sql_id": sql_name, "count": count, "total_ms": round(cost, 3),
+                             "avg_ms": round(cost / count, 3), "per_flow": round(count / flows, 2) if flows else 0.0}
+                            for sql_name, (count, cost) in top],
+                })
+            controllers.sort(key=lambda item: item["sql_ms"], reverse=True)
+
+            if controller:
+                # 선택한 Controller 에서 실행된 SQL_ID 만 (비용 합계 / 횟수도 그 Controller 기준)
+                totals = {}
+                for item in controllers:
+                    for name, (count, cost) in self.controllers[item["controller"]]["sql"].items():
+                        total = totals.setdefault(name, [0, 0.0])
+                        total[0] += count
+                        total[1] += cost
+                names = sorted(totals, key=lambda name: totals[name][1], reverse=True)[:limit]
+                sql = []
+                for name in names:
+                    summary = self.sql[name].summary(name)
+                    summary["count"], summary["total_ms"] = totals[name][0], round(totals[name][1], 3)
+                    sql.append(summary)
+                findings = [item for item in self.findings if name_matches(item["controller"], controller)]
+            else:
+                names = sorted(self.sql, key=lambda name: self.sql[name].cost.total, reverse=True)[:limit]
+                sql = [self.sql[name].summary(name) for name in names]
+                findings = list(self.findings)
+
+            return {
+                "flows": self.flow_count,
+                "n_plus_one_min_repeats": self.min_repeats,
+                "sql": sql,
+                "controllers": controllers[:limit],
+                "n_plus_one": findings[::-1][:limit],  # 최신 것부터
+            }
+
+    def stats(self):
+        with self._lock:
+            return {
+                "flows": self.flow_count,
+                "sql_ids": len(self.sql),
+                "controllers": len(self.controllers),
+                "n_plus_one_findings": len(self.findings),
+                "cursor": self.cursor,
+            }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQL_ID 별 실행 횟수 / 비용, N+1 반복 호출, Controller 별 비싼 쿼리")
+    parser.add_argument("--store", default=FLOW_STORE_DIR, help=f"흐름 저장소 폴더 (기본: {FLOW_STORE_DIR})")
+    parser.add_argument("--output", default=SQL_STATS_PATH, help=f"분석 결과 파일 (기본: {SQL_STATS_PATH})")
+    parser.add_argument("--controller", help="이 Controller 의 결과만 출력 (예: LoginController)")
+    parser.add_argument("--limit", type=int, default=TOP_N, help=f"순위 수 (기본: {TOP_N})")
+    parser.add_argument("--min-repeats", type=int, default=N_PLUS_ONE_MIN_REPEATS,
+                        help=f"한 흐름에서 같은 SQL_ID 가 이 횟수 이상이면 N+1 의심 (기본: {N_PLUS_ONE_MIN_REPEATS})")
+    args = parser.parse_args()
+
+    analyzer = SqlAnalyzer(args.output, args.store, args.min_repeats)
+    started = time.perf_counter()
+    added = analyzer.sync()
+    analyzer.save()
+    print(f"### 흐름 {added}건 분석 ({time.perf_counter() - started:.2f}초), {analyzer.stats()}")
+
+    result = analyzer.report(args.controller, args.limit)
+    print("## 비용 합계 상위 SQL ##")
+    for item in result["sql"]:
+        print(f"  {item['count']:>8}  {item['total_ms']:>12,.3f} ms  p95 {item['p95']} ms  "
+              f"N+1 {item['n_plus_one_flows']:>5}  {item['sql_id']}")
+    print("## Controller 별 비싼 SQL ##")
+    for item in result["controllers"]:
+        print(f"  {item['controller']} (흐름 {item['flows']}, 평균 SQL {item['avg_sql_ms']} ms)")
+        for top in item["top"][:5]:
+            print(f"      {top['total_ms']:>12,.3f} ms  x{top['per_flow']}/흐름  {top['sql_id']}")
+    print("## 최근 N+1 의심 ##")
+    for item in result["n_plus_one"]:
+        print(f"  {item['repeats']:>4}회  {item['controller']} -> {item['parent']} -> {item['sql_id']}")
@@ -0,0 +1,248 @@
+# 모듈 프로세스 관리 (main.py 에서 사용)
+# 목표 : 자식 프로세스(log_watcher, visualizer, web_dashboard)가 멈추거나 죽어도 분석 파이프라인 전체가 조용히 멈추지 않도록 함
+# 방법 : asyncio 하나로 모든 자식의 stdout / stderr 를 동시에 읽고(파이프가 가득 차서 멈추는 일 없음)
+#        죽은 자식은 점점 늘어나는 대기 시간(backoff)을 두고 다시 실행
+#        살아 있어도 heartbeat 파일(metrics/<이름>.heartbeat, 자식의 작업 루프가 한 번 돌 때마다 metrics.heartbeat() 로 갱신)이
+#        stall_timeout 동안 갱신되지 않으면 멈춘 것으로 보고 종료 후 같은 방식으로 재시작
+#        종료는 모든 자식에게 동시에 요청하고, 제한 시간이 지나면 강제 종료
+#        자식별 상태 / 재시작 횟수 / CPU / 메모리(RSS)를 주기적으로 supervisor_stats.json 에 기록
+# 결과 : main.py 는 Supervisor(...).run() 만 실행하면 됨
+
+# Trouble : 자식 프로세스의 print 가 파이프에서 버퍼링되어 늦게 보임
+# 해결방법 : 자식 환경변수에 PYTHONUNBUFFERED=1, PYTHONIOENCODING=utf-8 을 넣어서 실행
+
+import asyncio
+import datetime
+import json
+import os
+import signal
+import sys
+import time
+
+from flow_channel import CHANNEL_AUTHKEY_ENV, channel_authkey
+from metrics import HEARTBEAT_ENV, METRICS_DIR
+
+try:
+    import psutil  # CPU / 메모리 통계 (없으면 pid / 상태만 기록)
+except ImportError:
+    psutil = None
+
+# 재시작 대기 시간 (초) : 1, 2, 4, ... 최대 MAX_BACKOFF
+INITIAL_BACKOFF = 1.0
+MAX_BACKOFF = 30.0
+
+# 이 시간 이상 정상 동작했으면 backoff 초기화 (초)
+STABLE_RUNTIME = 60.0
+
+# heartbeat 확인 간격 (초)
+HEARTBEAT_CHECK_INTERVAL = 5.0
+
+# 종료 요청 후 강제 종료까지 기다리는 시간 (초)
+SHUTDOWN_TIMEOUT = 10.0
+
+# 상태 기록 간격 (초) / 파일
+STATS_INTERVAL = 10.0
+STATS_PATH = "supervisor_stats.json"
+
+
+class Child:
+    """관리 대상 자식 프로세스 하나"""
+
+    def __init__(self, name, args, restart=True, heartbeat_path=None, stall_timeout=None):
+        self.name = name
+        self.args = args
+        self.restart = restart
+        # 작업이 진행될 때마다 자식이 갱신하는 파일 (None 이면 멈춤 감지 안 함)
+        # 실행 직후에도 stall_timeout 안에 첫 heartbeat 가 없으면 멈춘 것으로 봄
+        self.heartbeat_path = heartbeat_path
+        self.stall_timeout = stall_timeout
+
+        self.process = None
+        self.started_at = None
+        self.restarts = 0
+        self.stalls = 0  # 멈춤 감지로 재시작한 횟수
+        self.last_exit_code = None
+        self._ps = None  # psutil.Process (CPU 사용률 계산용으로 유지)
+
+    def stats(self):
+        running = self.process is not None and self.process.returncode is None
+        stats = {
+            "name": self.name,
+            "pid": self.process.pid if running else None,
+            "running": running,
+            "uptime": round(time.monotonic() - self.started_at, 1) if running else 0,
+            "restarts": self.restarts,
+            "stalls": self.stalls,
+            "last_exit_code": self.last_exit_code,
+        }
+        if psutil is not None and running:
+            try:
+                if self._ps is None or self._ps.pid != self.process.pid:
+                    self._ps = psutil.Process(self.process.pid)
+                stats["cpu_percent"] = self._ps.cpu_percent(interval=None)
+                stats["rss_bytes"] = self._ps.memory_info().rss
+            except psutil.Error:
+                pass
+        return stats
+
+
+class Supervisor:
+    def __init__(self, children, stats_path=STATS_PATH, stats_interval=STATS_INTERVAL):
+        self.children = children
+        self.stats_path = stats_path
+        self.stats_interval = stats_interval
+        self._stopping = None  # asyncio.Event (run() 안에서 생성)
+
+    # ---- 실행 / 재시작 ----
+    async def _start(self, child):
+        # 모든 자식이 같은 실행별 채널 인증키를 쓰도록 전달
+        env = dict(os.environ, PYTHONUNBUFFERED="1", PYTHONIOENCODING="utf-8")
+        env[CHANNEL_AUTHKEY_ENV] = channel_authkey().decode("ascii")
+        if child.heartbeat_path is not None:
+            os.makedirs(os.path.dirname(child.heartbeat_path) or ".", exist_ok=True)
+            env[HEARTBEAT_ENV] = os.path.abspath(child.heartbeat_path)
+        child.process = await asyncio.create_subprocess_exec(
+            *child.args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=env,
+        )
+        child.started_at = time.monotonic()
+        print(f"### {child.name} 실행 중... (pid {child.process.pid})")
+
+    async def _pump(self, child, stream, label):
+        # 한 줄씩 읽어 바로 출력 (stdout / stderr 모두 계속 비워서 자식이 막히지 않도록 함)
+        while True:
+            line = await stream.readline()
+            if not line:
+                return
+            print(f"[{label}] {line.decode('utf-8', 'replace').rstrip()}")
+
+    def _heartbeat_age(self, child):
+        # 마지막 heartbeat 이후 지난 시간 (이번 실행에서 아직 기록 전이면 실행 시작부터)
+        started = time.time() - (time.monotonic() - child.started_at)
+        try:
+            mtime = max(os.stat(child.heartbeat_path).st_mtime, started)  # 이전 실행이 남긴 파일은 무시
+        except OSError:
+            mtime = started
+        return time.time() - mtime
+
+    async def _watch(self, child):
+        # heartbeat 가 stall_timeout 동안 갱신되지 않으면 종료 -> _supervise 가 backoff 후 재시작
+        if child.heartbeat_path is None:
+            return
+        process = child.process
+        while True:
+            try:
+                await asyncio.wait_for(process.wait(), timeout=HEARTBEAT_CHECK_INTERVAL)
+                return
+            except asyncio.TimeoutError:
+                pass
+            age = self._heartbeat_age(child)
+            if age > child.stall_timeout and not self._stopping.is_set():
+                print(f"### {child.name} 이(가) {age:.0f}초 동안 heartbeat 가 없어 멈춘 것으로 보고 재시작합니다.")
+                child.stalls += 1
+                await self._stop_child(child, SHUTDOWN_TIMEOUT)
+                return
+
+    async def _supervise(self, child):
+        backoff = INITIAL_BACKOFF
+        while not self._stopping.is_set():
+            try:
+                await self._start(child)
+            except OSError as e:
+                now = datetime.datetime.now()
+                print(f"### [{now}] {child.name} 실행 실패: {e}")
+            else:
+                await asyncio.gather(
+                    self._pump(child, child.process.stdout, child.name),
+                    self._pump(child, child.process.stderr, f"{child.name}:stderr"),
+                    child.process.wait(),
+                    self._watch(child),
+                )
+                child.last_exit_code = child.process.returncode
+                if self._stopping.is_set():
+                    return
+                print(f"### {child.name} 종료됨 (exit code {child.last_exit_code})")
+                if time.monotonic() - child.started_at >= STABLE_RUNTIME:
+                    backoff = INITIAL_BACKOFF
+
+            if not child.restart:
+                return
+
+            # 재시작 전 대기 (종료 요청이 오면 바로 빠져나옴)
+            print(f"### {child.name} {backoff:.0f}초 후 재시작")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=backoff)
+                return
+            except asyncio.TimeoutError:
+                pass
+            backoff = min(backoff * 2, MAX_BACKOFF)
+            child.restarts += 1
+
+    # ---- 종료 ----
+    async def _stop_child(self, child, timeout):
+        process = child.process
+        if process is None or process.returncode is not None:
+            return
+        print(f"⏹ {child.name} 종료")
+        try:
+            if os.name == "posix":
+                process.send_signal(signal.SIGINT)  # 자식의 KeyboardInterrupt 정리 코드가 실행되도록
+            else:
+                process.terminate()
+            await asyncio.wait_for(process.wait(), timeout)
+        except asyncio.TimeoutError:
+            print(f"### {child.name} 이(가) {timeout}초 안에 종료되지 않아 강제 종료합니다.")
+            process.kill()
+            await process.wait()
+        except ProcessLookupError:
+            pass
+
+    async def shutdown(self, timeout=SHUTDOWN_TIMEOUT):
+        """모든 자식을 동시에 종료"""
+        self._stopping.set()
+        await asyncio.gather(*(self._stop_child(child, timeout) for child in self.children))
+
+    # ---- 상태 기록 ----
+    def write_stats(self):
+        data = {"time": time.time(), "children": [child.stats() for child in self.children]}
+        tmp_path = self.stats_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.stats_path)
+        return data
+
+    async def _stats_loop(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.stats_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                self.write_stats()
+            except OSError as e:
+                print(f"### 프로세스 상태 기록 실패: {e}")
+
+    async def run(self):
+        """모든 자식을 실행하고 종료 요청(Ctrl+C -> 취소)이 올 때까지 관리"""
+        self._stopping = asyncio.Event()
+        tasks = [asyncio.create_task(self._supervise(child)) for child in self.children]
+        tasks.append(asyncio.create_task(self._stats_loop()))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            await asyncio.shield(self.shutdown())
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def python_child(name, script, restart=True, stall_timeout=None):
+    """현재 파이썬 인터프리터로 실행하는 자식 프로세스
+
+    stall_timeout 이 있으면 자식의 작업 루프가 metrics.heartbeat() 로 갱신하는 metrics/<이름>.heartbeat 로 멈춤 감지
+    """
+    heartbeat_path = os.path.join(METRICS_DIR, f"{name}.heartbeat") if stall_timeout else None
+    return Child(name, [sys.executable, script], restart=restart, heartbeat_path=heartbeat_path,
+                 stall_timeout=stall_timeout)
@@ -0,0 +1,51 @@
+# 테스트 공용 설정
+# - 루트의 모듈(flow_store 등)을 import 할 수 있도록 경로 추가 (benchmarks 와 같은 방식)
+# - 기본 경로가 상대 경로(execution_flow.json, ingest_state.json 등)인 모듈이 많으므로 테스트마다 임시 폴더에서 실행
+# - Controller -> Service -> DAO -> SQL 로그 라인 생성 fixture
+
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 테스트 로그의 기준 시각 (epoch 초)
+BASE_TIME = datetime(2024, 1, 1, 10, 0, 0).timestamp()
+
+
+def log_time(epoch):
+    """epoch 초 -> log4j 기본 형식 시각 (yyyy-MM-dd HH:mm:ss,SSS)"""
+    moment = datetime.fromtimestamp(epoch)
+    return moment.strftime("%Y-%m-%d %H:%M:%S") + f",{moment.microsecond // 1000:03d}"
+
+
+def request_lines(start, thread, controller="LoginController", sql_ids=("UserMapper.select",), request_id=None,
+                  step=0.01):
+    """요청 하나의 로그 라인 목록 (start 는 BASE_TIME 기준 초, SQL 은 sql_ids 순서대로 DAO 아래에서 실행)"""
+    suffix = f" reqId={request_id}" if request_id else ""
+    clock = BASE_TIME + start
+    lines = [f"{log_time(clock)} INFO [{thread}] [com.example.{controller}.handle]{suffix}\n",
+             f"{log_time(clock + step)} INFO [{thread}] [com.example.UserService.find] ===find==={suffix}\n",
+             f"{log_time(clock + 2 * step)} INFO [{thread}] [com.example.UserDao.select] ===select==={suffix}\n"]
+    for index, name in enumerate(sql_ids):
+        lines.append(f"{log_time(clock + (3 + index) * step)} DEBUG [{thread}] SELECT * FROM users "
+                     f"SQL_ID: com.example.{name}{suffix}\n")
+    return lines
+
+
+@pytest.fixture(autouse=True)
+def work_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def make_request():
+    return request_lines
+
+
+@pytest.fixture
+def base_time():
+    return BASE_TIME
@@ -0,0 +1,92 @@
+import time
+
+from correlator import RequestCorrelator
+
+
+def make_flow(timestamp, request_id=None, controller="LoginController"):
+    return {"controller": {"class": controller, "function": "handle"}, "service": None, "dao": None, "sql": [],
+            "timestamp": timestamp, "thread": "http-nio-8082-exec-1", "request_id": request_id}
+
+
+def make_http(record_id, started, latency=0.2, request_id=None, url="/login"):
+    return {"id": record_id, "url": url, "method": "GET", "status": 200, "latency_ms": latency * 1000,
+            "started": started, "ended": started + latency, "request_id": request_id}
+
+
+def collect(**kwargs):
+    records = []
+    return RequestCorrelator(records.append, **kwargs), records
+
+
+def test_matches_by_request_id_regardless_of_arrival_order():
+    now = time.time()
+    correlator, records = collect()
+    correlator.add_http(make_http(1, now, request_id="req-1"))
+    correlator.add_flows([make_flow(now - 100, request_id="req-1")])  # 시각이 달라도 요청 ID 가 같으면 연결
+    correlator.add_flows([make_flow(now + 1, request_id="req-2")])
+    correlator.add_http(make_http(2, now + 1, request_id="req-2"))
+    assert [(record["url"], record["matched_by"], record["request_id"]) for record in records] == \
+           [("/login", "request_id", "req-1"), ("/login", "request_id", "req-2")]
+    assert correlator.stats()["matched_by_id"] == 2
+
+
+def test_matches_earliest_flow_inside_time_window():
+    now = time.time()
+    correlator, records = collect(skew=0.5)
+    correlator.add_flows([make_flow(now + 0.3, controller="Second"), make_flow(now + 0.1, controller="First"),
+                          make_flow(now + 5, controller="Outside")])
+    correlator.add_http(make_http(1, now, latency=0.5))
+    assert records[0]["matched_by"] == "time"
+    assert records[0]["flow"]["controller"]["class"] == "First"
+    correlator.add_http(make_http(2, now, latency=0.5))
+    assert records[1]["flow"]["controller"]["class"] == "Second"
+    assert correlator.stats()["pending_flows"] == 1
+
+
+def test_pending_request_matches_flow_that_arrives_later():
+    now = time.time()
+    correlator, records = collect()
+    correlator.add_http(make_http(1, now))
+    assert records == [] and correlator.stats()["pending_http"] == 1
+    correlator.add_flows([make_flow(now + 10)])  # 구간 밖
+    correlator.add_flows([make_flow(now + 0.1)])
+    assert records[0]["matched_by"] == "time" and records[0]["chain"][0].startswith("Controller: LoginController")
+    assert correlator.stats()["pending_http"] == 0
+
+
+def test_request_id_flow_prefers_request_with_same_id():
+    now = time.time()
+    correlator, records = collect()
+    correlator.add_http(make_http(1, now, url="/other"))
+    correlator.add_http(make_http(2, now, request_id="req-1", url="/login"))
+    # 두 요청 모두 시간 구간이 맞아도 요청 ID 가 같은 요청과 연결
+    correlator.add_flows([make_flow(now + 0.1, request_id="req-1")])
+    assert [(record["url"], record["matched_by"]) for record in records] == [("/login", "request_id")]
+
+
+def test_flow_with_other_request_id_is_not_matched_by_time():
+    now = time.time()
+    correlator, records = collect()
+    correlator.add_flows([make_flow(now + 0.1, request_id="req-2")])
+    correlator.add_http(make_http(1, now, request_id="req-1"))
+    assert records == []
+
+
+def test_unmatched_requests_expire_after_ttl():
+    now = time.time()
+    correlator, records = collect(ttl=5)
+    correlator.add_http(make_http(1, now - 10, url="/static/app.js"))
+    assert [(record["url"], record["matched_by"], record["flow"]) for record in records] == \
+           [("/static/app.js", None, None)]
+    assert correlator.stats()["unmatched_http"] == 1 and correlator.stats()["pending_http"] == 0
+
+
+def test_pending_flows_are_bounded():
+    now = time.time()
+    correlator, _ = collect(max_pending_flows=3)
+    correlator.add_flows([make_flow(now + i) for i in range(5)])
+    stats = correlator.stats()
+    assert stats["pending_flows"] == 3 and stats["dropped_flows"] == 2
+    # 가장 오래된 흐름부터 버림
+    correlator.add_http(make_http(1, now, latency=0.5))
+    assert correlator.stats()["pending_http"] == 1
@@ -0,0 +1,93 @@
+from flow_builder import FlowBuilder
+
+
+def feed(builder, lines):
+    flows = []
+    for line in lines:
+        flows.extend(builder.feed_line(line))
+    return flows
+
+
+def interleave(*requests):
+    # 요청별 라인을 한 줄씩 번갈아 섞음 (동시에 처리되는 Tomcat 스레드)
+    lines = []
+    for index in range(max(len(request) for request in requests)):
+        lines.extend(request[index] for request in requests if index < len(request))
+    return lines
+
+
+def test_interleaved_threads_build_separate_flows(make_request):
+    builder = FlowBuilder()
+    lines = interleave(make_request(0, "http-nio-8082-exec-1", "LoginController", ("UserMapper.select",)),
+                       make_request(0, "http-nio-8082-exec-2", "MenuController",
+                                    ("MenuMapper.list", "MenuMapper.count")))
+    flows = feed(builder, lines) + builder.finish()
+
+    by_thread = {flow["thread"]: flow for flow in flows}
+    assert set(by_thread) == {"http-nio-8082-exec-1", "http-nio-8082-exec-2"}
+    assert by_thread["http-nio-8082-exec-1"]["controller"]["class"] == "com.example.LoginController"
+    assert [sql["method"] for sql in by_thread["http-nio-8082-exec-2"]["sql"]] == ["list", "count"]
+    # Controller -> Service -> DAO -> SQL 호출 트리
+    tree = by_thread["http-nio-8082-exec-2"]["tree"]
+    dao = tree["children"][0]["children"][0]
+    assert dao["layer"] == "dao" and [node["layer"] for node in dao["children"]] == ["sql", "sql"]
+
+
+def test_request_id_keeps_flow_across_threads(make_request):
+    builder = FlowBuilder()
+    lines = make_request(0, "http-nio-8082-exec-1", request_id="req-1")
+    # 비동기 처리로 SQL 라인이 다른 스레드에서 찍혀도 같은 요청 ID 면 같은 흐름
+    lines[-1] = lines[-1].replace("http-nio-8082-exec-1", "task-pool-1")
+    flows = feed(builder, lines) + builder.finish()
+    assert len(flows) == 1
+    assert flows[0]["request_id"] == "req-1" and len(flows[0]["sql"]) == 1
+
+
+def test_new_controller_on_same_thread_completes_previous_flow(make_request):
+    builder = FlowBuilder()
+    flows = feed(builder, make_request(0, "http-nio-8082-exec-1", "LoginController")
+                 + make_request(1, "http-nio-8082-exec-1", "MenuController"))
+    assert [flow["controller"]["class"] for flow in flows] == ["com.example.LoginController"]
+    assert builder.open_flows == 1
+
+
+def test_idle_flow_expires_on_log_time(make_request):
+    builder = FlowBuilder(idle_timeout=5.0)
+    assert feed(builder, make_request(0, "http-nio-8082-exec-1", "LoginController")) == []
+    # 다른 스레드의 라인으로 로그 시각이 idle_timeout 이상 흐르면 조용한 흐름은 완료
+    flows = feed(builder, make_request(10, "http-nio-8082-exec-2", "MenuController"))
+    assert [flow["controller"]["class"] for flow in flows] == ["com.example.LoginController"]
+
+
+def test_expire_idle_does_not_close_flows_while_replaying_old_log(make_request):
+    # 과거 로그(2024-01-01)를 따라잡는 중에는 실제 시각과 차이가 커도 진행 중인 흐름을 닫지 않음
+    builder = FlowBuilder(idle_timeout=5.0)
+    feed(builder, make_request(0, "http-nio-8082-exec-1"))
+    assert builder.expire_idle() == []
+    assert builder.open_flows == 1
+
+    # 마지막 라인 이후 실제로 idle_timeout 이 지나면 완료
+    builder._fed_at -= 6.0
+    flows = builder.expire_idle()
+    assert len(flows) == 1 and builder.open_flows == 0
+
+
+def test_skip_drops_flows_started_at_replayed_positions(make_request):
+    builder = FlowBuilder(skip=lambda position: position[1] < 100)
+    flows = []
+    for offset, line in enumerate(make_request(0, "http-nio-8082-exec-1", "LoginController")
+                                  + make_request(1, "http-nio-8082-exec-2", "MenuController")):
+        flows.extend(builder.feed_line(line, (1, offset * 50)))
+    flows.extend(builder.finish())
+    # LoginController 는 위치 0 에서 시작 (이미 저장한 흐름), MenuController 는 위치 200 에서 시작
+    assert [flow["controller"]["class"] for flow in flows] == ["com.example.MenuController"]
+
+
+def test_sql_timing_line_merges_into_previous_sql_node(make_request):
+    builder = FlowBuilder()
+    lines = make_request(0, "http-nio-8082-exec-1")
+    # log4jdbc sqltiming : 같은 SQL_ID 가 실행 시간과 함께 한 번 더 찍힘
+    lines.append(lines[-1].rstrip("\n") + " {executed in 12 msec}\n")
+    flows = feed(builder, lines) + builder.finish()
+    sql_nodes = flows[0]["tree"]["children"][0]["children"][0]["children"]
+    assert len(sql_nodes) == 1 and sql_nodes[0]["elapsed_ms"] == 12
@@ -0,0 +1,52 @@
+import pytest
+
+from flow_builder import FlowBuilder
+from flow_codec import decode, decode_flows, encode_flows, is_encoded, read_flow_file, write_flow_file
+
+
+def build_flows(make_request):
+    builder = FlowBuilder()
+    lines = (make_request(0, "http-nio-8082-exec-1", "LoginController", ("UserMapper.select",), request_id="req-1")
+             + make_request(1, "http-nio-8082-exec-2", "MenuController", ("MenuMapper.list",) * 3))
+    lines.append(lines[-1].rstrip("\n") + " {executed in 7 msec}\n")
+    flows = []
+    for line in lines:
+        flows.extend(builder.feed_line(line))
+    flows.extend(builder.finish())
+    flows[0]["instance"] = "node1"  # 형식에 없는 필드도 그대로 보존
+    return flows
+
+
+@pytest.mark.parametrize("compression", ["none", "gzip"])
+def test_round_trip(make_request, compression):
+    flows = build_flows(make_request)
+    data = encode_flows(flows, compression=compression)
+    assert is_encoded(data)
+    assert decode_flows(data) == flows
+
+
+def test_round_trip_legacy_flow_without_tree():
+    flows = [{"controller": {"class": "LoginController", "function": "login"},
+              "service": {"class": "UserService", "method": "find"}, "dao": None,
+              "sql": [{"query_type": "SELECT", "class": "UserMapper", "method": "select"}]}]
+    assert decode_flows(encode_flows(flows)) == flows
+
+
+def test_offsets_are_stored_with_flows(make_request):
+    flows = build_flows(make_request)
+    decoded, offsets = decode(encode_flows(flows, offsets=[120, 480]))
+    assert decoded == flows and list(offsets) == [120, 480]
+    assert decode(encode_flows(flows))[1] is None
+
+
+def test_decode_rejects_other_formats():
+    with pytest.raises(ValueError):
+        decode(b'[{"controller": null}]')
+
+
+def test_flow_file_reads_codec_and_json(work_dir, make_request):
+    flows = build_flows(make_request)
+    write_flow_file(str(work_dir / "flows.flc"), flows)
+    assert read_flow_file(str(work_dir / "flows.flc")) == flows
+    (work_dir / "flows.json").write_text('[{"timestamp": 1.5}]', encoding="utf-8")
+    assert read_flow_file(str(work_dir / "flows.json")) == [{"timestamp": 1.5}]
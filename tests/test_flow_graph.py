@@ -0,0 +1,38 @@
+from flow_graph import FlowGraph, node_id
+
+
+def tree_flow(controller="LoginController", repeats=1):
+    sql = {"layer": "sql", "class": "UserMapper", "method": "select", "query_type": "SELECT", "duration_ms": 2.0,
+           "children": []}
+    dao = {"layer": "dao", "class": "UserDao", "method": "select", "duration_ms": 10.0,
+           "children": [dict(sql) for _ in range(repeats)]}
+    return {"timestamp": 1000.0, "tree": {"layer": "controller", "class": controller, "method": "handle",
+                                          "duration_ms": 12.0, "children": [dao]}}
+
+
+def test_repeated_calls_mark_n_plus_one_edge():
+    graph = FlowGraph()
+    graph.update([tree_flow(repeats=6), tree_flow(repeats=1)])
+    edge = graph.edges[(node_id("dao", "UserDao", "select"), node_id("sql", "UserMapper", "select"))]
+    assert edge["count"] == 7 and edge["n_plus_one"] == 1 and edge["max_repeats"] == 6
+    assert graph.flow_count == 2
+
+
+def test_subgraph_keeps_only_reachable_nodes():
+    graph = FlowGraph()
+    graph.update([tree_flow("LoginController"), tree_flow("MenuController")])
+    sub = graph.subgraph("LoginController")
+    assert node_id("controller", "MenuController", "handle") not in sub.nodes
+    assert sub.flow_count == 1 and len(sub.edges) == 2
+
+
+def test_clear_keeps_version_increasing():
+    # 같은 그래프 객체를 비우고 다시 집계해도 렌더링 쪽이 바뀐 것을 알 수 있도록 version 은 계속 증가
+    graph = FlowGraph()
+    graph.update([tree_flow()])
+    version = graph.version
+    graph.clear()
+    graph.update([tree_flow()])
+    assert graph.version > version + 1
+    assert graph.flow_count == 1 and graph.nodes[node_id("controller", "LoginController", "handle")]["count"] == 1
+    assert graph.update([]) == 0 and graph.version == version + 2
@@ -0,0 +1,85 @@
+from flow_builder import FlowBuilder
+from flow_index import FlowIndex, parse_time
+from flow_store import FlowStoreWriter, compact_segment
+
+
+def write_requests(writer, make_request, requests):
+    builder = FlowBuilder()
+    flows = []
+    for start, thread, controller, sql_ids in requests:
+        for line in make_request(start, thread, controller, sql_ids):
+            flows.extend(builder.feed_line(line))
+    flows.extend(builder.finish())
+    for flow in flows:
+        flow["instance"] = "node1"
+    return writer.append(flows)
+
+
+def open_index(work_dir):
+    return FlowIndex(path=str(work_dir / "flow_index.sqlite3"), store_dir=str(work_dir / "store"))
+
+
+def test_query_by_controller_sql_id_and_time(work_dir, make_request, base_time):
+    writer = FlowStoreWriter(str(work_dir / "store"))
+    write_requests(writer, make_request, [
+        (0, "http-nio-8082-exec-1", "LoginController", ("UserMapper.select",)),
+        (1, "http-nio-8082-exec-2", "MenuController", ("MenuMapper.list",)),
+        (2, "http-nio-8082-exec-1", "LoginController", ("UserMapper.select", "LoginMapper.insert")),
+    ])
+    writer.close()
+
+    index = open_index(work_dir)
+    assert index.sync() == 3
+    assert len(index.query(controller="LoginController")) == 2
+    # 최신순
+    assert [flow["timestamp"] for flow in index.query(controller="LoginController")] == [base_time + 2, base_time]
+    assert [flow["controller"]["class"] for flow in index.query(sql_id="MenuMapper.list")] == \
+           ["com.example.MenuController"]
+    assert len(index.query(since=base_time + 1, instance="node1")) == 2
+    assert index.query(controller="NoSuchController") == []
+    assert index.count_by_controller(sql_id="UserMapper.select") == \
+           [{"controller": "com.example.LoginController.handle", "count": 2}]
+    index.close()
+
+
+def test_sync_indexes_only_new_flows_and_survives_compaction(work_dir, make_request):
+    writer = FlowStoreWriter(str(work_dir / "store"))
+    write_requests(writer, make_request, [(0, "http-nio-8082-exec-1", "LoginController", ("UserMapper.select",))])
+    writer.roll()
+    index = open_index(work_dir)
+    assert index.sync() == 1
+    assert index.sync() == 0
+
+    write_requests(writer, make_request, [(5, "http-nio-8082-exec-2", "MenuController", ("MenuMapper.list",))])
+    writer.close()
+    assert index.sync() == 1
+    assert index.stats()["flows"] == 2
+
+    # 압축된 세그먼트도 같은 위치로 흐름 본문을 읽음
+    compact_segment(str(work_dir / "store"), 1)
+    assert [flow["controller"]["class"] for flow in index.query(controller="LoginController")] == \
+           ["com.example.LoginController"]
+    # 보존 기간이 지나 지운 세그먼트의 색인 삭제
+    assert index.prune(2) == 1
+    assert index.query(controller="LoginController") == []
+    index.close()
+
+
+def test_rebuild_from_second_index_connection(work_dir, make_request):
+    writer = FlowStoreWriter(str(work_dir / "store"))
+    write_requests(writer, make_request, [(0, "http-nio-8082-exec-1", "LoginController", ("UserMapper.select",))])
+    writer.close()
+    first, second = open_index(work_dir), open_index(work_dir)
+    assert first.sync() == 1
+    # 다른 연결이 이미 반영한 흐름은 다시 넣지 않음
+    assert second.sync() == 0
+    assert second.rebuild() == 1
+    assert first.stats()["flows"] == 1
+    first.close()
+    second.close()
+
+
+def test_parse_time():
+    assert parse_time(None) is None
+    assert parse_time("1700000000") == 1700000000.0
+    assert abs(parse_time("-10m") - (parse_time("-0s") - 600)) < 1.0
@@ -0,0 +1,73 @@
+import time
+
+from flow_rollup import HOUR, MINUTE, FlowRollup, SpaceSaving, enforce_retention, path_signature
+from flow_store import FlowStoreWriter, list_segments
+
+
+def tree_flow(timestamp, controller="LoginController", repeats=1, duration_ms=10.0):
+    sql = {"layer": "sql", "class": "UserMapper", "method": "select", "query_type": "SELECT", "children": []}
+    dao = {"layer": "dao", "class": "UserDao", "method": "select", "children": [dict(sql) for _ in range(repeats)]}
+    return {"timestamp": timestamp, "duration_ms": duration_ms,
+            "tree": {"layer": "controller", "class": controller, "method": "handle", "children": [dao]}}
+
+
+def test_path_signature_collapses_repeated_calls():
+    # 루프 안에서 같은 SQL 을 반복해도(N+1) 같은 경로로 집계
+    assert path_signature(tree_flow(0, repeats=1)) == path_signature(tree_flow(0, repeats=20)) == \
+           "LoginController.handle > UserDao.select > SELECT UserMapper.select"
+    legacy = {"controller": {"class": "LoginController", "function": "login"}, "service": None, "dao": None,
+              "sql": [{"query_type": "SELECT", "class": "UserMapper", "method": "select"}]}
+    assert path_signature(legacy) == "LoginController.login > SELECT UserMapper.select"
+
+
+def test_space_saving_keeps_capacity_and_heavy_hitters():
+    counter = SpaceSaving(5)
+    for key in ["a"] * 100 + ["b"] * 60 + [f"rare-{i}" for i in range(100)]:
+        counter.add(key)
+    assert len(counter.counters) == 5
+    # 전체 / capacity 보다 많이 나온 경로는 반드시 남고, count - error <= 실제 횟수 <= count
+    top = dict(counter.top(2))
+    assert set(top) == {"a", "b"}
+    assert top["a"][0] - top["a"][1] <= 100 <= top["a"][0]
+    assert top["b"][0] - top["b"][1] <= 60 <= top["b"][0]
+
+
+def test_sync_counts_each_flow_once_and_persists_cursor(work_dir):
+    store = str(work_dir / "store")
+    writer = FlowStoreWriter(store)
+    writer.append([tree_flow(1000.0), tree_flow(1010.0), tree_flow(1020.0, "MenuController")])
+    rollup = FlowRollup(path=str(work_dir / "rollup.json"), store_dir=store)
+    assert rollup.sync() == 3
+    assert rollup.sync() == 0
+    rollup.save()
+
+    writer.append([tree_flow(1030.0)])
+    writer.close()
+    reloaded = FlowRollup(path=str(work_dir / "rollup.json"), store_dir=store)
+    assert reloaded.sync() == 1
+    top = reloaded.hot_paths(resolution="minute")["top"]
+    assert top["flows"] == 4
+    assert top["paths"][0]["path"].startswith("LoginController.handle") and top["paths"][0]["count"] == 3
+
+
+def test_old_minute_windows_are_downsampled_to_hours(work_dir):
+    rollup = FlowRollup(path=str(work_dir / "rollup.json"), store_dir=str(work_dir / "store"),
+                        minute_retention=10 * MINUTE)
+    rollup.add([tree_flow(HOUR * 100 + i * MINUTE) for i in range(5)])
+    rollup.add([tree_flow(HOUR * 102)])
+    rollup.downsample()
+    stats = rollup.stats()
+    assert stats["minute_windows"] == 1 and stats["hour_windows"] == 1
+    assert rollup.hot_paths(resolution="hour")["top"]["flows"] == 6
+
+
+def test_enforce_retention_removes_old_sealed_segments(work_dir):
+    store = str(work_dir / "store")
+    writer = FlowStoreWriter(store)
+    writer.append([tree_flow(1.0)])
+    writer.roll()
+    writer.append([tree_flow(2.0)])
+    writer.close()
+    # 마지막 세그먼트는 항상 남김
+    assert enforce_retention(store, retention=60, now=time.time() + 120) == 1
+    assert [number for number, _, _ in list_segments(store)] == [2]
@@ -0,0 +1,97 @@
+import json
+import os
+
+import pytest
+
+from flow_store import (FlowStoreWriter, StoreLockedError, compact_segment, iter_flows, list_segments, parse_cursor,
+                        read_flows, read_segment_ranges, segment_path)
+
+
+def make_flows(start, count):
+    return [{"controller": {"class": "LoginController", "function": "login"}, "timestamp": float(start + i)}
+            for i in range(count)]
+
+
+def timestamps(flows):
+    return [flow["timestamp"] for flow in flows]
+
+
+def test_cursor_returns_only_flows_appended_after_it(work_dir):
+    store = str(work_dir / "store")
+    writer = FlowStoreWriter(store)
+    cursor = writer.append(make_flows(0, 3))
+    writer.append(make_flows(3, 2))
+
+    flows, next_cursor = read_flows(store, since=cursor)
+    assert timestamps(flows) == [3.0, 4.0]
+    assert read_flows(store, since=next_cursor) == ([], next_cursor)
+    # limit 로 나눠 읽어도 이어짐
+    page, page_cursor = read_flows(store, limit=2)
+    assert timestamps(page) == [0.0, 1.0]
+    assert timestamps(read_flows(store, since=page_cursor)[0]) == [2.0, 3.0, 4.0]
+    writer.close()
+
+
+def test_roll_starts_new_segment_and_cursors_cross_segments(work_dir):
+    store = str(work_dir / "store")
+    writer = FlowStoreWriter(store)
+    first = writer.append(make_flows(0, 2))
+    writer.roll()
+    second = writer.append(make_flows(2, 2))
+    writer.close()
+
+    assert parse_cursor(first)[0] == 1 and parse_cursor(second)[0] == 2
+    assert [(number, active) for number, _, active in list_segments(store)] == [(1, False), (2, False)]
+    cursors = [cursor for cursor, _ in iter_flows(store)]
+    assert cursors[1] == first and cursors[-1] == second
+    assert timestamps(read_flows(store, since=first)[0]) == [2.0, 3.0]
+
+
+def test_recovery_truncates_partial_line_of_active_segment(work_dir):
+    store = work_dir / "store"
+    store.mkdir()
+    # 비정상 종료 : .active 세그먼트 끝에 쓰다 만 줄이 남음
+    with open(segment_path(str(store), 1, active=True), "w", encoding="utf-8") as f:
+        f.write(json.dumps(make_flows(0, 1)[0]) + "\n" + '{"controller": {"cla')
+
+    writer = FlowStoreWriter(str(store))
+    assert [(number, active) for number, _, active in list_segments(str(store))] == [(1, False)]
+    cursor = writer.append(make_flows(1, 1))
+    writer.close()
+    assert parse_cursor(cursor)[0] == 2
+    assert timestamps(read_flows(str(store))[0]) == [0.0, 1.0]
+
+
+def test_second_writer_on_same_store_is_refused(work_dir):
+    store = str(work_dir / "store")
+    writer = FlowStoreWriter(store)
+    with pytest.raises(StoreLockedError):
+        FlowStoreWriter(store)
+    writer.close()
+    FlowStoreWriter(store).close()  # 닫으면 다시 열 수 있음
+
+
+def test_compacted_segment_keeps_cursors_and_ranges(work_dir):
+    store = str(work_dir / "store")
+    writer = FlowStoreWriter(store)
+    writer.append(make_flows(0, 3))
+    writer.close()
+    before = list(iter_flows(store))
+
+    compact_segment(store, 1)
+    assert os.path.exists(segment_path(store, 1, compacted=True))
+    assert not os.path.exists(segment_path(store, 1))
+    assert list(iter_flows(store)) == before
+    middle = parse_cursor(before[0][0])[1]
+    assert timestamps(read_flows(store, since=before[0][0])[0]) == [1.0, 2.0]
+    end = parse_cursor(before[1][0])[1]
+    assert read_segment_ranges(store, 1, [(middle, end)]) == {end: before[1][1]}
+
+
+def test_legacy_json_is_imported_into_empty_store(work_dir):
+    legacy_path = str(work_dir / "execution_flow.json")
+    with open(legacy_path, "w", encoding="utf-8") as f:
+        json.dump(make_flows(0, 2), f)
+    writer = FlowStoreWriter(str(work_dir / "store"), legacy_path=legacy_path)
+    writer.close()
+    assert timestamps(read_flows(str(work_dir / "store"))[0]) == [0.0, 1.0]
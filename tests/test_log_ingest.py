@@ -0,0 +1,70 @@
+import gzip
+
+import pytest
+
+from flow_store import read_flows
+from log_ingest import LogIngestor, expand_sources
+
+
+def write_log(path, lines, compressed=False):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with (gzip.open(path, "wt", encoding="utf-8") if compressed else open(path, "a", encoding="utf-8")) as f:
+        f.write("".join(lines))
+
+
+def backfill(sources):
+    ingestor = LogIngestor(sources, store_dir="store", workers=1)
+    try:
+        ingestor.backfill()
+    finally:
+        ingestor.close()
+    return read_flows("store")[0]
+
+
+def summary(flows):
+    return [(flow["instance"], flow["controller"]["class"].rsplit(".", 1)[-1]) for flow in flows]
+
+
+@pytest.fixture
+def two_nodes(work_dir, make_request):
+    write_log(work_dir / "logs/node1/application.log.1.gz",
+              make_request(0, "http-nio-8082-exec-1", "LoginController"), compressed=True)
+    write_log(work_dir / "logs/node1/application.log", make_request(20, "http-nio-8082-exec-1", "BoardController"))
+    write_log(work_dir / "logs/node2/application.log", make_request(10, "http-nio-8082-exec-1", "MenuController")
+              + make_request(30, "http-nio-8082-exec-1", "OrderController"))
+    return ["logs/node1/application.log*", "node2=logs/node2/application.log"]
+
+
+def test_expand_sources_names_instances(two_nodes):
+    files = expand_sources(two_nodes)
+    assert sorted(instance for instance, _ in files) == ["node1", "node1", "node2"]
+
+
+def test_backfill_merges_files_in_time_order(two_nodes):
+    flows = backfill(two_nodes)
+    assert summary(flows) == [("node1", "LoginController"), ("node2", "MenuController"),
+                              ("node1", "BoardController"), ("node2", "OrderController")]
+    assert [flow["timestamp"] for flow in flows] == sorted(flow["timestamp"] for flow in flows)
+
+
+def test_restart_reads_only_new_lines(work_dir, make_request, two_nodes):
+    backfill(two_nodes)
+    write_log(work_dir / "logs/node2/application.log", make_request(40, "http-nio-8082-exec-2", "UserController"))
+    flows = backfill(two_nodes)
+    assert len(flows) == 5
+    assert summary(flows)[-2:] == [("node2", "OrderController"), ("node2", "UserController")]
+
+
+def test_watermark_keeps_unsaved_flows_at_the_same_timestamp(work_dir, make_request):
+    # 로테이션된 파일의 마지막 흐름(B)과 같은 시각에 시작한 흐름(C)이 checkpoint 없는 새 파일에 있음
+    write_log(work_dir / "logs/node1/application.log.1.gz",
+              make_request(0, "http-nio-8082-exec-1", "LoginController")
+              + make_request(5, "http-nio-8082-exec-2", "BoardController"), compressed=True)
+    assert len(backfill(["logs/node1/application.log*"])) == 2
+
+    write_log(work_dir / "logs/node1/application.log", make_request(5, "http-nio-8082-exec-3", "MenuController")
+              + make_request(9, "http-nio-8082-exec-3", "OrderController"))
+    flows = backfill(["logs/node1/application.log*"])
+    # 이미 저장한 흐름은 다시 저장하지 않고, watermark 와 같은 시각의 새 흐름은 버리지 않음
+    assert [name for _, name in summary(flows)] == ["LoginController", "BoardController", "MenuController",
+                                                    "OrderController"]
@@ -0,0 +1,96 @@
+import os
+
+from flow_builder import FlowBuilder
+from log_tailer import LogTailer
+
+
+def append(path, text):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_returns_complete_lines_only(work_dir):
+    path = str(work_dir / "application.log")
+    append(path, "first\nsecond")
+    tailer = LogTailer(path)
+    assert list(tailer.read_lines()) == ["first\n"]
+
+    # 개행이 붙으면 잘려 있던 마지막 라인을 이어서 반환
+    append(path, " line\n")
+    assert list(tailer.read_lines()) == ["second line\n"]
+    assert list(tailer.read_lines()) == []
+    tailer.close()
+
+
+def test_rotation_reads_rest_of_old_file_then_new_file(work_dir):
+    path = str(work_dir / "application.log")
+    append(path, "a\n")
+    tailer = LogTailer(path)
+    assert list(tailer.read_lines()) == ["a\n"]
+
+    # log4j 로테이션 : 기존 파일 rename 뒤 남은 라인이 기록되고 새 파일이 생김
+    os.rename(path, path + ".1")
+    append(path + ".1", "b\n")
+    append(path, "c\n")
+    assert list(tailer.read_lines()) == ["b\n", "c\n"]
+    assert tailer.rotations == 1
+    tailer.close()
+
+
+def test_copytruncate_reads_from_start(work_dir):
+    path = str(work_dir / "application.log")
+    append(path, "old line 1\nold line 2\n")
+    tailer = LogTailer(path)
+    assert len(list(tailer.read_lines())) == 2
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("new\n")
+    assert list(tailer.read_lines()) == ["new\n"]
+    assert tailer.truncations == 1
+    tailer.close()
+
+
+def test_checkpoint_resumes_after_restart(work_dir):
+    path = str(work_dir / "application.log")
+    checkpoint_path = str(work_dir / "application.checkpoint")
+    append(path, "a\nb\n")
+    tailer = LogTailer(path, checkpoint_path=checkpoint_path)
+    assert list(tailer.read_lines()) == ["a\n", "b\n"]
+    tailer.commit()
+    tailer.close()
+
+    append(path, "c\n")
+    restarted = LogTailer(path, checkpoint_path=checkpoint_path)
+    assert list(restarted.read_lines()) == ["c\n"]
+    restarted.close()
+
+
+def test_checkpoint_replays_open_flow_without_duplicating_saved_flows(work_dir, make_request):
+    path = str(work_dir / "application.log")
+    checkpoint_path = str(work_dir / "application.checkpoint")
+    # exec-1 흐름은 다음 Controller 라인으로 완료되어 저장, exec-2 흐름은 진행 중인 상태로 재시작
+    append(path, "".join(make_request(0, "http-nio-8082-exec-1", "LoginController")
+                         + make_request(1, "http-nio-8082-exec-2", "MenuController")
+                         + make_request(2, "http-nio-8082-exec-1", "BoardController")))
+
+    tailer = LogTailer(path, checkpoint_path=checkpoint_path)
+    builder = FlowBuilder(skip=tailer.replayed)
+    saved = []
+    for line in tailer.read_lines():
+        saved.extend(builder.feed_line(line, tailer.line_position))
+    tailer.commit(tailer.position(builder.open_positions()))
+    tailer.close()
+    assert [flow["controller"]["class"] for flow in saved] == ["com.example.LoginController"]
+
+    # 재시작 : 진행 중이던 흐름의 시작 위치부터 다시 읽고, 이미 저장한 흐름은 건너뜀
+    restarted = LogTailer(path, checkpoint_path=checkpoint_path)
+    builder = FlowBuilder(skip=restarted.replayed)
+    flows = []
+    for line in restarted.read_lines():
+        flows.extend(builder.feed_line(line, restarted.line_position))
+    flows.extend(builder.finish())
+    restarted.close()
+    assert sorted(flow["controller"]["class"] for flow in flows) == ["com.example.BoardController",
+                                                                    "com.example.MenuController"]
+    menu = next(flow for flow in flows if flow["controller"]["class"] == "com.example.MenuController")
+    assert menu["sql"] == [{"query_type": "SELECT", "class": "com.example.UserMapper", "method": "select"}]
@@ -0,0 +1,56 @@
+from flow_builder import FlowBuilder
+from flow_store import FlowStoreWriter
+from sql_analysis import SqlAnalyzer
+
+
+def build_flow(make_request, controller, sql_ids, timing_ms=None):
+    builder = FlowBuilder()
+    flows = []
+    lines = make_request(0, "http-nio-8082-exec-1", controller, sql_ids)
+    if timing_ms is not None:
+        lines = [line.rstrip("\n") + f" {{executed in {timing_ms} msec}}\n" if "SQL_ID" in line else line
+                 for line in lines]
+    for line in lines:
+        flows.extend(builder.feed_line(line))
+    return flows + builder.finish()
+
+
+def test_repeated_sql_in_one_flow_is_reported_as_n_plus_one(make_request):
+    analyzer = SqlAnalyzer(path=None, min_repeats=5)
+    analyzer.add(build_flow(make_request, "BoardController", ("BoardMapper.list",) + ("BoardMapper.detail",) * 6))
+    analyzer.add(build_flow(make_request, "LoginController", ("UserMapper.select",) * 4))
+
+    report = analyzer.report()
+    assert len(report["n_plus_one"]) == 1
+    finding = report["n_plus_one"][0]
+    assert finding["sql_id"] == "com.example.BoardMapper.detail" and finding["repeats"] == 6
+    assert finding["controller"] == "com.example.BoardController.handle"
+    assert finding["parent"] == "com.example.UserDao.select"  # 반복을 일으킨 호출
+    by_id = {item["sql_id"]: item for item in report["sql"]}
+    assert by_id["com.example.BoardMapper.detail"]["n_plus_one_flows"] == 1
+    assert by_id["com.example.UserMapper.select"]["max_repeats"] == 4
+    assert by_id["com.example.UserMapper.select"]["n_plus_one_flows"] == 0
+
+
+def test_logged_elapsed_time_is_used_as_cost(make_request):
+    analyzer = SqlAnalyzer(path=None)
+    analyzer.add(build_flow(make_request, "LoginController", ("UserMapper.select",) * 2, timing_ms=40))
+    summary = analyzer.report()["sql"][0]
+    assert summary["count"] == 2 and summary["total_ms"] == 80 and summary["timed_ratio"] == 1.0
+    controller = analyzer.report(controller="LoginController")["controllers"][0]
+    assert controller["sql_ms"] == 80 and controller["top"][0]["per_flow"] == 2.0
+
+
+def test_sync_reads_only_new_flows_and_state_round_trips(work_dir, make_request):
+    store = str(work_dir / "store")
+    writer = FlowStoreWriter(store)
+    writer.append(build_flow(make_request, "LoginController", ("UserMapper.select",)))
+    analyzer = SqlAnalyzer(path=str(work_dir / "sql_stats.json"), store_dir=store)
+    assert analyzer.sync() == 1
+    analyzer.save()
+
+    writer.append(build_flow(make_request, "MenuController", ("MenuMapper.list",)))
+    writer.close()
+    reloaded = SqlAnalyzer(path=str(work_dir / "sql_stats.json"), store_dir=store)
+    assert reloaded.sync() == 1
+    assert reloaded.stats()["flows"] == 2 and reloaded.stats()["sql_ids"] == 2
@@ -0,0 +1,54 @@
+import json
+import os
+
+import pytest
+
+# visualizer 는 networkx / matplotlib / watchdog / graphviz 가 있어야 import 가능
+for module in ("networkx", "matplotlib", "watchdog", "graphviz"):
+    pytest.importorskip(module)
+
+import visualizer  # noqa: E402
+from flow_store import FlowStoreWriter  # noqa: E402
+
+
+def legacy_flow(controller):
+    return {"controller": {"class": controller, "function": "handle"}, "service": None, "dao": None, "sql": []}
+
+
+def write_legacy(flows):
+    with open("execution_flow.json", "w", encoding="utf-8") as f:
+        json.dump(flows, f)
+
+
+@pytest.fixture(autouse=True)
+def fresh_graph(monkeypatch):
+    monkeypatch.setattr(visualizer, "flow_graph", visualizer.FlowGraph())
+    monkeypatch.setattr(visualizer, "graph_cursor", None)
+    monkeypatch.setattr(visualizer, "legacy_signature", None)
+
+
+def test_legacy_graph_is_rebuilt_when_json_changes():
+    write_legacy([legacy_flow("LoginController")])
+    visualizer.update_flow_graph()
+    version = visualizer.flow_graph.version
+    assert visualizer.flow_graph.flow_count == 1
+
+    # 바뀌지 않았으면 다시 집계하지 않음
+    visualizer.update_flow_graph()
+    assert visualizer.flow_graph.version == version
+
+    write_legacy([legacy_flow("LoginController"), legacy_flow("MenuController")])
+    os.utime("execution_flow.json", ns=(1, 1))
+    visualizer.update_flow_graph()
+    assert visualizer.flow_graph.version > version
+    assert visualizer.flow_graph.flow_count == 2
+
+
+def test_migration_to_store_does_not_count_legacy_flows_twice():
+    write_legacy([legacy_flow("LoginController")])
+    visualizer.update_flow_graph()
+
+    # 이전 JSON 파일의 흐름이 저장소로 옮겨짐 (기본 저장소 / 기본 JSON 경로)
+    FlowStoreWriter().close()
+    visualizer.update_flow_graph()
+    assert visualizer.flow_graph.flow_count == 1
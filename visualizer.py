@@ -7,104 +7,146 @@
 # Trouble : 디자인 문제 -> 크기를 키우자니 글씨가 깨지고 글씨를 유지하자니 크기가 너무 작아진다
 # 해결방법 : 없음.. 그냥 확대해서 보는게 제일 머리가 안아프다.
 
-import json
 import networkx as nx
 import matplotlib.pyplot as plt
-from graphviz import Digraph
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 import os
 import time
+import shutil
+import threading
+from concurrent.futures import Future, CancelledError
+from flow_store import load_execution_flow, read_flows, list_segments, is_segment_path, FLOW_STORE_DIR, LEGACY_JSON_PATH
+from flow_graph import FlowGraph
+from event_scheduler import CoalescingScheduler
+from render_farm import RenderFarm, build_digraph
+from metrics import registry, start_exporter
 
 
-# 실행 흐름 데이터 파일 경로
-LOG_OUTPUT_PATH = "execution_flow.json"
-
-# 그래프 저장 경로
+# 그래프 저장 경로 (그림 / DOT 소스)
 GRAPH_OUTPUT_PATH = "execution_flow.png"
+GRAPH_SOURCE_PATH = "execution_flow"
+
+# 그래프 갱신 묶음 처리 설정 (초)
+RENDER_COALESCE_WINDOW = 1.0
+MIN_RENDER_INTERVAL = 5.0
+
+# 마지막으로 렌더링을 요청한 그래프 버전 (변경 없으면 다시 요청하지 않음) / 마지막으로 저장한 버전
+rendered_version = None
+published_version = None
+publish_lock = threading.Lock()
+
+# 백그라운드 렌더링 + 캐시 (같은 그래프는 dot 을 다시 실행하지 않음)
+render_farm = RenderFarm()
+
+# 누적 집계 그래프 + 저장소에서 마지막으로 읽은 위치 (새 흐름만 반영)
+flow_graph = FlowGraph()
+graph_cursor = None
+graph_lock = threading.Lock()
+legacy_signature = None  # 저장소가 없어 이전 JSON 파일로 집계했을 때 그 파일의 (크기, 수정 시각)
+
+# 자체 계측 : 새 흐름을 집계 그래프에 반영하는 시간 (렌더링 시간은 render_farm 에서 기록)
+graph_update_ms = registry.histogram("visualizer_graph_update_ms", "저장소의 새 흐름을 집계 그래프에 반영하는 시간 (ms)")
+
+
+# 저장소에 새로 추가된 흐름만 집계 그래프에 반영
+def update_flow_graph():
+    global graph_cursor, legacy_signature
+    if not list_segments():
+        # 저장소가 아직 없으면 이전 JSON 파일로 집계 - 파일이 바뀐 경우에만 같은 그래프 객체를 비우고 다시 집계
+        # (새 객체를 만들면 version 이 늘 1 이라 render_flow_graph 가 바뀐 그래프를 다시 그리지 않음)
+        try:
+            st = os.stat(LEGACY_JSON_PATH)
+            signature = (st.st_size, st.st_mtime_ns)
+        except FileNotFoundError:
+            signature = None
+        if signature != legacy_signature:
+            legacy_signature = signature
+            flow_graph.clear()
+            flow_graph.update(load_execution_flow())
+        return
 
-
-# 실행 흐름 JSON 로드
-def load_execution_flow():
+    if legacy_signature is not None:
+        # 이전 JSON 파일의 흐름이 저장소로 옮겨졌으므로 저장소 처음부터 다시 집계 (두 번 세지 않도록)
+        legacy_signature = None
+        flow_graph.clear()
+        graph_cursor = None
+    new_flows, graph_cursor = read_flows(since=graph_cursor)
+    flow_graph.update(new_flows)
+
+
+# 집계 그래프 렌더링 요청 -> execution_flow.png 로 저장되면 완료되는 Future 반환 (마지막 요청 뒤 바뀐 것이 없으면 None)
+# 렌더링은 render_farm 의 worker 에서 실행되므로 호출한 스레드는 dot 을 기다리지 않음
+def render_flow_graph(graph, lock):
+    global rendered_version
+    with lock:
+        if not graph.flow_count:
+            print("### 실행 흐름 데이터가 없습니다.")
+            return None
+        if graph.version == rendered_version:
+            print("### 새로운 실행 흐름이 없어 그래프를 다시 그리지 않습니다.")
+            return None
+
+        source = build_digraph(graph).source
+        rendered_version = version = graph.version
+        summary = f"흐름 {graph.flow_count}건, 노드 {len(graph.nodes)}개, 엣지 {len(graph.edges)}개"
+
+    published = Future()
+    _, future = render_farm.submit(source, "png")
+    future.add_done_callback(lambda rendered: _publish(rendered, source, version, summary, published))
+    return published
+
+
+# 렌더링 결과(캐시 파일)를 execution_flow.png 로 복사 (늦게 끝난 이전 버전이 최신 그림을 덮어쓰지 않도록 버전 비교)
+def _publish(rendered, source, version, summary, published):
+    global published_version
     try:
-        with open(LOG_OUTPUT_PATH, "r", encoding="utf-8") as json_file:
-            return json.load(json_file)
-    except (FileNotFoundError, json.JSONDecodeError):
-        print("### 실행 흐름 파일을 찾을 수 없습니다.")
-        return []
+        cache_path = rendered.result()
+        with publish_lock:
+            if published_version is None or version > published_version:
+                shutil.copyfile(cache_path, GRAPH_OUTPUT_PATH + ".tmp")
+                os.replace(GRAPH_OUTPUT_PATH + ".tmp", GRAPH_OUTPUT_PATH)
+                with open(GRAPH_SOURCE_PATH + ".tmp", "w", encoding="utf-8") as f:
+                    f.write(source)
+                os.replace(GRAPH_SOURCE_PATH + ".tmp", GRAPH_SOURCE_PATH)
+                published_version = version
+        print(f"### 실행 흐름 그래프 저장 완료: {GRAPH_OUTPUT_PATH} ({summary})")
+        published.set_result(GRAPH_OUTPUT_PATH)
+    except (Exception, CancelledError) as e:
+        print(f"### 실행 흐름 그래프 렌더링 실패: {e}")
+        published.set_exception(e)
 
 
 # 실행 흐름 시각화
 def visualize_execution_flow():
-    execution_flow = load_execution_flow()
-    if not execution_flow:
-        print("### 실행 흐름 데이터가 없습니다.")
-        return
+    with graph_lock, graph_update_ms.time():
+        update_flow_graph()
+    return render_flow_graph(flow_graph, graph_lock)
 
-    # Graphviz 방향 그래프 생성
-    G = Digraph(format="png", engine="dot")
-    G.attr(rankdir="TB")
-    G.attr(ranksep="1.0", nodesep="0.8")
-
-    for flow in execution_flow:
-        # 컨트롤러 노드 추가
-        controller = flow.get("controller", {})
-        controller_label = f'{controller.get("class", "UnknownController")}\n{controller.get("function", "UnknownFunction")}'
-        G.node(controller_label, shape="box", color="lightblue", style="filled", fontsize="16", width="2", height="1")
-
-        # 서비스(Service) 노드 추가
-        service = flow.get("service")
-        service_label = None
-        if service:
-            service_label = f'{service.get("class", "UnknownService")}\n{service.get("method", "UnknownMethod")}'
-            G.node(service_label, shape="diamond", color="orange", style="filled", fontsize="16", width="2", height="1")
-            G.edge(controller_label, service_label, label="calls", color="gray60")  # Controller -> Service 연결
-
-        # DAO 노드 추가
-        dao = flow.get("dao")
-        dao_label = None
-        if dao:
-            dao_label = f'{dao.get("class", "UnknownDAO")}\n{dao.get("method", "UnknownMethod")}'
-            G.node(dao_label, shape="ellipse", color="lightgreen", style="filled", fontsize="16", width="2", height="1")
-            if service_label:
-                G.edge(service_label, dao_label, label="calls", color="gray60")  # Service -> DAO 연결
-            else:
-                G.edge(controller_label, dao_label, label="calls", color="gray60")  # Controller -> DAO 연결 (Service 없을 때)
-
-        # SQL 노드 추가
-        for sql in flow.get("sql", []):
-            sql_label = f'{sql.get("query_type", "SQL")}\n{sql.get("class", "UnknownClass")}.{sql.get("method", "UnknownMethod")}'
-            G.node(sql_label, shape="parallelogram", color="lightcoral", style="filled", fontsize="16", width="2", height="1")
-            if dao_label:
-                G.edge(dao_label, sql_label, label="executes", color="gray60")  # DAO -> SQL 연결
-            elif service_label:
-                G.edge(service_label, sql_label, label="executes", color="gray60")  # Service -> SQL 연결 (DAO 없을 때)
-            else:
-                G.edge(controller_label, sql_label, label="executes", color="gray60")  # Controller -> SQL 연결 (DAO & Service 없을 때)
-
-
-    # 실행 흐름 그래프 저장 및 출력
-    output_path = G.render(filename="execution_flow")
-    print(f"### 실행 흐름 그래프 저장 완료: {output_path}")
-
-    # Matplotlib으로 이미지 출력
-    # plt.imshow(plt.imread(output_path))
-    # plt.axis("off")
-    # plt.show()
 
 class JSONFileHandler(FileSystemEventHandler):
+    def __init__(self):
+        # 연속된 변경 이벤트는 묶어서 한 번만 렌더링 (렌더링은 전용 스레드에서 실행)
+        self.scheduler = CoalescingScheduler(self.refresh_graph, window=RENDER_COALESCE_WINDOW,
+                                             min_interval=MIN_RENDER_INTERVAL, name="visualizer").start()
+
     def on_modified(self, event):
-        if event.src_path.endswith(LOG_OUTPUT_PATH):
-            print("### 실행 흐름 JSON 변경 감지 됨 => 그래프 최신화 시작\n")
-            visualize_execution_flow()
+        if not event.is_directory and is_segment_path(event.src_path):
+            self.scheduler.notify()
+
+    def refresh_graph(self):
+        print("### 실행 흐름 저장소 변경 감지 됨 => 그래프 최신화 시작\n")
+        visualize_execution_flow()
 
 
 
 if __name__ == "__main__":
     print("### 실행 흐를 시각화 감시 시작")
+    metrics_exporter = start_exporter("visualizer")
     event_handler = JSONFileHandler()
     observer = Observer()
-    observer.schedule(event_handler, path=os.path.dirname(os.path.abspath(LOG_OUTPUT_PATH)),recursive=False)
+    os.makedirs(FLOW_STORE_DIR, exist_ok=True)
+    observer.schedule(event_handler, path=os.path.abspath(FLOW_STORE_DIR),recursive=False)
     observer.start()
 
     try:
@@ -113,6 +155,10 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         observer.stop()
     observer.join()
+    event_handler.scheduler.stop(flush=False)
+    render_farm.close()  # 진행 중인 dot 은 기다리지 않음
+    metrics_exporter.close()
+    print(f"### 이벤트 처리 통계: {event_handler.scheduler.stats()}")
 
         
 
@@ -3,27 +3,229 @@
 # 방법: Flask를 사용하여 JSON 데이터를 웹 UI로 출력
 # 결과: 웹 UI에서 실행 흐름을 시각적으로 확인 가능
 
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, jsonify, request, Response, abort, send_file, g
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from collections import OrderedDict, deque
+import gzip
+import hashlib
 import json
+import threading
 import os
 import signal
 import sys
+import time
+
+# 상위 폴더의 공용 모듈(flow_store 등)을 import 할 수 있도록 경로 추가
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from flow_channel import FlowBroadcaster, serve_channel
+from correlator import RequestCorrelator
+from latency_stats import HTTP_STATS_PATH
+from flow_index import FlowIndex, parse_time
+from flow_rollup import FlowRollup, ROLLUP_PATH, RESOLUTIONS
+from sql_analysis import SqlAnalyzer, SQL_STATS_PATH
+from flow_graph import FlowGraph
+from flow_codec import encode_flows
+from render_farm import RenderFarm, RENDER_FORMATS, build_digraph
+from flow_store import (load_execution_flow, read_flows, iter_flows, store_signature, parse_cursor, format_cursor,
+                        LEGACY_JSON_PATH)
+from metrics import (registry, start_exporter, load_snapshots, supervisor_snapshot, render_prometheus, request_profile,
+                     request_path, result_path)
+from supervisor import STATS_PATH as SUPERVISOR_STATS_PATH
 
 app = Flask(__name__)
 
-# 실행 흐름 파일 
-LOG_OUTPUT_PATH = "execution_flow.json"
+# ?limit= 최대값 (한 번에 너무 큰 응답을 만들지 않도록 제한)
+MAX_PAGE_LIMIT = 5000
+
+# 이 크기 이상인 응답만 gzip 압축
+GZIP_MIN_BYTES = 1024
+
+# /data?format=flc 응답 형식 (flow_codec 압축 형식, 이미 압축되어 있어 gzip 하지 않음)
+FLOW_CODEC_MIMETYPE = "application/x-flow-codec"
+
+# 파라미터 없는 /data 가 돌려주는 최근 세그먼트 수 (세그먼트 최대 16MB / 1시간)
+# 저장소 전체가 아니라 이 구간만 메모리에 캐시함 -> 더 오래된 흐름은 ?since=0:0 페이지 조회 또는 /flows 색인 조회
+FLOW_CACHE_SEGMENTS = 4
+
+
+class ExecutionFlowCache:
+    """저장소 상태(세그먼트 크기/수정 시각)를 키로 파싱 결과와 직렬화/압축 결과를 재사용하는 캐시"""
+
+    def __init__(self, max_segments=FLOW_CACHE_SEGMENTS):
+        self._lock = threading.Lock()
+        self.max_segments = max_segments
+        self.signature = None
+        self.flows = []
+        self.segment_counts = OrderedDict()  # 세그먼트 번호 -> self.flows 에 들어 있는 흐름 수 (오래된 순)
+        self.cursor = None  # 캐시에 반영된 마지막 저장소 위치
+        self.etag = None
+        self._body = None
+        self._gzip_body = None
+        self._encoded_body = None
+
+    def _legacy_signature(self):
+        try:
+            st = os.stat(LEGACY_JSON_PATH)
+        except FileNotFoundError:
+            return ("legacy",)
+        return ("legacy", st.st_size, st.st_mtime_ns)
+
+    def _trim(self, oldest):
+        # 보존 기간이 지나 지워진 세그먼트(oldest 보다 앞선 번호)와 최근 max_segments 개보다 오래된 세그먼트의 흐름을 앞에서부터 버림
+        while self.segment_counts:
+            number, count = next(iter(self.segment_counts.items()))
+            if number >= oldest and len(self.segment_counts) <= self.max_segments:
+                break
+            del self.segment_counts[number]
+            del self.flows[:count]
+
+    def refresh(self):
+        """저장소가 바뀐 경우에만 새로 추가된 흐름을 읽어 캐시에 반영"""
+        signature = store_signature() or self._legacy_signature()
+        with self._lock:
+            if signature == self.signature:
+                return self
+
+            if signature[0] == "legacy":
+                # 저장소가 아직 없으면 이전 JSON 파일 전체를 사용 (커서는 "0:<개수>")
+                self.flows = load_execution_flow()
+                self.segment_counts = OrderedDict()
+                self.cursor = format_cursor(0, len(self.flows))
+            else:
+                numbers = [number for number, _, _ in signature]
+                if self.signature is None or self.signature[0] == "legacy":
+                    self.flows, self.segment_counts = [], OrderedDict()
+                    # 처음 읽을 때도 최근 max_segments 개만 읽음
+                    self.cursor = format_cursor(numbers[-self.max_segments:][0], 0)
+                for cursor, flow in iter_flows(since=self.cursor):
+                    number = parse_cursor(cursor)[0]
+                    self.segment_counts[number] = self.segment_counts.get(number, 0) + 1
+                    self.flows.append(flow)
+                    self.cursor = cursor
+                self._trim(numbers[0])
+
+            self.signature = signature
+            self.etag = hashlib.sha1(repr(signature).encode("utf-8")).hexdigest()
+            self._body = None
+            self._gzip_body = None
+            self._encoded_body = None
+            return self
+
+    def body(self, compressed):
+        # 직렬화/압축은 처음 요청될 때 한 번만 수행
+        with self._lock:
+            if self._body is None:
+                self._body = json.dumps(self.flows, ensure_ascii=False).encode("utf-8")
+            if not compressed:
+                return self._body
+            if self._gzip_body is None:
+                self._gzip_body = gzip.compress(self._body, compresslevel=5)
+            return self._gzip_body
+
+    def encoded_body(self):
+        # 압축 형식(flow_codec) 직렬화도 처음 요청될 때 한 번만 수행
+        with self._lock:
+            if self._encoded_body is None:
+                self._encoded_body = encode_flows(self.flows)
+            return self._encoded_body
+
+    def window_start(self):
+        """캐시(파라미터 없는 /data)가 담고 있는 첫 흐름의 커서 - 이보다 앞선 흐름은 ?since= 로만 조회 가능"""
+        with self._lock:
+            if self.signature is None or self.signature[0] == "legacy" or not self.segment_counts:
+                return format_cursor(0, 0)
+            return format_cursor(next(iter(self.segment_counts)), 0)
+
+    def tail(self, limit):
+        """캐시의 최근 흐름 limit 개와 그 다음 커서 (대시보드 첫 화면 - 저장소를 처음부터 읽지 않음)"""
+        with self._lock:
+            return (self.flows[-limit:] if limit > 0 else []), self.cursor
+
+
+flow_cache = ExecutionFlowCache()
+
+# Controller / SQL ID / 시간 범위 조회용 색인
+flow_index = FlowIndex()
+
+# /flows 요청이 색인을 갱신하는 최소 간격 (초) - 요청마다 저장소를 확인하지 않음
+FLOW_INDEX_SYNC_INTERVAL = 2.0
+flow_index_state = {"synced_at": None}
+flow_index_lock = threading.Lock()
+
+# log_watcher 가 보내는 새 흐름을 SSE 클라이언트들에게 나눠주는 broadcaster
+flow_broadcaster = FlowBroadcaster()
 
+# SSE 연결 유지용 heartbeat 간격 (초)
+STREAM_HEARTBEAT = 15
 
-# 실행 흐름 데이터 로드 함수
-def load_execution_flow():
-    if os.path.exists(LOG_OUTPUT_PATH):
-        with open(LOG_OUTPUT_PATH, "r" ,encoding="utf-8") as json_file:
-            try:
-                return json.load(json_file)
-            except json.JSONDecodeError:
-                return []
-    return []
+# 최근 HTTP 요청 <-> 실행 흐름 연결 기록 (대시보드 표시용)
+CORRELATED_HISTORY_SIZE = 1000
+correlated_records = deque(maxlen=CORRELATED_HISTORY_SIZE)
+
+
+def on_correlated(record):
+    correlated_records.append(record)
+    flow_broadcaster.publish({"type": "correlated", "record": record})
+
+
+request_correlator = RequestCorrelator(on_correlated)
+
+# 자체 계측 : SSE 구독자 수 / 연결을 기다리는 요청 수 (요청별 응답 시간은 after_request 에서 기록)
+registry.gauge("web_dashboard_stream_subscribers", "SSE 구독자 수",
+               func=lambda: flow_broadcaster.stats()["subscribers"])
+registry.gauge("web_dashboard_correlator_pending_http", "실행 흐름과 연결을 기다리는 HTTP 요청 수",
+               func=lambda: request_correlator.stats()["pending_http"])
+
+
+# 채널로 들어온 메시지 분배 (log_watcher 의 흐름 / http_sniffer 의 요청)
+def on_channel_message(message):
+    message_type = message.get("type", "flows")
+    if message_type == "flows":
+        flow_broadcaster.publish(message)
+        request_correlator.add_flows(message["flows"])
+    elif message_type == "http":
+        request_correlator.add_http(message["record"])
+
+
+def make_json_response(body, etag, compressed, mimetype="application/json"):
+    response = Response(body, mimetype=mimetype)
+    if compressed:
+        response.headers["Content-Encoding"] = "gzip"
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = "no-cache"  # 매번 ETag 로 재검증
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
+def accepts_gzip(size):
+    return size >= GZIP_MIN_BYTES and "gzip" in request.accept_encodings
+
+
+def read_flow_page(since, limit):
+    """since 커서 이후의 흐름을 limit 개까지 반환"""
+    if flow_cache.signature[0] == "legacy":
+        start = parse_cursor(since)[1] if since else 0
+        flows = flow_cache.flows[start:start + limit]
+        return flows, format_cursor(0, start + len(flows))
+    return read_flows(since=since, limit=limit)
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    # 라우트별 응답 시간 / 상태 코드 (SSE 는 스트림 시작까지의 시간)
+    started = g.get("request_started")
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        registry.histogram("web_dashboard_request_ms", "대시보드 요청 처리 시간 (ms)", route=route).record(
+            (time.perf_counter() - started) * 1000)
+        registry.counter("web_dashboard_requests_total", "대시보드 요청 수", route=route,
+                         status=response.status_code).inc()
+    return response
 
 
 # app 루트 설정
@@ -34,9 +236,284 @@ def index():
 
 @app.route('/data')
 def get_execution_flow():
-    # 실행 흐름 데이터를 JSON 형식으로 변환
-    data = load_execution_flow()
-    return jsonify(data)
+    # 저장소가 바뀐 경우에만 새 흐름을 읽어 캐시 갱신
+    cache = flow_cache.refresh()
+    # 응답 형식
+    #  - 파라미터 없음 : 최근 FLOW_CACHE_SEGMENTS 개 세그먼트의 흐름 목록 (저장소 전체가 아님)
+    #                    X-Flow-Window-Start = 목록의 시작 커서 (그 이전 흐름은 ?since=0:0 부터 페이지로 조회)
+    #  - ?tail=N       : 최근 흐름 N 개 + 다음 커서 {"flows", "cursor"} (대시보드 첫 화면, 이후는 ?since= 로 이어서)
+    #  - ?since=&limit=: 커서 이후의 흐름 {"flows", "cursor"}
+    since = request.args.get("since") or None
+    limit = request.args.get("limit", type=int)
+    tail = request.args.get("tail", type=int)
+    encoded = request.args.get("format") == "flc"  # 기본은 JSON, format=flc 면 flow_codec 압축 형식
+
+    if tail is not None and since is None:
+        flows, cursor = cache.tail(min(max(tail, 0), MAX_PAGE_LIMIT))
+        etag = hashlib.sha1(f"{cache.etag}|tail|{tail}|{encoded}".encode("utf-8")).hexdigest()
+        if encoded:
+            response = make_json_response(encode_flows(flows), etag, False, FLOW_CODEC_MIMETYPE)
+            response.headers["X-Flow-Cursor"] = cursor or ""
+            return response
+        body = json.dumps({"flows": flows, "cursor": cursor}, ensure_ascii=False).encode("utf-8")
+        compressed = accepts_gzip(len(body))
+        return make_json_response(gzip.compress(body, compresslevel=5) if compressed else body, etag, compressed)
+
+    # 파라미터가 없으면 캐시된 최근 구간 전체 (캐시된 직렬화/압축 결과 사용)
+    if since is None and limit is None and encoded:
+        response = make_json_response(cache.encoded_body(), f"{cache.etag}-flc", False, FLOW_CODEC_MIMETYPE)
+        response.headers["X-Flow-Cursor"] = cache.cursor or ""
+        response.headers["X-Flow-Window-Start"] = cache.window_start()
+        return response
+    if since is None and limit is None:
+        compressed = accepts_gzip(len(cache.body(False)))
+        body = cache.body(compressed)
+        response = make_json_response(body, cache.etag, compressed)
+        response.headers["X-Flow-Cursor"] = cache.cursor or ""
+        response.headers["X-Flow-Window-Start"] = cache.window_start()
+        return response
+
+    # ?since=<커서>&limit= : 커서 이후에 추가된 흐름만 반환
+    limit = min(limit or MAX_PAGE_LIMIT, MAX_PAGE_LIMIT)
+    try:
+        flows, cursor = read_flow_page(since, limit)
+    except ValueError:
+        abort(400, description="since 값이 올바른 커서 형식(<세그먼트>:<오프셋>)이 아닙니다.")
+
+    etag = hashlib.sha1(f"{cache.etag}|{since}|{limit}|{encoded}".encode("utf-8")).hexdigest()
+    if encoded:
+        response = make_json_response(encode_flows(flows), etag, False, FLOW_CODEC_MIMETYPE)
+        response.headers["X-Flow-Cursor"] = cursor or ""
+        return response
+    body = json.dumps({"flows": flows, "cursor": cursor}, ensure_ascii=False).encode("utf-8")
+    compressed = accepts_gzip(len(body))
+    if compressed:
+        body = gzip.compress(body, compresslevel=5)
+    return make_json_response(body, etag, compressed)
+
+
+def sync_flow_index():
+    """마지막 갱신 후 FLOW_INDEX_SYNC_INTERVAL 이 지났을 때만 저장소의 새 흐름을 색인에 반영
+    다른 요청이 갱신 중이면 기다리지 않고 현재 색인으로 조회"""
+    synced_at = flow_index_state["synced_at"]
+    if synced_at is not None and time.monotonic() - synced_at < FLOW_INDEX_SYNC_INTERVAL:
+        return
+    if not flow_index_lock.acquire(blocking=False):
+        return
+    try:
+        flow_index.sync()
+        flow_index_state["synced_at"] = time.monotonic()
+    finally:
+        flow_index_lock.release()
+
+
+@app.route('/flows')
+def query_flows():
+    # 색인 조회 : /flows?controller=LoginController&sql_id=UserMapper.select&from=-10m&to=&instance=&limit=
+    #            group_by=controller 이면 조건에 맞는 흐름 수를 Controller 별로 반환
+    try:
+        since = parse_time(request.args.get("from"))
+        until = parse_time(request.args.get("to"))
+    except ValueError:
+        abort(400, description="from / to 는 epoch 초, ISO 시각 또는 -10m 같은 상대 시각이어야 합니다.")
+
+    sync_flow_index()  # 저장소에 새로 추가된 흐름만 색인에 반영 (최소 간격 / 동시 갱신 제한)
+    conditions = dict(controller=request.args.get("controller"), sql_id=request.args.get("sql_id"),
+                      since=since, until=until, instance=request.args.get("instance"))
+    if request.args.get("group_by") == "controller":
+        return jsonify({"groups": flow_index.count_by_controller(**conditions)})
+
+    flows = flow_index.query(limit=request.args.get("limit", 100, type=int), **conditions)
+    return jsonify({"flows": flows, "count": len(flows)})
+
+
+# 호출 그래프 이미지 : 저장소의 새 흐름만 반영하는 집계 그래프 + 백그라운드 렌더링 캐시
+graph_state = {"graph": FlowGraph(), "cursor": None}
+graph_lock = threading.Lock()
+render_farm = RenderFarm()
+
+# 렌더링이 끝나기를 기다리는 최대 시간 (초) - 넘으면 202 로 응답하고 브라우저가 다시 요청
+GRAPH_RENDER_WAIT = 5.0
+
+
+@app.route('/graph')
+def get_graph():
+    # 호출 그래프 : /graph?format=svg|png&controller=LoginController (controller 가 없으면 전체 그래프)
+    fmt = request.args.get("format", "svg")
+    if fmt not in RENDER_FORMATS:
+        abort(400, description="format 은 svg 또는 png 여야 합니다.")
+    controller = request.args.get("controller")
+
+    with graph_lock:
+        new_flows, graph_state["cursor"] = read_flows(since=graph_state["cursor"])
+        graph_state["graph"].update(new_flows)
+        graph = graph_state["graph"].subgraph(controller) if controller else graph_state["graph"]
+        if not graph.nodes:
+            abort(404, description="그래프로 그릴 실행 흐름이 없습니다.")
+        source = build_digraph(graph).source
+
+    # 같은 그래프는 캐시된 파일을 그대로 사용 (캐시 키 = ETag)
+    key, future = render_farm.submit(source, fmt)
+    try:
+        path = future.result(timeout=GRAPH_RENDER_WAIT)
+    except FutureTimeoutError:
+        response = jsonify({"status": "rendering", "key": key})
+        response.status_code = 202
+        response.headers["Retry-After"] = "2"
+        return response
+    except Exception as e:
+        abort(500, description=f"그래프 렌더링 실패: {e}")
+    return send_file(path, mimetype=RENDER_FORMATS[fmt], etag=key, max_age=0)
+
+
+# flow_rollup 이 주기적으로 기록하는 시간대별 집계 파일 (수정 시각이 같으면 다시 읽지 않음)
+rollup_cache = {"mtime": None, "rollup": None}
+
+
+@app.route('/hot-paths')
+def get_hot_paths():
+    # 창별 상위 호출 경로 : /hot-paths?resolution=minute|hour&windows=10&limit=10&from=-1h&to=
+    resolution = request.args.get("resolution", "minute")
+    if resolution not in RESOLUTIONS:
+        abort(400, description="resolution 은 minute 또는 hour 여야 합니다.")
+    try:
+        since = parse_time(request.args.get("from"))
+        until = parse_time(request.args.get("to"))
+    except ValueError:
+        abort(400, description="from / to 는 epoch 초, ISO 시각 또는 -10m 같은 상대 시각이어야 합니다.")
+
+    try:
+        mtime = os.stat(ROLLUP_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return jsonify({"windows": [], "top": None})
+    if mtime != rollup_cache["mtime"]:
+        rollup_cache["rollup"] = FlowRollup(ROLLUP_PATH)
+        rollup_cache["mtime"] = mtime
+    return jsonify(rollup_cache["rollup"].hot_paths(resolution, since=since, until=until,
+                                                    windows=request.args.get("windows", 10, type=int),
+                                                    limit=request.args.get("limit", 10, type=int)))
+
+
+# flow_rollup 이 같은 주기로 기록하는 SQL 분석 파일 (수정 시각이 같으면 다시 읽지 않음)
+sql_stats_cache = {"mtime": None, "analyzer": None}
+
+
+@app.route('/sql-stats')
+def get_sql_stats():
+    # SQL_ID 별 실행 수 / 비용 순위, Controller 별 비싼 SQL, 최근 N+1 의심 : /sql-stats?controller=LoginController&limit=20
+    try:
+        mtime = os.stat(SQL_STATS_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return jsonify({"sql": [], "controllers": [], "n_plus_one": []})
+    if mtime != sql_stats_cache["mtime"]:
+        sql_stats_cache["analyzer"] = SqlAnalyzer(SQL_STATS_PATH)
+        sql_stats_cache["mtime"] = mtime
+    limit = min(max(request.args.get("limit", 20, type=int), 0), MAX_PAGE_LIMIT)
+    return jsonify(sql_stats_cache["analyzer"].report(request.args.get("controller"), limit))
+
+
+@app.route('/correlated')
+def get_correlated():
+    # 최근 HTTP 요청별 실행 흐름 (URL, 메서드, 응답 시간, Controller -> Service -> DAO -> SQL)
+    limit = min(request.args.get("limit", 100, type=int), CORRELATED_HISTORY_SIZE)
+    records = list(correlated_records)[-limit:] if limit > 0 else []
+    return jsonify({"records": records, "stats": request_correlator.stats()})
+
+
+# http_sniffer 가 주기적으로 내보내는 통계 파일 (수정 시각이 같으면 다시 읽지 않음)
+http_stats_cache = {"mtime": None, "data": {}}
+
+
+@app.route('/http-stats')
+def get_http_stats():
+    # 엔드포인트별 지연 p50/p95/p99, 요청/응답 크기, 처리량
+    try:
+        mtime = os.stat(HTTP_STATS_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return jsonify({"endpoints": []})
+    if mtime != http_stats_cache["mtime"]:
+        try:
+            with open(HTTP_STATS_PATH, "r", encoding="utf-8") as f:
+                http_stats_cache["data"] = json.load(f)
+            http_stats_cache["mtime"] = mtime
+        except (OSError, json.JSONDecodeError):
+            pass  # 쓰는 중이면 이전 값 사용
+    return jsonify(http_stats_cache["data"])
+
+
+@app.route('/metrics')
+def get_metrics():
+    # Prometheus 형식 지표 : 이 프로세스 + main.py 가 실행한 다른 프로세스(metrics/*.json) + supervisor 의 자식 상태
+    local = registry.snapshot()
+    local["process"] = local["process"] or "web_dashboard"
+    snapshots = [local] + load_snapshots(exclude_pid=os.getpid())
+    supervisor = supervisor_snapshot(SUPERVISOR_STATS_PATH)
+    if supervisor is not None:
+        snapshots.append(supervisor)
+    return Response(render_prometheus(snapshots), mimetype="text/plain; version=0.0.4")
+
+
+@app.route('/metrics/profile', methods=["GET", "POST"])
+def profile_process():
+    # POST /metrics/profile?process=log_watcher&kind=cpu|memory&seconds=10 : 프로파일 요청 (다음 지표 기록 때 시작)
+    # GET  /metrics/profile?process=log_watcher : 결과 텍스트 (수집 중이면 202)
+    process = request.args.get("process") or registry.process or "web_dashboard"
+    if not process.replace("_", "").isalnum():
+        abort(400, description="process 이름이 올바르지 않습니다.")
+
+    if request.method == "POST":
+        try:
+            request_profile(process, request.args.get("kind", "cpu"), request.args.get("seconds", 10, type=float))
+        except ValueError as e:
+            abort(400, description=str(e))
+        response = jsonify({"status": "requested", "process": process})
+        response.status_code = 202
+        return response
+
+    profiling = any(snapshot["process"] == process and snapshot.get("profiling") for snapshot in load_snapshots())
+    if profiling or os.path.exists(request_path(process)):
+        response = jsonify({"status": "profiling", "process": process})
+        response.status_code = 202
+        response.headers["Retry-After"] = "5"
+        return response
+    if not os.path.exists(result_path(process)):
+        abort(404, description="프로파일 결과가 없습니다.")
+    return send_file(os.path.abspath(result_path(process)), mimetype="text/plain; charset=utf-8", max_age=0)
+
+
+def format_sse(event, data, event_id=None):
+    message = f"event: {event}\n"
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    return message + f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.route('/stream')
+def stream_execution_flow():
+    # 새 실행 흐름을 Server-Sent Events 로 전달 (재접속 시 Last-Event-ID 이후 이벤트 replay)
+    last_event_id = request.headers.get("Last-Event-ID", type=int)
+    subscription, missed = flow_broadcaster.subscribe(last_event_id)
+
+    def generate():
+        try:
+            yield "retry: 2000\n\n"
+            if missed:
+                # replay 버퍼로 메울 수 없는 구간 -> 클라이언트가 /data?since= 로 따라잡도록 알림
+                yield format_sse("resync", {})
+            while not subscription.closed:
+                item = subscription.get(timeout=STREAM_HEARTBEAT)
+                if item is None:
+                    yield ": ping\n\n"
+                    continue
+                seq, message = item
+                yield format_sse(message.get("type", "flows"), message, event_id=seq)
+        finally:
+            flow_broadcaster.unsubscribe(subscription)
+
+    response = Response(generate(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
 
 
 def signal_handler(sig, frame):
@@ -46,4 +523,9 @@ def signal_handler(sig, frame):
 
 if __name__ == '__main__':
     signal.signal(signal.SIGINT, signal_handler)
+
+    # debug 리로더는 자식 프로세스에서 앱을 다시 실행하므로 실제 서버 프로세스에서만 채널 수신 시작
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        serve_channel(on_channel_message)
+        start_exporter("web_dashboard")
     app.run(debug=True, host="0.0.0.0", port=5000)
\ No newline at end of file